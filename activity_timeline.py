@@ -0,0 +1,189 @@
+"""
+Activity Timeline Module
+Compact per-frame motion/detection activity series built during processing
+"""
+
+import numpy as np
+
+
+class ActivityTimeline:
+    """
+    Per-frame activity series stored in growable numpy arrays, with
+    per-second summaries and constant-time jumps between events
+    """
+
+    def __init__(self, fps=30, initial_capacity=1024):
+        """
+        Initialize an empty timeline
+
+        Args:
+            fps: Frames per second of the series (used for per-second summaries)
+            initial_capacity: Number of frames preallocated before growing
+        """
+        self.fps = fps if fps and fps > 0 else 30
+        capacity = max(1, initial_capacity)
+        self._diff_counts = np.zeros(capacity, dtype=np.int32)
+        self._triggered = np.zeros(capacity, dtype=bool)
+        self._detection_counts = np.zeros(capacity, dtype=np.int16)
+        self._length = 0
+        self._next_event = None
+        self._prev_event = None
+        self._summary = None
+
+    def __len__(self):
+        return self._length
+
+    def _grow(self):
+        """Double the capacity of the backing arrays"""
+        capacity = len(self._diff_counts) * 2
+        for name in ('_diff_counts', '_triggered', '_detection_counts'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._length] = old[:self._length]
+            setattr(self, name, new)
+
+    def append(self, diff_count, triggered, detection_count):
+        """
+        Record one processed frame
+
+        Args:
+            diff_count: Number of changed pixels reported by Stage 1
+            triggered: Whether Stage 2 was triggered for this frame
+            detection_count: Number of YOLO detections on this frame
+        """
+        if self._length == len(self._diff_counts):
+            self._grow()
+        i = self._length
+        self._diff_counts[i] = diff_count
+        self._triggered[i] = triggered
+        self._detection_counts[i] = min(detection_count, np.iinfo(np.int16).max)
+        self._length += 1
+        # Navigation tables and summaries are rebuilt on next use
+        self._next_event = None
+        self._prev_event = None
+        self._summary = None
+
+    @property
+    def diff_counts(self):
+        """Per-frame Stage-1 changed-pixel counts"""
+        return self._diff_counts[:self._length]
+
+    @property
+    def triggered(self):
+        """Per-frame trigger flags"""
+        return self._triggered[:self._length]
+
+    @property
+    def detection_counts(self):
+        """Per-frame detection counts"""
+        return self._detection_counts[:self._length]
+
+    def _active(self):
+        """Frames counted as activity: triggered or with detections"""
+        return self.triggered | (self.detection_counts > 0)
+
+    def _build_navigation(self):
+        """
+        Precompute, for every frame, the nearest event start at or after /
+        at or before it, so jumps are single array lookups
+        """
+        n = self._length
+        active = self._active()
+        starts = active.copy()
+        starts[1:] &= ~active[:-1]  # First frame of each activity run
+
+        idx = np.arange(n, dtype=np.int64)
+        # Nearest start at or after i: reverse running minimum
+        next_event = np.where(starts, idx, n)
+        next_event = np.minimum.accumulate(next_event[::-1])[::-1]
+        # Nearest start at or before i: running maximum
+        prev_event = np.where(starts, idx, -1)
+        prev_event = np.maximum.accumulate(prev_event)
+
+        self._next_event = next_event
+        self._prev_event = prev_event
+
+    def next_event(self, frame_index):
+        """
+        Find the start of the next activity segment after a frame
+
+        Args:
+            frame_index: Current frame index
+
+        Returns:
+            frame index of the next event start, or None if there is none
+        """
+        if self._next_event is None:
+            self._build_navigation()
+        target = frame_index + 1
+        if target >= self._length:
+            return None
+        result = int(self._next_event[max(0, target)])
+        return result if result < self._length else None
+
+    def previous_event(self, frame_index):
+        """
+        Find the start of the previous activity segment before a frame
+
+        Args:
+            frame_index: Current frame index
+
+        Returns:
+            frame index of the previous event start, or None if there is none
+        """
+        if self._prev_event is None:
+            self._build_navigation()
+        target = min(frame_index - 1, self._length - 1)
+        if target < 0:
+            return None
+        result = int(self._prev_event[target])
+        return result if result >= 0 else None
+
+    def per_second_summary(self):
+        """
+        Downsample the series to one entry per second of video
+
+        Returns:
+            dict of numpy arrays (one element per second):
+                - max_diff: Peak changed-pixel count
+                - trigger_ratio: Fraction of frames that triggered Stage 2
+                - detections: Total detections
+        """
+        if self._summary is None:
+            step = max(1, int(round(self.fps)))
+            if self._length == 0:
+                empty = np.zeros(0)
+                self._summary = {'max_diff': empty, 'trigger_ratio': empty, 'detections': empty}
+            else:
+                bins = np.arange(0, self._length, step)
+                sizes = np.diff(np.append(bins, self._length))
+                self._summary = {
+                    'max_diff': np.maximum.reduceat(self.diff_counts, bins),
+                    'trigger_ratio': np.add.reduceat(self.triggered.astype(np.int32), bins) / sizes,
+                    'detections': np.add.reduceat(self.detection_counts.astype(np.int64), bins),
+                }
+        return self._summary
+
+    def column_activity(self, columns):
+        """
+        Bin the series into a fixed number of columns for drawing a strip
+
+        Args:
+            columns: Number of output columns (e.g. pixel width of the strip)
+
+        Returns:
+            (trigger_ratio, detections) arrays with one element per column
+        """
+        columns = max(1, int(columns))
+        if self._length == 0:
+            return np.zeros(columns), np.zeros(columns)
+        edges = np.linspace(0, self._length, columns + 1).astype(np.int64)
+        starts = np.minimum(edges[:-1], self._length - 1)
+        sizes = np.maximum(1, edges[1:] - edges[:-1])
+        trigger_ratio = np.add.reduceat(self.triggered.astype(np.int32), starts) / sizes
+        detections = np.add.reduceat(self.detection_counts.astype(np.int64), starts)
+        # reduceat returns the single element for empty bins; mask them out
+        empty = edges[1:] <= edges[:-1]
+        trigger_ratio[empty] = 0
+        detections[empty] = 0
+        return trigger_ratio, detections
@@ -0,0 +1,350 @@
+"""
+Benchmarks Module
+Micro-benchmarks for the hot paths, stored as per-machine JSON baselines
+and checked for regressions
+
+Usage:
+    python benchmarks.py --save-baseline     # record this machine's baseline
+    python benchmarks.py                     # compare against it (exit 1 on regression)
+"""
+
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from config import BENCHMARK_CONFIG, benchmark_baseline_dir
+from detections import Detections
+from frame_difference import FrameDifferenceDetector
+
+
+def machine_id():
+    """Name identifying this host's baseline (host, architecture, core count)"""
+    name = f"{platform.node() or 'host'}-{platform.machine()}-{os.cpu_count()}cpu"
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+
+
+def baseline_path(baseline_dir=None, machine=None):
+    """Path of a machine's baseline file (relative folders resolve next to config.py)"""
+    return os.path.join(benchmark_baseline_dir(baseline_dir), f"{machine or machine_id()}.json")
+
+
+def time_call(fn, repeats, warmup=1):
+    """
+    Time repeated calls of a function
+
+    Args:
+        fn: Callable without arguments
+        repeats: Number of timed calls
+        warmup: Untimed calls made first (caches, lazy initialization)
+
+    Returns:
+        dict with median_ms, mean_ms, min_ms and repeats
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'min_ms': min(samples),
+        'repeats': len(samples),
+    }
+
+
+def synthetic_frames(width, height, count=8, seed=0):
+    """
+    Textured BGR frames with a block moving across them
+
+    Noise alone blurs away in Stage 1, so the background is blocky and the
+    moving block guarantees real differences between consecutive frames.
+    """
+    rng = np.random.default_rng(seed)
+    tiles = rng.integers(0, 255, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    background = cv2.resize(tiles, (width, height), interpolation=cv2.INTER_NEAREST)
+    size = max(8, min(width, height) // 6)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = int((width - size) * i / max(1, count - 1))
+        y = (height - size) // 2
+        frame[y:y + size, x:x + size] = (40, 200, 240)
+        frames.append(frame)
+    return frames
+
+
+def synthetic_detections(width, height, count=10):
+    """Detections spread over the frame for drawing benchmarks"""
+    rng = np.random.default_rng(1)
+    x1 = rng.integers(0, width * 3 // 4, count)
+    y1 = rng.integers(0, height * 3 // 4, count)
+    boxes = np.stack([x1, y1, x1 + width // 8, y1 + height // 8], axis=1)
+    return Detections(rng.integers(0, 3, count), rng.uniform(0.3, 0.95, count), boxes,
+                      {0: 'person', 1: 'car', 2: 'dog'})
+
+
+def write_synthetic_video(path, width, height, frames, fps=30):
+    """Write a short mp4 that stays still, moves, then stays still again"""
+    moving = synthetic_frames(width, height, count=max(2, frames // 3))
+    still = frames - len(moving)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for frame in [moving[0]] * (still // 2) + moving + [moving[-1]] * (still - still // 2):
+        writer.write(frame)
+    writer.release()
+
+
+class BenchmarkSuite:
+    """
+    Times the hot functions one by one and the processing loops end to end,
+    at each configured resolution.
+
+    Results are keyed "<benchmark>@<width>x<height>". Benchmarks whose
+    dependencies are unavailable here (YOLO weights, Tk) are recorded in
+    `skipped` instead of failing the run.
+    """
+
+    BENCHMARKS = ('frame_diff', 'frame_diff_luma', 'draw_detections', 'gui_convert',
+                  'yolo_detect', 'two_stage_loop', 'full_yolo_loop')
+
+    def __init__(self, resolutions=None, repeats=None, loop_frames=None, loop_repeats=None,
+                 model_size='n', only=None):
+        """
+        Initialize the suite
+
+        Args:
+            resolutions: List of (width, height) (default: BENCHMARK_CONFIG)
+            repeats: Timed calls per component benchmark
+            loop_frames: Frames in the synthetic video used by loop benchmarks
+            loop_repeats: Timed runs per loop benchmark
+            model_size: YOLOv8 model size for detection benchmarks
+            only: Names from BENCHMARKS to run (default: all)
+        """
+        self.resolutions = [tuple(r) for r in (resolutions or BENCHMARK_CONFIG['resolutions'])]
+        self.repeats = repeats or BENCHMARK_CONFIG['repeats']
+        self.loop_frames = loop_frames or BENCHMARK_CONFIG['loop_frames']
+        self.loop_repeats = loop_repeats or BENCHMARK_CONFIG['loop_repeats']
+        self.model_size = model_size
+        self.only = set(only) if only else set(self.BENCHMARKS)
+        unknown = self.only - set(self.BENCHMARKS)
+        if unknown:
+            raise ValueError(f"Unknown benchmarks: {sorted(unknown)}")
+        self.skipped = {}
+        self._processor = None
+        self._processor_error = None
+
+    def _get_processor(self):
+        """Create the VideoProcessor on first use (loads YOLO weights)"""
+        if self._processor is None and self._processor_error is None:
+            try:
+                from video_processor import VideoProcessor
+                self._processor = VideoProcessor(yolo_model_size=self.model_size)
+            except Exception as e:
+                self._processor_error = f"YOLO unavailable: {e}"
+        if self._processor is None:
+            raise RuntimeError(self._processor_error)
+        return self._processor
+
+    # Component benchmarks: each returns the function to time
+
+    def _bench_frame_diff(self, frames):
+        detector = FrameDifferenceDetector(threshold=5000)
+        frames = itertools.cycle(frames)
+        return lambda: detector.detect_difference(next(frames))
+
+    def _bench_frame_diff_luma(self, frames):
+        return self._bench_frame_diff([cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames])
+
+    def _bench_draw_detections(self, frames):
+        try:
+            from yolo_detector import YOLODetector
+        except ImportError as e:
+            raise RuntimeError(f"YOLO unavailable: {e}")
+        height, width = frames[0].shape[:2]
+        detections = synthetic_detections(width, height)
+        # Static: drawing is timed without loading a model
+        return lambda: YOLODetector.draw_detections(frames[0], detections)
+
+    def _bench_gui_convert(self, frames):
+        try:
+            from main_gui import frame_to_display_image
+        except ImportError as e:
+            raise RuntimeError(f"GUI unavailable: {e}")
+        # Typical canvas size of the main window
+        return lambda: frame_to_display_image(frames[0], (960, 540))
+
+    def _bench_yolo_detect(self, frames):
+        detector = self._get_processor().yolo_detector
+        return lambda: detector.detect(frames[len(frames) // 2])
+
+    def _run_loop(self, name, video_path):
+        """Time a whole processing pass over the synthetic video"""
+        processor = self._get_processor()
+        run = (processor.process_video_two_stage if name == 'two_stage_loop'
+               else processor.process_video_full_yolo)
+
+        def run_once():
+            # The result's lazy frame sequence holds the video open
+            run(video_path)['frames'].reader.close()
+
+        result = time_call(run_once, self.loop_repeats, warmup=0)
+        result['per_frame_ms'] = result['median_ms'] / self.loop_frames
+        return result
+
+    def run(self, progress=print):
+        """
+        Run the selected benchmarks
+
+        Args:
+            progress: Called with one line per finished benchmark (None = silent)
+
+        Returns:
+            dict mapping "<benchmark>@<width>x<height>" to timing dicts
+        """
+        results = {}
+        self.skipped = {}
+        for width, height in self.resolutions:
+            frames = synthetic_frames(width, height)
+            video_path = None
+            try:
+                for name in self.BENCHMARKS:
+                    if name not in self.only:
+                        continue
+                    key = f"{name}@{width}x{height}"
+                    try:
+                        if name.endswith('_loop'):
+                            if video_path is None:
+                                fd, video_path = tempfile.mkstemp(suffix='.mp4')
+                                os.close(fd)
+                                write_synthetic_video(video_path, width, height, self.loop_frames)
+                            results[key] = self._run_loop(name, video_path)
+                        else:
+                            fn = getattr(self, f"_bench_{name}")(frames)
+                            results[key] = time_call(fn, self.repeats)
+                    except RuntimeError as e:
+                        self.skipped[key] = str(e)
+                        if progress:
+                            progress(f"  {key:32} skipped ({e})")
+                        continue
+                    if progress:
+                        progress(f"  {key:32} {results[key]['median_ms']:10.3f} ms")
+            finally:
+                if video_path is not None:
+                    os.remove(video_path)
+        return results
+
+
+def save_baseline(results, path=None):
+    """
+    Store results as this machine's baseline
+
+    Returns:
+        Path written
+    """
+    path = path or baseline_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'machine': machine_id(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results,
+        }, f, indent=2)
+    return path
+
+
+def load_baseline(path=None):
+    """Load a stored baseline, or None if this machine has none"""
+    path = path or baseline_path()
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=None, min_delta_ms=None):
+    """
+    Compare results with a baseline
+
+    Args:
+        results: Output of BenchmarkSuite.run()
+        baseline: Baseline dict (its 'results') or loaded baseline file
+        tolerance: Allowed relative slowdown of the median (default: BENCHMARK_CONFIG)
+        min_delta_ms: Absolute changes below this are treated as noise
+
+    Returns:
+        List of dicts (name, baseline_ms, current_ms, change) for benchmarks
+        slower than the tolerance allows, worst first
+    """
+    tolerance = BENCHMARK_CONFIG['tolerance'] if tolerance is None else tolerance
+    min_delta_ms = BENCHMARK_CONFIG['min_delta_ms'] if min_delta_ms is None else min_delta_ms
+    reference = baseline.get('results', baseline)
+    regressions = []
+    for name, current in results.items():
+        if name not in reference:
+            continue
+        base_ms = reference[name]['median_ms']
+        current_ms = current['median_ms']
+        if current_ms - base_ms < min_delta_ms or base_ms <= 0:
+            continue
+        change = current_ms / base_ms - 1
+        if change > tolerance:
+            regressions.append({'name': name, 'baseline_ms': base_ms,
+                                'current_ms': current_ms, 'change': change})
+    return sorted(regressions, key=lambda r: r['change'], reverse=True)
+
+
+def main():
+    """Run the suite, then save or check this machine's baseline"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks with stored baselines")
+    parser.add_argument('--save-baseline', action='store_true', help="Store results as this machine's baseline")
+    parser.add_argument('--baseline', help="Baseline file (default: <baseline_dir>/<machine>.json)")
+    parser.add_argument('--only', nargs='+', choices=BenchmarkSuite.BENCHMARKS)
+    parser.add_argument('--resolutions', nargs='+', metavar='WxH', help="e.g. 640x360 1920x1080")
+    parser.add_argument('--repeats', type=int)
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_CONFIG['tolerance'])
+    parser.add_argument('--model-size', default='n')
+    args = parser.parse_args()
+
+    resolutions = [tuple(int(v) for v in r.lower().split('x')) for r in args.resolutions] if args.resolutions else None
+    suite = BenchmarkSuite(resolutions=resolutions, repeats=args.repeats,
+                           model_size=args.model_size, only=args.only)
+    print(f"Benchmarks on {machine_id()}")
+    print("-" * 50)
+    results = suite.run()
+
+    if args.save_baseline:
+        print(f"\n✓ Baseline saved to {save_baseline(results, args.baseline)}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("\n⚠️  No baseline for this machine; run with --save-baseline first")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} (baseline from {baseline.get('created')})")
+        return 0
+    print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+    for r in regressions:
+        print(f"  {r['name']:32} {r['baseline_ms']:.3f} -> {r['current_ms']:.3f} ms ({r['change']:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
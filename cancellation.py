@@ -0,0 +1,75 @@
+"""
+Cancellation Module
+Cooperative cancellation token shared between a controller and processing loops
+"""
+
+import threading
+
+
+class CancellationToken:
+    """
+    Thread-safe flag that processing loops check between frames.
+
+    The controller (GUI stop button, job service, runtime stop()) calls
+    cancel(); the loop notices it at its next check, stops, releases its
+    handles and returns partial results marked 'cancelled'.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    def cancel(self, reason=None):
+        """
+        Request cancellation (idempotent)
+
+        Args:
+            reason: Optional human-readable reason kept for reporting
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """
+        Call a function once on cancellation, from the cancelling thread
+        (immediately if already cancelled)
+
+        Args:
+            callback: Callable taking no arguments
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        """Forget a callback added with add_callback (no-op if already called)"""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    @property
+    def cancelled(self):
+        """Whether cancellation has been requested"""
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Block until cancelled or the timeout expires
+
+        Args:
+            timeout: Seconds to wait (None = forever)
+
+        Returns:
+            True if cancelled
+        """
+        return self._event.wait(timeout)
@@ -3,12 +3,33 @@ Configuration Module
 Centralized configuration for all system parameters
 """
 
+import json
+import os
+
 # Frame Difference Detection Parameters
 FRAME_DIFF_CONFIG = {
     'threshold': 7000,          # Pixel count threshold to trigger detection
     'blur_kernel': (21, 21),    # Gaussian blur kernel size
     'diff_threshold': 30,       # Threshold for binary difference map
-    'enabled': True             # Enable frame difference detection
+    'enabled': True,            # Enable frame difference detection
+    'motion_compensation': False,  # Cancel global camera motion (pan/shake) before differencing
+    'motion_model': 'affine',   # 'affine' (shift/rotate/zoom) or 'homography'
+    'motion_scale': 0.25,       # Downscale factor for motion estimation
+    'motion_max_features': 200, # Corners tracked for motion estimation
+    'lighting_mode': 'off'      # Illumination rejection: 'off', 'normalize', 'gradient', 'global_shift'
+}
+
+# Stage-1 Trigger Hysteresis Parameters
+# Enabled by default, which changes what reaches YOLO compared with the raw
+# per-frame check: with min_on_frames=2 a burst of motion lasting a single
+# frame never starts an event. Set 'enabled': False for the old behaviour.
+TRIGGER_CONFIG = {
+    'enabled': True,            # Use hysteresis instead of the raw per-frame boolean
+    'on_threshold': None,       # Diff count to exceed to arm the trigger (None = frame diff threshold)
+    'off_threshold_ratio': 0.6, # Event closes at or below on_threshold * ratio
+    'min_on_frames': 2,         # Consecutive armed frames required to start an event
+    'hold_frames': 5,           # Quiet frames tolerated before an event ends
+    'yolo_interval': 1          # Run YOLO every N frames inside an event
 }
 
 # YOLO Detection Parameters
@@ -17,7 +38,13 @@ YOLO_CONFIG = {
     'confidence': 0.5,          # Confidence threshold for detections
     'iou': 0.45,               # IoU threshold for NMS
     'device': '0',             # Device: '0' for GPU, 'cpu' for CPU
-    'verbose': False           # Verbose output
+    'verbose': False,          # Verbose output
+    'model_cache_mb': 1024,    # Memory budget of the shared model cache (LRU eviction beyond it)
+    'model_instances': 2,      # Instances per cached model, so concurrent workers don't wait on one
+    'cascade': False,          # Run model_size first, escalate uncertain frames to cascade_model_size
+    'cascade_model_size': 's', # Escalation model
+    'cascade_band': (0.25, 0.6),  # First-stage confidences in this range count as uncertain
+    'cascade_min_area': 0.002  # Boxes smaller than this fraction of the frame also escalate
 }
 
 # Video Processing Parameters
@@ -25,6 +52,50 @@ VIDEO_PROCESSING_CONFIG = {
     'max_frames': None,         # Maximum frames to process (None = all)
     'skip_frames': 0,          # Number of frames to skip at start
     'output_resolution': (640, 480),  # Output resolution for display
+    'frame_stride': 1,          # Analyze every Nth frame (others are grabbed, not decoded)
+    'analysis_fps': None,       # Target analysis rate; overrides frame_stride when set
+    'decoder': 'auto',          # 'auto' (PyAV when installed), 'opencv' or 'pyav'
+    'decoder_threads': 0,       # Decoder threads (0 = backend default)
+    'seek_grab_limit': 120,     # OpenCV: seek up to this many frames ahead by grabbing
+    'thumbnails': True,         # Build a thumbnail strip during the two-stage pass
+    'thumbnail_interval': 5,    # Keep every Nth analyzed frame
+    'thumbnail_width': 160,     # Thumbnail width in pixels (aspect ratio kept)
+    'thumbnail_max_count': 2000,  # Widen the interval on long videos to stay under this
+    'thumbnail_memmap_mb': 256, # Back larger strips with a temporary file
+}
+
+# Throughput Governor Parameters (adaptive quality to hold a processing fps)
+GOVERNOR_CONFIG = {
+    'enabled': False,           # Adapt settings during process_video_two_stage
+    'target_fps': 15,           # Processing rate to hold
+    'window': 30,               # Frames in the rolling measurement window
+    'adjust_every': 15,         # Minimum frames between adjustments
+    'headroom': 1.3,            # Recover quality above target_fps * headroom
+    'levels': [                 # Level 0 = configured settings, higher = faster
+        {'threshold_scale': 1.0, 'yolo_interval': 1, 'imgsz': None, 'model_size': None},
+        {'threshold_scale': 1.5, 'yolo_interval': 2, 'imgsz': None, 'model_size': None},
+        {'threshold_scale': 2.0, 'yolo_interval': 3, 'imgsz': 480, 'model_size': None},
+        {'threshold_scale': 3.0, 'yolo_interval': 5, 'imgsz': 320, 'model_size': 'n'},
+    ]
+}
+
+# Multi-Stream Runtime Parameters
+MULTI_STREAM_CONFIG = {
+    'max_batch_size': 8,        # Maximum frames per shared YOLO call
+    'max_batch_wait': 0.02,     # Seconds to wait for a fuller batch
+    'max_latency': 1.0,         # Seconds a triggered frame may wait before it is dropped
+    'max_pending_per_stream': 4, # Per-stream queue bound (oldest dropped when full)
+    'realtime': True            # Pace file sources at native fps
+}
+
+# Local Job Service Parameters
+JOB_SERVICE_CONFIG = {
+    'host': '127.0.0.1',        # Loopback only
+    'port': 8765,
+    'workers': 1,               # Concurrent jobs (one VideoProcessor each; see YOLO model_instances)
+    'max_replay_events': 1000,  # Frame/progress events kept per job for late subscribers
+    'max_finished_jobs': 100,   # Finished jobs kept for GET /jobs before the oldest are dropped
+    'output_dir': 'job_outputs' # Job outputs must lie inside this folder; relative to this file
 }
 
 # GUI Parameters
@@ -34,6 +105,8 @@ GUI_CONFIG = {
     'video_display_width': 640,
     'video_display_height': 480,
     'playback_fps': 30,
+    'ui_tick_ms': 50,           # Interval at which worker updates are applied to the UI
+    'scrub_settle_ms': 150,     # Load the full frame after the slider rests this long
     'theme': 'default'
 }
 
@@ -41,9 +114,50 @@ GUI_CONFIG = {
 PERFORMANCE_CONFIG = {
     'collect_metrics': True,    # Collect detailed timing metrics
     'log_level': 'INFO',       # Logging level
-    'save_results': False      # Save results to file
+    'save_results': False,     # Save results to file
+    'profile_memory': False,   # Track peak RSS / tracemalloc per run and stage (slower)
+    'baseline_mode': 'full',   # Speedup baseline: 'full' YOLO pass or 'sampled' estimate (opt-in)
+    'baseline_samples': 60,    # Frames timed by the sampled baseline
+    'baseline_strata': 10,     # Equal-length segments the sample is spread over
+    'baseline_confidence': 0.95  # Confidence level of the reported intervals
+}
+
+# Micro-benchmark Suite (benchmarks.py)
+BENCHMARK_CONFIG = {
+    'resolutions': [(640, 360), (1280, 720), (1920, 1080)],
+    'repeats': 30,              # Timed calls per component benchmark
+    'loop_frames': 90,          # Frames in the synthetic video for loop benchmarks
+    'loop_repeats': 3,          # Timed runs per loop benchmark
+    'tolerance': 0.15,          # Flag a regression when the median is >15% slower
+    'min_delta_ms': 0.05,       # Ignore changes smaller than this (timer noise)
+    'baseline_dir': 'benchmark_baselines'  # One <machine>.json per host (git-ignored); relative to this file
 }
 
+# Host Tuning Profile (written by `python setup_check.py --calibrate`)
+TUNING_CONFIG = {
+    'profile_path': 'tuning_profile.json',  # Relative paths resolve next to this file
+    'load_on_startup': True,    # Apply the profile when config is imported
+    'latency_budget_ms': 100,   # Largest model/imgsz whose inference fits this is chosen
+    'model_sizes': ['n', 's', 'm'],  # Models timed during calibration
+    'imgsz_candidates': [640, 480, 320],  # Working resolutions tried for inference
+    'batch_sizes': [1, 2, 4, 8],  # Multi-stream batch sizes tried
+    'stage1_resolutions': [(640, 360), (1280, 720), (1920, 1080)]
+}
+
+# Settings measured on this host (empty without a profile); updated in place
+TUNING_PROFILE = {}
+
+# Region-of-interest / Ignore Masks (edited in the GUI)
+ROI_CONFIG = {
+    'masks_path': 'roi_masks.json',  # Saved masks (per machine, git-ignored); relative to this file
+    'crop_stage2': True,        # Run YOLO on the included area's bounding box
+    'crop_max_area': 0.8,       # Skip cropping when the box still covers more of the frame
+    'crop_padding': 0.05        # Context kept around the box (fraction of frame size)
+}
+
+# Saved masks keyed by absolute video path or camera source (see roi_mask.mask_key); updated in place
+ROI_MASKS = {}
+
 # Advanced Options
 ADVANCED_CONFIG = {
     'use_gpu': True,           # Use GPU if available
@@ -98,10 +212,17 @@ class Config:
         """Get all configuration"""
         return {
             'frame_diff': FRAME_DIFF_CONFIG,
+            'trigger': TRIGGER_CONFIG,
             'yolo': YOLO_CONFIG,
             'video_processing': VIDEO_PROCESSING_CONFIG,
+            'governor': GOVERNOR_CONFIG,
+            'multi_stream': MULTI_STREAM_CONFIG,
+            'job_service': JOB_SERVICE_CONFIG,
             'gui': GUI_CONFIG,
             'performance': PERFORMANCE_CONFIG,
+            'benchmark': BENCHMARK_CONFIG,
+            'tuning': TUNING_CONFIG,
+            'roi': ROI_CONFIG,
             'advanced': ADVANCED_CONFIG
         }
 
@@ -126,6 +247,13 @@ PRESETS = {
         'yolo_model_size': 's',
         'yolo_confidence': 0.4
     },
+    'cascade': {
+        'description': 'Nano model first, small model on uncertain frames',
+        'frame_diff_threshold': 5000,
+        'yolo_model_size': 'n',
+        'yolo_confidence': 0.5,
+        'yolo_cascade': True
+    },
     'realtime': {
         'description': 'Real-time processing optimization',
         'frame_diff_threshold': 2000,
@@ -144,6 +272,7 @@ def apply_preset(preset_name):
     FRAME_DIFF_CONFIG['threshold'] = preset['frame_diff_threshold']
     YOLO_CONFIG['model_size'] = preset['yolo_model_size']
     YOLO_CONFIG['confidence'] = preset['yolo_confidence']
+    YOLO_CONFIG['cascade'] = preset.get('yolo_cascade', False)
     
     print(f"✓ Applied preset: {preset_name} - {preset['description']}")
 
@@ -155,6 +284,116 @@ def get_preset_description(preset_name):
     return "Unknown preset"
 
 
+def _resolve_path(path):
+    """Resolve relative data file paths next to this file"""
+    return path if os.path.isabs(path) else os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+def benchmark_baseline_dir(path=None):
+    """Resolve the folder holding per-machine benchmark baselines"""
+    return _resolve_path(path or BENCHMARK_CONFIG['baseline_dir'])
+
+
+def job_output_dir(path=None):
+    """Resolve the folder job service outputs are confined to"""
+    return _resolve_path(path or JOB_SERVICE_CONFIG['output_dir'])
+
+
+def tuning_profile_path(path=None):
+    """Resolve the tuning profile location"""
+    return _resolve_path(path or TUNING_CONFIG['profile_path'])
+
+
+def apply_tuning_profile(settings):
+    """
+    Apply measured settings to the configuration
+    
+    Model size, decoder and batch size go into the config dicts; backend,
+    device, imgsz and thread counts are read from TUNING_PROFILE by
+    VideoProcessor when it creates its detector.
+    
+    Args:
+        settings: dict with any of model_size, backend, device, imgsz,
+                  decoder, decoder_threads, cv_threads, torch_threads, batch_size
+    """
+    TUNING_PROFILE.clear()
+    TUNING_PROFILE.update(settings)
+    if settings.get('model_size'):
+        YOLO_CONFIG['model_size'] = settings['model_size']
+    if settings.get('decoder'):
+        VIDEO_PROCESSING_CONFIG['decoder'] = settings['decoder']
+    if settings.get('decoder_threads') is not None:
+        VIDEO_PROCESSING_CONFIG['decoder_threads'] = settings['decoder_threads']
+    if settings.get('batch_size'):
+        MULTI_STREAM_CONFIG['max_batch_size'] = settings['batch_size']
+
+
+def load_tuning_profile(path=None):
+    """
+    Load and apply a tuning profile if one exists
+    
+    Args:
+        path: Profile file (default: TUNING_CONFIG['profile_path'])
+        
+    Returns:
+        The applied settings, or None when there is no readable profile
+    """
+    path = tuning_profile_path(path)
+    try:
+        with open(path) as f:
+            settings = json.load(f).get('settings', {})
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"⚠️  Ignoring unreadable tuning profile {path}: {e}")
+        return None
+    apply_tuning_profile(settings)
+    return settings
+
+
+def load_roi_masks(path=None):
+    """
+    Load saved ROI masks into ROI_MASKS
+    
+    Returns:
+        ROI_MASKS
+    """
+    path = _resolve_path(path or ROI_CONFIG['masks_path'])
+    try:
+        with open(path) as f:
+            masks = json.load(f)
+    except FileNotFoundError:
+        masks = {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable ROI masks {path}: {e}")
+        masks = {}
+    ROI_MASKS.clear()
+    ROI_MASKS.update(masks)
+    return ROI_MASKS
+
+
+def save_roi_mask(key, mask):
+    """
+    Save (or with mask=None remove) the ROI mask of a video or camera
+    
+    Args:
+        key: roi_mask.mask_key() of the source: absolute video path, device
+             index or stream URL (older files may hold bare file names)
+        mask: {'include': [...], 'exclude': [...]} polygons in normalized coordinates
+    """
+    if mask:
+        ROI_MASKS[key] = mask
+    else:
+        ROI_MASKS.pop(key, None)
+    with open(_resolve_path(ROI_CONFIG['masks_path']), 'w') as f:
+        json.dump(ROI_MASKS, f, indent=2)
+
+
+if TUNING_CONFIG['load_on_startup']:
+    load_tuning_profile()
+load_roi_masks()
+
+
 # Example usage
 if __name__ == "__main__":
     print("Configuration Module")
@@ -167,6 +406,8 @@ if __name__ == "__main__":
         for key, value in values.items():
             print(f"  {key}: {value}")
     
+    print(f"\nTuning profile: {TUNING_PROFILE or '(none, run setup_check.py --calibrate)'}")
+    
     print("\n\nAvailable Presets:")
     for name, preset in PRESETS.items():
         print(f"  {name}: {preset['description']}")
@@ -4,6 +4,7 @@ Shows example usage of the video processor without GUI
 """
 
 import cv2
+import numpy as np
 import os
 from video_processor import VideoProcessor
 from frame_difference import FrameDifferenceDetector
@@ -27,7 +28,7 @@ def create_sample_video(output_path='sample_video.avi', duration_seconds=5, fps=
     
     for frame_num in range(total_frames):
         # Create frame
-        frame = (255 * ((frame_num // 30) % 2)).astype('uint8')  # Alternate between black and white
+        frame = np.full((height, width), 255 * ((frame_num // 30) % 2), dtype=np.uint8)  # Alternate between black and white
         frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
         
         # Add moving rectangle for some frames (motion)
@@ -183,6 +184,46 @@ def demo_two_stage_processing():
     os.remove(video_path)
 
 
+def demo_memory_profile():
+    """
+    Demo 4: Peak-memory report for processing and compression
+    Peak memory must stay roughly flat as the video gets longer
+    (tests/test_memory.py asserts the bound with a stub detector)
+    """
+    print("\n" + "=" * 60)
+    print("DEMO 4: Peak Memory vs. Video Length")
+    print("=" * 60)
+    
+    short_path = create_sample_video('demo_memory_short.avi', duration_seconds=2)
+    long_path = create_sample_video('demo_memory_long.avi', duration_seconds=10)
+    output_path = 'demo_memory_output.mp4'
+    
+    processor = VideoProcessor(yolo_model_size='n')
+    peaks = {}
+    for label, path in (('short', short_path), ('long', long_path)):
+        two_stage = processor.process_video_two_stage(path, profile_memory=True)['memory']
+        compression = processor.compress_video_smart(path, output_path, profile_memory=True)['memory']
+        peaks[label] = (two_stage['peak_traced_mb'], compression['peak_traced_mb'])
+        print(f"  {label:5}: two-stage peak {two_stage['peak_traced_mb']:.2f} MB, "
+              f"compression peak {compression['peak_traced_mb']:.2f} MB, "
+              f"RSS peak {two_stage['peak_rss_mb']:.1f} MB")
+    
+    # 5x longer video may only add a small constant, never a per-frame cost
+    all_bounded = True
+    for name, short_peak, long_peak in zip(('two-stage', 'compression'), peaks['short'], peaks['long']):
+        bounded = long_peak <= short_peak * 1.5 + 5
+        all_bounded = all_bounded and bounded
+        print(f"  {'✓' if bounded else '✗'} {name} peak memory bounded: {short_peak:.2f} MB -> {long_peak:.2f} MB")
+    
+    # Cleanup
+    for path in (short_path, long_path, output_path):
+        if os.path.exists(path):
+            os.remove(path)
+    
+    if not all_bounded:
+        raise RuntimeError("Peak memory grows with video length")
+
+
 def main():
     """Run all demos"""
     print("""
@@ -196,6 +237,7 @@ def main():
         demo_frame_difference()
         demo_yolo_detection()
         demo_two_stage_processing()
+        demo_memory_profile()
         
         print("\n" + "=" * 60)
         print("✅ All demos completed successfully!")
@@ -0,0 +1,196 @@
+"""
+Detection Index Module
+Inverted index over processed detections for class and time-range queries
+"""
+
+import re
+
+import numpy as np
+
+
+class DetectionIndex:
+    """
+    Per-class sorted frame lists and merged object-presence segments.
+
+    Frame numbers are source frame numbers, so queries work the same whether
+    or not the video was processed with a frame stride.
+    """
+
+    def __init__(self, store, frame_indices=None, fps=30, max_gap=None):
+        """
+        Build the index
+
+        Args:
+            store: DetectionStore with one entry per processed frame
+            frame_indices: Source frame number of each store entry (default: identity)
+            fps: Source video frame rate, used to convert times to frames
+            max_gap: Largest gap in source frames still merged into one segment
+                     (default: one second)
+        """
+        self.fps = fps if fps and fps > 0 else 30
+        self.max_gap = max_gap if max_gap is not None else int(round(self.fps))
+        self.names = dict(store.names)
+        self._class_by_name = {name: class_id for class_id, name in self.names.items()}
+
+        if frame_indices is None:
+            frame_indices = np.arange(len(store), dtype=np.int64)
+        frame_indices = np.asarray(frame_indices, dtype=np.int64)
+        self.frame_indices = frame_indices
+
+        # Source frame of every detection row, grouped by class in one sort
+        det_frames = frame_indices[store.frame_of_detection()]
+        class_ids = store.class_ids
+        order = np.lexsort((det_frames, class_ids))
+        sorted_classes = class_ids[order]
+        sorted_frames = det_frames[order]
+        bounds = np.flatnonzero(np.diff(sorted_classes)) + 1
+        starts = np.concatenate(([0], bounds)) if len(sorted_classes) else np.zeros(0, dtype=np.int64)
+        ends = np.concatenate((bounds, [len(sorted_classes)])) if len(sorted_classes) else np.zeros(0, dtype=np.int64)
+
+        self._frames = {}
+        self._segments = {}
+        for start, end in zip(starts, ends):
+            class_id = int(sorted_classes[start])
+            frames = np.unique(sorted_frames[start:end])
+            self._frames[class_id] = frames
+            self._segments[class_id] = self._merge_segments(frames)
+
+    @classmethod
+    def from_result(cls, result, max_gap=None):
+        """
+        Build the index from a process_video_two_stage/full_yolo result dict
+
+        Args:
+            result: Processing result with 'yolo_results' and 'fps'
+            max_gap: Largest gap in source frames merged into one segment
+
+        Returns:
+            DetectionIndex
+        """
+        return cls(result['yolo_results'], result.get('frame_indices'),
+                   result.get('fps', 30), max_gap=max_gap)
+
+    def _merge_segments(self, frames):
+        """Merge sorted frame numbers into (start, end) presence intervals"""
+        if len(frames) == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        breaks = np.flatnonzero(np.diff(frames) > self.max_gap)
+        seg_starts = np.concatenate(([frames[0]], frames[breaks + 1]))
+        seg_ends = np.concatenate((frames[breaks], [frames[-1]]))
+        return np.stack((seg_starts, seg_ends), axis=1)
+
+    def class_names(self):
+        """Names of classes that have at least one detection"""
+        return sorted(self.names.get(c, str(c)) for c in self._frames)
+
+    def _class_id(self, class_name):
+        """Resolve a class name (case-insensitive) to its id"""
+        if class_name in self._class_by_name:
+            return self._class_by_name[class_name]
+        lowered = class_name.lower()
+        for name, class_id in self._class_by_name.items():
+            if name.lower() == lowered:
+                return class_id
+        return None
+
+    def _frame_range(self, start_time, end_time):
+        """Convert a time range in seconds to an inclusive source frame range"""
+        start = int(np.floor(start_time * self.fps)) if start_time is not None else 0
+        end = int(np.ceil(end_time * self.fps)) if end_time is not None else np.iinfo(np.int64).max
+        return start, end
+
+    def query(self, class_name, start_time=None, end_time=None):
+        """
+        Find source frames containing a class within a time range
+
+        Args:
+            class_name: Class name, e.g. 'person'
+            start_time: Range start in seconds (None = beginning)
+            end_time: Range end in seconds (None = end of video)
+
+        Returns:
+            sorted numpy array of source frame numbers
+        """
+        class_id = self._class_id(class_name)
+        if class_id is None or class_id not in self._frames:
+            return np.zeros(0, dtype=np.int64)
+        frames = self._frames[class_id]
+        start, end = self._frame_range(start_time, end_time)
+        lo = np.searchsorted(frames, start, side='left')
+        hi = np.searchsorted(frames, end, side='right')
+        return frames[lo:hi]
+
+    def segments(self, class_name, start_time=None, end_time=None):
+        """
+        Find object-presence segments of a class overlapping a time range
+
+        Args:
+            class_name: Class name, e.g. 'person'
+            start_time: Range start in seconds (None = beginning)
+            end_time: Range end in seconds (None = end of video)
+
+        Returns:
+            (N, 2) numpy array of [start_frame, end_frame] source frame ranges,
+            clipped to the queried range
+        """
+        class_id = self._class_id(class_name)
+        if class_id is None or class_id not in self._segments:
+            return np.zeros((0, 2), dtype=np.int64)
+        segments = self._segments[class_id]
+        start, end = self._frame_range(start_time, end_time)
+        # Segments are sorted and disjoint, so both ends are monotonic
+        lo = np.searchsorted(segments[:, 1], start, side='left')
+        hi = np.searchsorted(segments[:, 0], end, side='right')
+        selected = segments[lo:hi].copy()
+        if len(selected):
+            selected[0, 0] = max(selected[0, 0], start)
+            selected[-1, 1] = min(selected[-1, 1], end)
+        return selected
+
+    def entry_index(self, source_frame):
+        """
+        Map a source frame number to the nearest processed entry at or after it
+
+        Args:
+            source_frame: Source frame number
+
+        Returns:
+            index into the per-frame result lists
+        """
+        index = int(np.searchsorted(self.frame_indices, source_frame, side='left'))
+        return min(index, len(self.frame_indices) - 1)
+
+
+def parse_time(text):
+    """
+    Parse '90', '1:30' or '1:02:03' into seconds
+
+    Args:
+        text: Time string
+
+    Returns:
+        seconds as float
+    """
+    seconds = 0.0
+    for part in text.strip().split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_query(text):
+    """
+    Parse a search string such as 'person 12:00-15:00', 'car 30-' or 'dog'
+
+    Args:
+        text: Query string: class name, optionally followed by a time range
+
+    Returns:
+        (class_name, start_time, end_time) with None for open range ends
+    """
+    match = re.match(r'^\s*(.+?)(?:\s+([\d:.]*)\s*-\s*([\d:.]*))?\s*$', text)
+    if not match:
+        raise ValueError(f"Invalid query: {text}")
+    class_name, start, end = match.groups()
+    start_time = parse_time(start) if start else None
+    end_time = parse_time(end) if end else None
+    return class_name, start_time, end_time
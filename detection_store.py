@@ -0,0 +1,171 @@
+"""
+Detection Store Module
+Columnar per-video detection storage with CSR-style frame offsets
+"""
+
+import json
+
+import numpy as np
+
+from detections import Detections
+
+
+class DetectionStore:
+    """
+    Append-only store of detections for every processed frame of a video.
+
+    All detections live in three concatenated arrays (class ids, confidences,
+    boxes); frame i owns rows offsets[i]:offsets[i + 1]. Indexing a frame
+    returns a Detections view over those rows in O(1), so the store can be
+    used wherever a list of per-frame detections was expected.
+    """
+
+    def __init__(self, names=None, initial_capacity=1024, initial_frames=1024):
+        """
+        Initialize an empty store
+
+        Args:
+            names: Mapping from class id to class name
+            initial_capacity: Detections preallocated before growing
+            initial_frames: Frames preallocated before growing
+        """
+        self.names = dict(names) if names else {}
+        capacity = max(1, initial_capacity)
+        self._class_ids = np.zeros(capacity, dtype=np.int32)
+        self._confidences = np.zeros(capacity, dtype=np.float32)
+        self._boxes = np.zeros((capacity, 4), dtype=np.int32)
+        self._offsets = np.zeros(max(1, initial_frames) + 1, dtype=np.int64)
+        self._num_frames = 0
+        self._num_detections = 0
+
+    def __len__(self):
+        return self._num_frames
+
+    def __getitem__(self, frame_index):
+        if frame_index < 0:
+            frame_index += self._num_frames
+        if not 0 <= frame_index < self._num_frames:
+            raise IndexError("frame index out of range")
+        start = self._offsets[frame_index]
+        end = self._offsets[frame_index + 1]
+        return Detections(self._class_ids[start:end], self._confidences[start:end],
+                          self._boxes[start:end], self.names)
+
+    def __iter__(self):
+        for frame_index in range(self._num_frames):
+            yield self[frame_index]
+
+    def _grow_detections(self, needed):
+        """Grow the detection arrays to hold at least `needed` rows"""
+        capacity = len(self._class_ids)
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_class_ids', '_confidences', '_boxes'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._num_detections] = old[:self._num_detections]
+            setattr(self, name, new)
+
+    def _grow_frames(self):
+        """Double the frame offset array"""
+        new = np.zeros(len(self._offsets) * 2 - 1, dtype=np.int64)
+        new[:self._num_frames + 1] = self._offsets[:self._num_frames + 1]
+        self._offsets = new
+
+    def append(self, detections):
+        """
+        Append the detections of the next frame
+
+        Args:
+            detections: Detections of one frame (may be empty)
+        """
+        count = len(detections)
+        end = self._num_detections + count
+        if end > len(self._class_ids):
+            self._grow_detections(end)
+        if self._num_frames + 2 > len(self._offsets):
+            self._grow_frames()
+
+        if count:
+            self._class_ids[self._num_detections:end] = detections.class_ids
+            self._confidences[self._num_detections:end] = detections.confidences
+            self._boxes[self._num_detections:end] = detections.boxes
+        if detections.names and not self.names:
+            self.names = dict(detections.names)
+
+        self._num_detections = end
+        self._num_frames += 1
+        self._offsets[self._num_frames] = end
+
+    @property
+    def offsets(self):
+        """Frame offsets (length = frames + 1) into the detection arrays"""
+        return self._offsets[:self._num_frames + 1]
+
+    @property
+    def class_ids(self):
+        """Class ids of all detections"""
+        return self._class_ids[:self._num_detections]
+
+    @property
+    def confidences(self):
+        """Confidences of all detections"""
+        return self._confidences[:self._num_detections]
+
+    @property
+    def boxes(self):
+        """Boxes (x1, y1, x2, y2) of all detections"""
+        return self._boxes[:self._num_detections]
+
+    @property
+    def total_detections(self):
+        """Number of detections over all frames"""
+        return self._num_detections
+
+    def counts(self):
+        """Number of detections per frame"""
+        return np.diff(self.offsets)
+
+    def frame_of_detection(self):
+        """Frame index of every detection row"""
+        return np.repeat(np.arange(self._num_frames, dtype=np.int64), self.counts())
+
+    def save(self, path):
+        """
+        Save the store as an uncompressed .npz archive
+
+        Args:
+            path: Output file path
+        """
+        np.savez(
+            path,
+            class_ids=self.class_ids,
+            confidences=self.confidences,
+            boxes=self.boxes,
+            offsets=self.offsets,
+            names=np.array(json.dumps({str(k): v for k, v in self.names.items()}))
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a store written by save()
+
+        Args:
+            path: .npz file path
+
+        Returns:
+            DetectionStore
+        """
+        with np.load(path) as data:
+            names = {int(k): v for k, v in json.loads(str(data['names'])).items()}
+            offsets = data['offsets']
+            store = cls(names=names, initial_capacity=max(1, len(data['class_ids'])),
+                        initial_frames=max(1, len(offsets) - 1))
+            store._num_detections = len(data['class_ids'])
+            store._num_frames = len(offsets) - 1
+            store._class_ids[:store._num_detections] = data['class_ids']
+            store._confidences[:store._num_detections] = data['confidences']
+            store._boxes[:store._num_detections] = data['boxes']
+            store._offsets[:len(offsets)] = offsets
+        return store
@@ -0,0 +1,119 @@
+"""
+Detections Module
+Struct-of-arrays container for YOLO detections
+"""
+
+import numpy as np
+
+
+class Detections:
+    """
+    Detections of one frame stored as contiguous numpy arrays.
+
+    Behaves like the list of dicts that YOLODetector.detect used to return:
+    len(), truth testing, iteration and integer indexing yield
+    {'class', 'confidence', 'box'} dicts built on demand. Bulk code should use
+    the arrays directly, or index with a boolean mask / slice to filter.
+    """
+
+    def __init__(self, class_ids=None, confidences=None, boxes=None, names=None):
+        """
+        Initialize the container
+
+        Args:
+            class_ids: (N,) class ids
+            confidences: (N,) confidence scores
+            boxes: (N, 4) boxes as x1, y1, x2, y2 pixel coordinates
+            names: Mapping from class id to class name
+        """
+        self.class_ids = np.asarray(class_ids if class_ids is not None else [], dtype=np.int32).reshape(-1)
+        self.confidences = np.asarray(confidences if confidences is not None else [], dtype=np.float32).reshape(-1)
+        self.boxes = np.asarray(boxes if boxes is not None else np.zeros((0, 4)), dtype=np.int32).reshape(-1, 4)
+        self.names = names if names is not None else {}
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Convert ultralytics results to a single Detections in one shot per tensor
+
+        Args:
+            results: Iterable of ultralytics Results for one frame
+
+        Returns:
+            Detections
+        """
+        class_ids, confidences, boxes = [], [], []
+        names = {}
+        for result in results:
+            names = result.names
+            result_boxes = result.boxes
+            if result_boxes is None or len(result_boxes) == 0:
+                continue
+            class_ids.append(result_boxes.cls.cpu().numpy())
+            confidences.append(result_boxes.conf.cpu().numpy())
+            boxes.append(result_boxes.xyxy.cpu().numpy())
+        if not class_ids:
+            return cls(names=names)
+        return cls(np.concatenate(class_ids), np.concatenate(confidences),
+                   np.concatenate(boxes), names)
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def __bool__(self):
+        return len(self.class_ids) > 0
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._as_dict(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("detection index out of range")
+            return self._as_dict(index)
+        return self.filter(index)
+
+    def __repr__(self):
+        return f"Detections({len(self)} objects)"
+
+    def _as_dict(self, i):
+        """Build the legacy dict view of one detection"""
+        x1, y1, x2, y2 = self.boxes[i].tolist()
+        return {
+            'class': self.class_name(self.class_ids[i]),
+            'confidence': float(self.confidences[i]),
+            'box': (x1, y1, x2, y2)
+        }
+
+    def class_name(self, class_id):
+        """Get the name of a class id"""
+        return self.names.get(int(class_id), str(int(class_id)))
+
+    @property
+    def class_names(self):
+        """Class name of every detection"""
+        return [self.class_name(c) for c in self.class_ids]
+
+    def filter(self, mask):
+        """
+        Select detections with a boolean mask, index array or slice
+
+        Args:
+            mask: Anything accepted by numpy indexing on the first axis
+
+        Returns:
+            Detections with the selected entries
+        """
+        return Detections(self.class_ids[mask], self.confidences[mask], self.boxes[mask], self.names)
+
+    def to_dicts(self):
+        """Get detections as a list of {'class', 'confidence', 'box'} dicts"""
+        return list(self)
+
+    def to_tuples(self):
+        """Get detections as [(class_name, confidence, x1, y1, x2, y2), ...]"""
+        return [(self.class_name(c), float(conf), *box)
+                for c, conf, box in zip(self.class_ids, self.confidences, self.boxes.tolist())]
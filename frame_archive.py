@@ -0,0 +1,281 @@
+"""
+Frame Archive Module
+Random-access archive of individually encoded frames with a memory-mapped index
+"""
+
+import json
+import mmap
+import os
+
+import cv2
+import numpy as np
+
+from detections import Detections
+
+
+ARCHIVE_EXTENSION = '.frames'
+
+# Why a frame was kept (stored as a small integer in the index)
+REASONS = ('', 'KEYFRAME', 'YOLO_DETECTION')
+
+# One fixed-size index record per kept frame
+INDEX_DTYPE = np.dtype([
+    ('frame_number', '<i8'),   # Source frame number
+    ('timestamp', '<f8'),      # Seconds from the start of the source video
+    ('offset', '<i8'),         # Byte offset of the encoded image in the data file
+    ('length', '<i8'),         # Encoded image size in bytes
+    ('reason', 'u1'),          # Index into REASONS
+    ('det_offset', '<i8'),     # Byte offset of the detection records in the data file
+    ('det_count', '<i4'),      # Number of detection records
+])
+
+# Detection records stored right after each encoded image
+DETECTION_DTYPE = np.dtype([
+    ('class_id', '<i4'),
+    ('confidence', '<f4'),
+    ('box', '<i4', (4,)),
+])
+
+
+def is_archive_path(path):
+    """Whether a path names a frame archive"""
+    return str(path).lower().endswith(ARCHIVE_EXTENSION)
+
+
+def archive_files(path):
+    """
+    Get the files making up an archive
+
+    Args:
+        path: Archive data file path (*.frames)
+
+    Returns:
+        (data_path, index_path, meta_path)
+    """
+    return path, path + '.idx', path + '.json'
+
+
+class FrameArchiveWriter:
+    """
+    Append-only writer: encoded frames and their detections go to the data
+    file, one fixed-size record per frame goes to the index file
+    """
+
+    def __init__(self, path, fps, frame_size, image_format='jpg', quality=90, source=None):
+        """
+        Create a new archive
+
+        Args:
+            path: Archive data file path (*.frames)
+            fps: Source video frame rate
+            frame_size: (width, height) of the frames
+            image_format: 'jpg' or 'webp'
+            quality: Encoder quality (0-100)
+            source: Optional source video path stored in the metadata
+        """
+        if image_format not in ('jpg', 'webp'):
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.path = path
+        self.fps = fps
+        self.frame_size = tuple(frame_size)
+        self.image_format = image_format
+        self.source = source
+        quality_flag = cv2.IMWRITE_JPEG_QUALITY if image_format == 'jpg' else cv2.IMWRITE_WEBP_QUALITY
+        self._encode_params = [quality_flag, int(quality)]
+        self.names = {}
+        self.count = 0
+
+        data_path, index_path, _ = archive_files(path)
+        self._data = open(data_path, 'wb')
+        self._index = open(index_path, 'wb')
+        self._offset = 0
+
+    def append(self, frame, frame_number, timestamp, reason='', detections=None):
+        """
+        Encode and append one kept frame
+
+        Args:
+            frame: Frame (BGR image)
+            frame_number: Source frame number
+            timestamp: Seconds from the start of the source video
+            reason: One of REASONS
+            detections: Detections for this frame (optional)
+        """
+        ok, encoded = cv2.imencode('.' + self.image_format, frame, self._encode_params)
+        if not ok:
+            raise RuntimeError(f"Failed to encode frame {frame_number}")
+        image_bytes = encoded.tobytes()
+
+        records = np.zeros(len(detections) if detections is not None else 0, dtype=DETECTION_DTYPE)
+        if len(records):
+            records['class_id'] = detections.class_ids
+            records['confidence'] = detections.confidences
+            records['box'] = detections.boxes
+            self.names.update(detections.names)
+
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record['frame_number'] = frame_number
+        record['timestamp'] = timestamp
+        record['offset'] = self._offset
+        record['length'] = len(image_bytes)
+        record['reason'] = REASONS.index(reason) if reason in REASONS else 0
+        record['det_offset'] = self._offset + len(image_bytes)
+        record['det_count'] = len(records)
+
+        self._data.write(image_bytes)
+        self._data.write(records.tobytes())
+        self._index.write(record.tobytes())
+        self._offset += len(image_bytes) + records.nbytes
+        self.count += 1
+
+    def close(self):
+        """Flush data and index and write the metadata file"""
+        if self._data is None:
+            return
+        self._data.close()
+        self._index.close()
+        self._data = None
+        self._index = None
+        meta = {
+            'version': 1,
+            'fps': self.fps,
+            'width': self.frame_size[0],
+            'height': self.frame_size[1],
+            'image_format': self.image_format,
+            'frames': self.count,
+            'names': {str(k): v for k, v in self.names.items()},
+            'source': self.source,
+        }
+        with open(archive_files(self.path)[2], 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def total_size(self):
+        """Total bytes on disk of all archive files"""
+        return sum(os.path.getsize(p) for p in archive_files(self.path) if os.path.exists(p))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FrameArchiveReader:
+    """
+    Random-access reader: the index and data file are memory-mapped, so
+    seeking to any kept frame is an array lookup and only the frames that are
+    actually displayed get decoded
+    """
+
+    def __init__(self, path):
+        """
+        Open an archive
+
+        Args:
+            path: Archive data file path (*.frames)
+        """
+        self.path = path
+        data_path, index_path, meta_path = archive_files(path)
+        with open(meta_path, encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.fps = self.meta['fps']
+        self.width = self.meta['width']
+        self.height = self.meta['height']
+        self.names = {int(k): v for k, v in self.meta.get('names', {}).items()}
+
+        if os.path.getsize(index_path) > 0:
+            self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r')
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self._data_file = open(data_path, 'rb')
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(data_path) > 0 else b''
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        return self.read(i)
+
+    @property
+    def frame_numbers(self):
+        """Source frame number of every kept frame"""
+        return self.index['frame_number']
+
+    def read(self, i):
+        """
+        Decode a kept frame by position
+
+        Args:
+            i: Position in the archive (0 .. len - 1)
+
+        Returns:
+            frame (BGR image)
+        """
+        record = self.index[i]
+        start = int(record['offset'])
+        encoded = np.frombuffer(self._data, dtype=np.uint8, count=int(record['length']), offset=start)
+        return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+    def detections(self, i):
+        """
+        Get the detections stored with a kept frame
+
+        Args:
+            i: Position in the archive
+
+        Returns:
+            Detections
+        """
+        record = self.index[i]
+        count = int(record['det_count'])
+        if count == 0:
+            return Detections(names=self.names)
+        # Copy so no view outlives the memory map
+        records = np.frombuffer(self._data, dtype=DETECTION_DTYPE, count=count,
+                                offset=int(record['det_offset'])).copy()
+        return Detections(records['class_id'], records['confidence'], records['box'], self.names)
+
+    def record(self, i):
+        """
+        Get the index entry of a kept frame
+
+        Args:
+            i: Position in the archive
+
+        Returns:
+            dict with frame_number, timestamp, reason and det_count
+        """
+        record = self.index[i]
+        return {
+            'frame_number': int(record['frame_number']),
+            'timestamp': float(record['timestamp']),
+            'reason': REASONS[int(record['reason'])],
+            'det_count': int(record['det_count']),
+        }
+
+    def find(self, frame_number):
+        """
+        Find the kept frame at or before a source frame number
+
+        Args:
+            frame_number: Source frame number
+
+        Returns:
+            position in the archive, or None if no frame was kept that early
+        """
+        position = int(np.searchsorted(self.frame_numbers, frame_number, side='right')) - 1
+        return position if position >= 0 else None
+
+    def close(self):
+        """Release the memory maps"""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data_file.close()
+        self.index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -6,56 +6,255 @@ Detects scene changes between frames using frame differencing technique
 import cv2
 import numpy as np
 
+from config import FRAME_DIFF_CONFIG
+
+
+# Illumination handling for the difference image:
+#   off          - plain grayscale difference
+#   normalize    - match the previous frame's mean/contrast to the current one
+#   gradient     - compare edge strength instead of brightness
+#   global_shift - remove the frame-wide median brightness change
+LIGHTING_MODES = ('off', 'normalize', 'gradient', 'global_shift')
+
 
 class FrameDifferenceDetector:
     """
     Detects motion/changes between frames using frame differencing
     """
     
-    def __init__(self, threshold=5000, blur_kernel=(21, 21)):
+    def __init__(self, threshold=5000, blur_kernel=(21, 21), motion_compensation=None, lighting_mode=None,
+                 roi_mask=None):
         """
         Initialize the frame difference detector
         
         Args:
             threshold: Pixel count threshold to trigger motion detection
             blur_kernel: Kernel size for Gaussian blur
+            motion_compensation: Align the previous frame to the current one
+                                 before differencing, so camera pan/shake is
+                                 not counted as change
+                                 (default: FRAME_DIFF_CONFIG['motion_compensation'])
+            lighting_mode: How to ignore illumination changes (one of
+                           LIGHTING_MODES; default: FRAME_DIFF_CONFIG['lighting_mode'])
+            roi_mask: RegionMask limiting differencing to included regions
+                      (None = whole frame)
         """
         self.threshold = threshold
         self.blur_kernel = blur_kernel
         self.prev_frame = None
+        self.motion_compensation = (FRAME_DIFF_CONFIG.get('motion_compensation', False)
+                                    if motion_compensation is None else motion_compensation)
+        self.motion_model = FRAME_DIFF_CONFIG.get('motion_model', 'affine')
+        self.motion_scale = FRAME_DIFF_CONFIG.get('motion_scale', 0.25)
+        self.motion_max_features = FRAME_DIFF_CONFIG.get('motion_max_features', 200)
+        self.lighting_mode = FRAME_DIFF_CONFIG.get('lighting_mode', 'off') if lighting_mode is None else lighting_mode
+        if self.lighting_mode not in LIGHTING_MODES:
+            raise ValueError(f"Unknown lighting mode: {self.lighting_mode}")
+        self.roi_mask = roi_mask
+        # Diagnostics of the last compensated frame
+        self.last_motion = None
+        self.raw_diff_count = 0
+        self.stats = self._empty_stats()
+        
+    @staticmethod
+    def _empty_stats():
+        """Per-run Stage 1 counters"""
+        return {'frames': 0, 'triggered': 0, 'motion_compensated': 0, 'motion_suppressed': 0,
+                'lighting_suppressed': 0}
+    
+    def set_roi_mask(self, roi_mask):
+        """
+        Replace the region-of-interest mask
+        
+        Args:
+            roi_mask: RegionMask or None for the whole frame
+        """
+        self.roi_mask = roi_mask if roi_mask else None
+        # The stored frame may have been cropped to the old region
+        self.prev_frame = None
+    
+    @staticmethod
+    def _count_changed(diff):
+        """Number of pixels whose difference exceeds the binary threshold"""
+        _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(thresh)
+        
+    def estimate_motion(self, prev_gray, gray):
+        """
+        Estimate the global (camera) motion from prev_gray to gray
+        
+        Corners are tracked with pyramidal Lucas-Kanade on downscaled copies
+        and a similarity/affine transform or homography is fitted with RANSAC.
+        
+        Args:
+            prev_gray: Previous grayscale frame
+            gray: Current grayscale frame
+            
+        Returns:
+            3x3 transform in full-resolution coordinates, or None if the
+            motion could not be estimated
+        """
+        scale = self.motion_scale
+        small_prev = cv2.resize(prev_gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        points = cv2.goodFeaturesToTrack(small_prev, self.motion_max_features, 0.01, 8)
+        if points is None or len(points) < 8:
+            return None
+        tracked, status, _ = cv2.calcOpticalFlowPyrLK(small_prev, small, points, None)
+        good = status.reshape(-1) == 1
+        if good.sum() < 8:
+            return None
+        src = points[good].reshape(-1, 2)
+        dst = tracked[good].reshape(-1, 2)
+        
+        if self.motion_model == 'homography':
+            transform, _ = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+        else:
+            affine, _ = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+            transform = None if affine is None else np.vstack([affine, [0, 0, 1]])
+        if transform is None:
+            return None
+        
+        # Map the transform from downscaled to full-resolution coordinates
+        to_small = np.diag([scale, scale, 1.0])
+        return np.linalg.inv(to_small) @ transform @ to_small
+        
+    def _compensate(self, prev_blur, gray):
+        """
+        Warp the previous frame onto the current one
+        
+        Returns:
+            (aligned previous frame, mask of pixels covered by the warp) or
+            (prev_blur, None) when no motion was found
+        """
+        transform = self.estimate_motion(self.prev_frame, gray)
+        if transform is None:
+            self.last_motion = None
+            return prev_blur, None
+        self.last_motion = {
+            'dx': float(transform[0, 2]),
+            'dy': float(transform[1, 2]),
+            'rotation': float(np.degrees(np.arctan2(transform[1, 0], transform[0, 0]))),
+        }
+        height, width = gray.shape[:2]
+        if self.motion_model == 'homography':
+            aligned = cv2.warpPerspective(prev_blur, transform, (width, height))
+            valid = cv2.warpPerspective(np.full_like(prev_blur, 255), transform, (width, height))
+        else:
+            aligned = cv2.warpAffine(prev_blur, transform[:2], (width, height))
+            valid = cv2.warpAffine(np.full_like(prev_blur, 255), transform[:2], (width, height))
+        # Pixels that entered the view have no counterpart; shrink the mask past the blur edge
+        valid = cv2.erode(valid, np.ones((5, 5), np.uint8))
+        return aligned, valid
+        
+    @staticmethod
+    def _gradient_magnitude(image):
+        """Edge strength of a grayscale image (uint8)"""
+        gx = cv2.convertScaleAbs(cv2.Sobel(image, cv2.CV_16S, 1, 0))
+        gy = cv2.convertScaleAbs(cv2.Sobel(image, cv2.CV_16S, 0, 1))
+        return cv2.addWeighted(gx, 0.5, gy, 0.5, 0)
+        
+    def _lighting_diff(self, gray_blur, prev_blur, valid):
+        """
+        Difference image that ignores frame-wide illumination changes
+        
+        Args:
+            gray_blur: Current blurred grayscale frame
+            prev_blur: Previous blurred grayscale frame (already aligned)
+            valid: Mask of pixels to use for the global statistics, or None
+            
+        Returns:
+            uint8 difference image
+        """
+        if self.lighting_mode == 'normalize':
+            mean_c, std_c = cv2.meanStdDev(gray_blur, mask=valid)
+            mean_p, std_p = cv2.meanStdDev(prev_blur, mask=valid)
+            gain = float(std_c[0, 0]) / max(float(std_p[0, 0]), 1.0)
+            offset = float(mean_c[0, 0]) - gain * float(mean_p[0, 0])
+            # convertScaleAbs saturates to uint8, matching the previous frame's exposure to the current one
+            return cv2.absdiff(gray_blur, cv2.convertScaleAbs(prev_blur, alpha=gain, beta=offset))
+        
+        if self.lighting_mode == 'gradient':
+            grad = self._gradient_magnitude(gray_blur)
+            prev_grad = self._gradient_magnitude(prev_blur)
+            # Exposure gain scales edge strength too; compare at equal mean strength
+            gain = cv2.mean(grad, mask=valid)[0] / max(cv2.mean(prev_grad, mask=valid)[0], 1e-3)
+            return cv2.absdiff(grad, cv2.convertScaleAbs(prev_grad, alpha=gain))
+        
+        # global_shift: subtract the median signed change (robust to moving objects)
+        signed = gray_blur.astype(np.int16) - prev_blur.astype(np.int16)
+        sample = signed[::4, ::4] if valid is None else signed[::4, ::4][valid[::4, ::4] > 0]
+        shift = int(np.median(sample)) if sample.size else 0
+        return np.abs(signed - shift).clip(0, 255).astype(np.uint8)
         
     def detect_difference(self, frame):
         """
         Detect if there is significant difference between current and previous frame
         
         Args:
-            frame: Current frame (BGR image)
+            frame: Current frame (BGR image, or the 8-bit grayscale/luma
+                   image the decoder can hand out directly)
             
         Returns:
-            (has_difference: bool, diff_image: ndarray, diff_count: int)
+            (has_difference: bool, diff_image: ndarray, diff_count: int); with
+            motion compensation or lighting rejection diff_count is the
+            corrected count and the plain one is kept in raw_diff_count. With
+            an ROI mask, diff_image covers the included regions' bounding box
+            and only pixels inside the mask are counted
         """
+        # Convert current frame to grayscale
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        roi = None
+        if self.roi_mask is not None:
+            # Pixels outside the included regions' bounding box are never processed
+            (x1, y1, x2, y2), roi = self.roi_mask.stage1_region(gray.shape[1], gray.shape[0])
+            gray = gray[y1:y2, x1:x2]
+        
         if self.prev_frame is None:
-            self.prev_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            # Gray input and ROI crops are views of the caller's buffer, which the decoder reuses
+            self.prev_frame = gray.copy()
             return False, None, 0
         
-        # Convert current frame to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
         # Apply Gaussian blur to reduce noise
         gray_blur = cv2.GaussianBlur(gray, self.blur_kernel, 0)
         prev_blur = cv2.GaussianBlur(self.prev_frame, self.blur_kernel, 0)
         
         # Calculate absolute difference
         diff = cv2.absdiff(gray_blur, prev_blur)
+        if roi is not None:
+            diff = cv2.bitwise_and(diff, roi)
+        self.raw_diff_count = self._count_changed(diff)
+        candidate_count = self.raw_diff_count  # Count before lighting rejection
         
-        # Apply threshold to get binary image
-        _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+        valid = roi
+        if self.motion_compensation:
+            prev_blur, aligned_valid = self._compensate(prev_blur, gray)
+            if aligned_valid is not None:
+                valid = aligned_valid if roi is None else cv2.bitwise_and(aligned_valid, roi)
+                diff = cv2.bitwise_and(cv2.absdiff(gray_blur, prev_blur), valid)
+                candidate_count = self._count_changed(diff)
+        
+        if self.lighting_mode != 'off':
+            diff = self._lighting_diff(gray_blur, prev_blur, valid)
+            if valid is not None:
+                diff = cv2.bitwise_and(diff, valid)
         
-        # Count non-zero pixels (changed pixels)
-        diff_count = cv2.countNonZero(thresh)
+        # Apply threshold and count non-zero pixels (changed pixels)
+        diff_count = self._count_changed(diff) if self.lighting_mode != 'off' else candidate_count
         
         # Determine if difference is significant
         has_difference = diff_count > self.threshold
+        self.stats['frames'] += 1
+        self.stats['triggered'] += int(has_difference)
+        if self.motion_compensation:
+            self.stats['motion_compensated'] += int(self.last_motion is not None)
+            # Camera motion alone would have triggered Stage 2 here
+            self.stats['motion_suppressed'] += int(candidate_count <= self.threshold < self.raw_diff_count)
+        if self.lighting_mode != 'off':
+            # A brightness change alone would have triggered Stage 2 here
+            self.stats['lighting_suppressed'] += int(not has_difference and candidate_count > self.threshold)
         
         # Update previous frame
         self.prev_frame = gray.copy()
@@ -65,3 +264,6 @@ class FrameDifferenceDetector:
     def reset(self):
         """Reset the detector state"""
         self.prev_frame = None
+        self.last_motion = None
+        self.raw_diff_count = 0
+        self.stats = self._empty_stats()
@@ -0,0 +1,290 @@
+"""
+Shared-Memory Frame Ring Buffer Module
+Zero-copy frame transport between processes using multiprocessing.shared_memory
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from video_reader import open_video
+
+
+# Slot ownership states
+SLOT_FREE = 0       # Owned by the pool, may be acquired by a producer
+SLOT_WRITING = 1    # Owned by a producer filling in the frame
+SLOT_READY = 2      # Published, waiting in a stage queue
+SLOT_READING = 3    # Owned by a consumer working on the frame
+
+
+def _attach_shared_memory(name):
+    """
+    Attach to an existing shared block without taking over its lifetime
+
+    Child processes started by multiprocessing share the parent's resource
+    tracker, so registering the block again is harmless on older Pythons;
+    3.13+ lets us skip tracking entirely.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRingBuffer:
+    """
+    Fixed-slot ring buffer of preallocated frame buffers in shared memory.
+
+    Frames never travel through pickling: producers write pixels straight into
+    a slot, then hand the slot index to the next stage. Only small integers and
+    per-slot metadata cross the process boundary.
+
+    Typical pipeline (decode -> Stage 1 -> inference):
+
+        ring = SharedFrameRingBuffer(num_slots=8, frame_shape=(1080, 1920, 3),
+                                     stages=('decoded', 'triggered'))
+        # decode worker
+        slot = ring.acquire()
+        ring.frame(slot)[:] = frame
+        ring.publish(slot, frame_number, stage='decoded')
+        # Stage-1 worker
+        slot, frame_number = ring.get(stage='decoded')
+        ... # inspect ring.frame(slot)
+        ring.publish(slot, frame_number, stage='triggered')  # hand off
+        # or ring.release(slot) to drop the frame
+        # inference worker
+        slot, frame_number = ring.get(stage='triggered')
+        ... # run YOLO on ring.frame(slot)
+        ring.release(slot)
+
+    The instance is picklable, so it can be passed as an argument to
+    multiprocessing.Process; child processes attach to the same shared block.
+    """
+
+    def __init__(self, num_slots, frame_shape, dtype=np.uint8, stages=('ready',), context=None):
+        """
+        Initialize the ring buffer and allocate shared memory
+
+        Args:
+            num_slots: Number of preallocated frame slots
+            frame_shape: Shape of one frame, e.g. (height, width, 3)
+            dtype: Frame element type
+            stages: Names of the hand-off queues between pipeline stages
+            context: multiprocessing context or start method name of the
+                     worker processes, e.g. 'spawn' (default: the platform's)
+        """
+        if num_slots < 1:
+            raise ValueError("num_slots must be at least 1")
+        if not stages:
+            raise ValueError("At least one stage is required")
+
+        self.num_slots = int(num_slots)
+        self.frame_shape = tuple(int(d) for d in frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.stages = tuple(stages)
+
+        frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        # Metadata per slot: state, frame number
+        meta_bytes = self.num_slots * 2 * np.dtype(np.int64).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.num_slots + meta_bytes)
+        # Only the creating process frees the block; forked children inherit
+        # this object as-is, so ownership is tied to the pid
+        self._owner_pid = os.getpid()
+
+        # Locks and queues only pass to processes started with the same method
+        ctx = context if hasattr(context, 'Queue') else mp.get_context(context)
+        self._lock = ctx.Lock()
+        self._free_slots = ctx.Queue()
+        self._stage_queues = {name: ctx.Queue() for name in self.stages}
+
+        self._attach_views()
+        self._meta[:, 0] = SLOT_FREE
+        self._meta[:, 1] = -1
+        for slot in range(self.num_slots):
+            self._free_slots.put(slot)
+
+    @classmethod
+    def for_video(cls, video_path, num_slots=8, stages=('ready',), context=None):
+        """
+        Create a ring buffer sized for the frames of a video file
+
+        Args:
+            video_path: Path to video file
+            num_slots: Number of preallocated frame slots
+            stages: Names of the hand-off queues between pipeline stages
+            context: multiprocessing context or start method name
+
+        Returns:
+            SharedFrameRingBuffer
+        """
+        with open_video(video_path) as cap:
+            width, height = cap.width, cap.height
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Unable to read frame size from {video_path}")
+        return cls(num_slots, (height, width, 3), stages=stages, context=context)
+
+    def _attach_views(self):
+        """Create numpy views over the shared block"""
+        frame_count = int(np.prod(self.frame_shape))
+        self._frames = np.ndarray((self.num_slots,) + self.frame_shape, dtype=self.dtype,
+                                  buffer=self._shm.buf)
+        meta_offset = frame_count * self.dtype.itemsize * self.num_slots
+        self._meta = np.ndarray((self.num_slots, 2), dtype=np.int64,
+                                buffer=self._shm.buf, offset=meta_offset)
+
+    def __getstate__(self):
+        """Pickle only the handles needed to re-attach in another process"""
+        return {
+            'shm_name': self._shm.name,
+            'num_slots': self.num_slots,
+            'frame_shape': self.frame_shape,
+            'dtype': self.dtype.str,
+            'stages': self.stages,
+            'lock': self._lock,
+            'free_slots': self._free_slots,
+            'stage_queues': self._stage_queues,
+        }
+
+    def __setstate__(self, state):
+        """Attach to an existing shared block"""
+        self.num_slots = state['num_slots']
+        self.frame_shape = state['frame_shape']
+        self.dtype = np.dtype(state['dtype'])
+        self.stages = state['stages']
+        self._lock = state['lock']
+        self._free_slots = state['free_slots']
+        self._stage_queues = state['stage_queues']
+        self._shm = _attach_shared_memory(state['shm_name'])
+        self._owner_pid = None
+        self._attach_views()
+
+    def _transition(self, slot, expected, new_state):
+        """Move a slot between ownership states, checking the handoff is valid"""
+        with self._lock:
+            current = int(self._meta[slot, 0])
+            if current not in expected:
+                raise RuntimeError(f"Slot {slot} is in state {current}, expected one of {expected}")
+            self._meta[slot, 0] = new_state
+
+    def acquire(self, timeout=None):
+        """
+        Take ownership of a free slot for writing
+
+        Args:
+            timeout: Seconds to wait for a free slot (None = block forever)
+
+        Returns:
+            slot index, or None if no slot became free before the timeout
+        """
+        try:
+            slot = self._free_slots.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self._transition(slot, (SLOT_FREE,), SLOT_WRITING)
+        return slot
+
+    def frame(self, slot):
+        """
+        Get a writable view of a slot's frame buffer (no copy)
+
+        Args:
+            slot: Slot index
+
+        Returns:
+            ndarray view into shared memory
+        """
+        return self._frames[slot]
+
+    def write(self, frame, frame_number, stage=None, timeout=None):
+        """
+        Acquire a slot, copy a frame into it and publish it in one step
+
+        Args:
+            frame: Frame with shape frame_shape
+            frame_number: Source frame number stored alongside the slot
+            stage: Stage queue to publish to (default: first stage)
+            timeout: Seconds to wait for a free slot
+
+        Returns:
+            slot index, or None if the buffer stayed full
+        """
+        slot = self.acquire(timeout=timeout)
+        if slot is None:
+            return None
+        np.copyto(self._frames[slot], frame)
+        self.publish(slot, frame_number, stage=stage)
+        return slot
+
+    def publish(self, slot, frame_number, stage=None):
+        """
+        Hand a slot to the next stage
+
+        Valid both for a producer that just wrote the slot and for a consumer
+        that forwards the frame to a later stage without copying.
+
+        Args:
+            slot: Slot index owned by the caller
+            frame_number: Source frame number
+            stage: Stage queue name (default: first stage)
+        """
+        stage = stage or self.stages[0]
+        if stage not in self._stage_queues:
+            raise ValueError(f"Unknown stage: {stage}")
+        self._transition(slot, (SLOT_WRITING, SLOT_READING), SLOT_READY)
+        self._meta[slot, 1] = frame_number
+        self._stage_queues[stage].put(slot)
+
+    def get(self, stage=None, timeout=None):
+        """
+        Take ownership of the next published slot of a stage
+
+        Args:
+            stage: Stage queue name (default: first stage)
+            timeout: Seconds to wait (None = block forever)
+
+        Returns:
+            (slot, frame_number), or (None, None) on timeout
+        """
+        stage = stage or self.stages[0]
+        try:
+            slot = self._stage_queues[stage].get(timeout=timeout)
+        except queue.Empty:
+            return None, None
+        self._transition(slot, (SLOT_READY,), SLOT_READING)
+        return slot, int(self._meta[slot, 1])
+
+    def release(self, slot):
+        """
+        Return a slot to the free pool once its frame is no longer needed
+
+        Args:
+            slot: Slot index owned by the caller
+        """
+        self._transition(slot, (SLOT_WRITING, SLOT_READING), SLOT_FREE)
+        self._meta[slot, 1] = -1
+        self._free_slots.put(slot)
+
+    def slot_state(self, slot):
+        """Get the ownership state of a slot"""
+        return int(self._meta[slot, 0])
+
+    def close(self):
+        """
+        Detach from shared memory; the creating process also frees the block
+        """
+        # Drop numpy views before closing, otherwise the buffer stays exported
+        self._frames = None
+        self._meta = None
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+            self._owner_pid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
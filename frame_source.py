@@ -0,0 +1,125 @@
+"""
+Frame Source Module
+Seek-based frame access with a small decoded-frame cache, and lazily
+annotated frame sequences for display/export
+"""
+
+import threading
+from collections import OrderedDict
+
+from video_reader import open_video
+
+
+class FrameReader:
+    """
+    Random-access reader over a video file with an LRU cache of decoded frames
+    """
+
+    def __init__(self, video_path, cache_size=32):
+        """
+        Initialize the frame reader
+
+        Args:
+            video_path: Path to video file
+            cache_size: Number of decoded frames kept in memory
+        """
+        self.video_path = video_path
+        self.cache_size = max(1, cache_size)
+        self._cache = OrderedDict()
+        self._cap = None
+        self._next_index = 0  # Frame index the capture will decode next
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """Open the capture on first use"""
+        if self._cap is None:
+            self._cap = open_video(self.video_path)
+            self._next_index = 0
+
+    def read(self, frame_index):
+        """
+        Get a decoded frame by index
+
+        Sequential access decodes forward without seeking; anything else uses
+        the reader's frame-accurate seek. The returned frame is shared with the cache
+        and must not be modified in place.
+
+        Args:
+            frame_index: Source frame number
+
+        Returns:
+            frame (BGR image) or None if it could not be decoded
+        """
+        with self._lock:
+            frame = self._cache.get(frame_index)
+            if frame is not None:
+                self._cache.move_to_end(frame_index)
+                return frame
+
+            self._open()
+            if frame_index != self._next_index and not self._cap.seek(frame_index):
+                self._next_index = -1
+                return None
+            ret, frame = self._cap.read()
+            if not ret:
+                self._next_index = -1  # Force a seek next time
+                return None
+            self._next_index = frame_index + 1
+
+            self._cache[frame_index] = frame
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return frame
+
+    def close(self):
+        """Release the capture and drop cached frames"""
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+            self._cache.clear()
+
+
+class AnnotatedFrameSequence:
+    """
+    Read-only sequence of annotated frames, rendered on access
+
+    Stands in for the list of annotated frame copies that processing used to
+    keep: results only hold detections, and overlays are drawn when a frame is
+    actually displayed or exported.
+    """
+
+    def __init__(self, reader, length, render, frame_indices=None):
+        """
+        Initialize the sequence
+
+        Args:
+            reader: FrameReader over the source video
+            length: Number of frames in the sequence
+            render: Callable (index, frame) -> annotated frame; must not
+                    modify the frame it is given
+            frame_indices: Source frame number of each entry when the sequence
+                           covers a subsample of the video (default: identity)
+        """
+        self.reader = reader
+        self._length = length
+        self._render = render
+        self._frame_indices = frame_indices
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("frame index out of range")
+        source_index = self._frame_indices[index] if self._frame_indices is not None else index
+        frame = self.reader.read(source_index)
+        if frame is None:
+            return None
+        return self._render(index, frame)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
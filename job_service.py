@@ -0,0 +1,564 @@
+"""
+Job Service Module
+Localhost HTTP service that queues analysis/compression jobs and streams
+per-frame results to clients
+"""
+
+import bisect
+import heapq
+import hmac
+import itertools
+import json
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cancellation import CancellationToken
+from config import JOB_SERVICE_CONFIG, YOLO_CONFIG, job_output_dir
+from roi_mask import RegionMask
+from video_processor import VideoProcessor
+
+
+JOB_TYPES = ('analyze', 'compress')
+
+# Header carrying the per-run access token
+TOKEN_HEADER = 'X-Job-Token'
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+# Events that are dropped from the replay log once it is full
+COMPACTABLE_EVENTS = ('frame', 'progress')
+
+
+class Job:
+    """
+    One queued analysis or compression job and its event log.
+
+    Status events (including the final summary) are always kept; only the
+    last max_events frame/progress events are kept for late subscribers.
+    """
+
+    def __init__(self, job_id, job_type, video_path, output_path=None, priority=0, max_events=None):
+        """
+        Initialize a job
+
+        Args:
+            job_id: Unique job identifier
+            job_type: 'analyze' or 'compress'
+            video_path: Local input video path
+            output_path: Output path (compressed video, or .npz detections for analyze)
+            priority: Higher values run first
+            max_events: Frame/progress events kept for replay (default: JOB_SERVICE_CONFIG)
+        """
+        self.id = job_id
+        self.type = job_type
+        self.video_path = video_path
+        self.output_path = output_path
+        self.priority = priority
+        self.status = QUEUED
+        self.error = None
+        self.summary = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = []  # Replay log, compacted by _compact()
+        self.max_events = max_events or JOB_SERVICE_CONFIG.get('max_replay_events', 1000)
+        self.cancel_token = CancellationToken()
+        self._seqs = []  # Sequence number of each entry in events
+        self._next_seq = 0
+        self._changed = threading.Condition()
+
+    def add_event(self, event):
+        """Append an event and wake up streaming clients"""
+        with self._changed:
+            self.events.append(event)
+            self._seqs.append(self._next_seq)
+            self._next_seq += 1
+            # Compact in batches so appends stay O(1) amortized
+            if len(self.events) > self.max_events + self.max_events // 2:
+                self._compact()
+            self._changed.notify_all()
+
+    def _compact(self):
+        """Drop all but the last max_events frame/progress events (caller holds _changed)"""
+        compactable = sum(1 for event in self.events if event.get('event') in COMPACTABLE_EVENTS)
+        excess = compactable - self.max_events
+        if excess <= 0:
+            return
+        events, seqs = [], []
+        for seq, event in zip(self._seqs, self.events):
+            if excess > 0 and event.get('event') in COMPACTABLE_EVENTS:
+                excess -= 1
+                continue
+            events.append(event)
+            seqs.append(seq)
+        self.events, self._seqs = events, seqs
+
+    def set_status(self, status, **fields):
+        """Change job status and record it as an event"""
+        self.status = status
+        self.add_event(dict({'event': 'status', 'status': status}, **fields))
+
+    @property
+    def is_finished(self):
+        """Whether the job has completed, failed or been cancelled"""
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def iter_events(self, timeout=1.0):
+        """
+        Yield events as they are produced until the job finishes
+
+        Args:
+            timeout: Seconds between wake-ups while waiting for new events
+        """
+        next_seq = 0  # First sequence number not yet sent
+        while True:
+            with self._changed:
+                while next_seq >= self._next_seq and not self.is_finished:
+                    self._changed.wait(timeout)
+                # Events dropped by compaction before this client read them are skipped
+                new_events = self.events[bisect.bisect_left(self._seqs, next_seq):]
+                next_seq = self._next_seq
+                finished = self.is_finished
+            for event in new_events:
+                yield event
+            if finished and next_seq >= self._next_seq:
+                return
+
+    def as_dict(self):
+        """Get a JSON-serializable description of the job"""
+        return {
+            'id': self.id,
+            'type': self.type,
+            'video_path': self.video_path,
+            'output_path': self.output_path,
+            'priority': self.priority,
+            'status': self.status,
+            'error': self.error,
+            'summary': self.summary,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobQueue:
+    """
+    Thread-safe priority queue of jobs (higher priority first, FIFO within a priority)
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def put(self, job):
+        with self._condition:
+            heapq.heappush(self._heap, (-job.priority, next(self._counter), job))
+            self._condition.notify()
+
+    def get(self):
+        """
+        Block until a job is available
+
+        Returns:
+            Job, or None once the queue is closed
+        """
+        with self._condition:
+            while not self._heap and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            return heapq.heappop(self._heap)[2]
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._heap)
+
+
+def _detections_to_json(detections):
+    """Convert detections to JSON-friendly dicts"""
+    return [{'class': d['class'], 'confidence': round(d['confidence'], 4), 'box': list(d['box'])}
+            for d in detections]
+
+
+class JobService:
+    """
+    Job queue with a pool of VideoProcessor workers behind a localhost HTTP API.
+
+    Endpoints:
+        POST /jobs                 {"type", "video_path", "output_path"?, "priority"?}
+        GET  /jobs                 list jobs (the oldest finished ones are dropped past max_finished_jobs)
+        GET  /jobs/<id>            job status and summary
+        GET  /jobs/<id>/events     newline-delimited JSON events, streamed until the job ends
+        DELETE /jobs/<id>          cancel a queued or running job (running jobs keep partial results)
+
+    Loopback alone does not keep web pages out (a browser will happily POST
+    to 127.0.0.1), so every request must carry the service token in the
+    X-Job-Token header, name the bound address in Host and have no Origin
+    header; POST bodies must be application/json. Outputs can only be
+    written inside the configured output folder.
+    """
+
+    def __init__(self, host=None, port=None, workers=None, model_size=None, token=None, output_dir=None):
+        """
+        Initialize the service (call start() to begin serving)
+
+        Args:
+            host: Bind address; must be a loopback address
+            port: TCP port (0 = pick a free port)
+            workers: Number of concurrent jobs, one VideoProcessor each
+            model_size: YOLOv8 model size for the workers
+            token: Access token clients must send (default: a random one per run)
+            output_dir: Folder outputs are confined to (default: JOB_SERVICE_CONFIG['output_dir'])
+        """
+        self.host = host or JOB_SERVICE_CONFIG['host']
+        if self.host not in ('127.0.0.1', 'localhost', '::1'):
+            raise ValueError("Job service only binds to loopback addresses")
+        self.port = port if port is not None else JOB_SERVICE_CONFIG['port']
+        self.num_workers = max(1, workers or JOB_SERVICE_CONFIG['workers'])
+        self.model_size = model_size or YOLO_CONFIG['model_size']
+        self.token = token or secrets.token_urlsafe(32)
+        self.output_dir = os.path.realpath(job_output_dir(output_dir))
+        self.jobs = {}
+        self.queue = JobQueue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._workers = []
+        self._server = None
+        self._server_thread = None
+
+    def get_job(self, job_id):
+        """Get a job by id, or None"""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        """Get a snapshot of all retained jobs"""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def _prune_finished(self):
+        """Forget the oldest finished jobs beyond max_finished_jobs (caller holds _lock)"""
+        limit = JOB_SERVICE_CONFIG.get('max_finished_jobs', 100)
+        finished = [job for job in self.jobs.values() if job.is_finished]
+        if len(finished) <= limit:
+            return
+        finished.sort(key=lambda job: job.finished or job.created)
+        for job in finished[:len(finished) - limit]:
+            del self.jobs[job.id]
+
+    @property
+    def address(self):
+        """(host, port) the server is listening on"""
+        return self._server.server_address[:2] if self._server else (self.host, self.port)
+
+    def allowed_hosts(self):
+        """Host header values naming the bound address"""
+        _, port = self.address
+        host = f"[{self.host}]" if ':' in self.host else self.host
+        return {f"{host}:{port}"}
+
+    def check_token(self, token):
+        """Whether a client-supplied token matches, in constant time"""
+        return hmac.compare_digest((token or '').encode('utf-8'), self.token.encode('utf-8'))
+
+    def resolve_output_path(self, output_path):
+        """
+        Place an output path inside the output folder
+
+        Args:
+            output_path: Path relative to the output folder, or an absolute path inside it
+
+        Returns:
+            Absolute path with symlinks resolved
+        """
+        path = os.path.realpath(os.path.join(self.output_dir, output_path))
+        if path == self.output_dir or os.path.commonpath([path, self.output_dir]) != self.output_dir:
+            raise ValueError(f"output_path must be inside {self.output_dir}")
+        return path
+
+    def submit(self, job_type, video_path, output_path=None, priority=0):
+        """
+        Validate and queue a job
+
+        Args:
+            job_type: 'analyze' or 'compress'
+            video_path: Local input video path
+            output_path: Output path inside the output folder (required for compress)
+            priority: Higher values run first
+
+        Returns:
+            Job
+        """
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if not video_path or not os.path.isfile(video_path):
+            raise ValueError(f"Video file not found: {video_path}")
+        if job_type == 'compress' and not output_path:
+            raise ValueError("compress jobs require output_path")
+        if output_path:
+            output_path = self.resolve_output_path(output_path)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with self._lock:
+            job = Job(str(next(self._ids)), job_type, os.path.abspath(video_path),
+                      output_path, int(priority))
+            self.jobs[job.id] = job
+            self._prune_finished()
+        job.add_event({'event': 'status', 'status': QUEUED})
+        self.queue.put(job)
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancel a job; a running job stops after its current frame
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            Job, or None if there is no such job
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        job.cancel_token.cancel()
+        with self._lock:
+            if job.status == QUEUED:
+                # The worker skips it when it comes off the queue
+                job.finished = time.time()
+                job.set_status(CANCELLED)
+        return job
+
+    def _worker_loop(self):
+        """Run queued jobs on this worker's own VideoProcessor"""
+        processor = None
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            if job.cancel_token.cancelled:
+                continue
+            if processor is None:
+                # Created with the first job so a model that fails to load
+                # fails that job (and is retried for the next one) instead
+                # of killing the worker and stranding the queue
+                try:
+                    processor = VideoProcessor(yolo_model_size=self.model_size)
+                except Exception as e:
+                    self._fail_job(job, f"Could not create video processor: {e}")
+                    continue
+            self._run_job(processor, job)
+
+    def _fail_job(self, job, error):
+        """Mark a job failed"""
+        with self._lock:
+            job.error = error
+            job.finished = time.time()
+            job.set_status(FAILED, error=error)
+
+    def _run_job(self, processor, job):
+        """Execute one job, streaming its events"""
+        with self._lock:
+            if job.cancel_token.cancelled:
+                return
+            job.started = time.time()
+            job.set_status(RUNNING)
+
+        def on_progress(current, total):
+            job.add_event({'event': 'progress', 'current': current, 'total': total})
+
+        def on_frame(info):
+            event = {'event': 'frame'}
+            event.update({k: v for k, v in info.items() if k not in ('detections', 'frame')})
+            event['detections'] = _detections_to_json(info['detections'])
+            job.add_event(event)
+
+        try:
+            # Masks saved for this video in the GUI apply to service jobs too
+            processor.set_roi_mask(RegionMask.for_source(job.video_path))
+            if job.type == 'analyze':
+                result = processor.process_video_two_stage(
+                    job.video_path, progress_callback=on_progress, frame_callback=on_frame,
+                    cancel_token=job.cancel_token, build_thumbnails=False)
+                if job.output_path:
+                    result['yolo_results'].save(job.output_path)
+                job.summary = {
+                    'total_frames': result['total_frames'],
+                    'frames_with_detection': result['frames_with_detection'],
+                    'yolo_runs': result['yolo_runs'],
+                    'total_time': result['total_time'],
+                    'motion_events': result['motion_events'],
+                    'total_detections': result['yolo_results'].total_detections,
+                    'cancelled': result['cancelled'],
+                    'roi': result['roi'],
+                }
+            else:
+                result = processor.compress_video_smart(
+                    job.video_path, job.output_path, progress_callback=on_progress, frame_callback=on_frame,
+                    cancel_token=job.cancel_token)
+                job.summary = {k: v for k, v in result.items() if k != 'frames_to_save'}
+            job.finished = time.time()
+            job.set_status(CANCELLED if result['cancelled'] else DONE, summary=job.summary)
+        except Exception as e:
+            self._fail_job(job, str(e))
+
+    def start(self):
+        """Start the worker pool and the HTTP server in background threads"""
+        for _ in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        handler = type('JobRequestHandler', (_JobRequestHandler,), {'service': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self._server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._server_thread.start()
+        return self
+
+    def stop(self):
+        """Stop accepting requests and shut the workers down after their current job"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.queue.close()
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for JobService"""
+
+    service = None
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path_parts(self):
+        return [part for part in self.path.split('?')[0].split('/') if part]
+
+    def _authorized(self):
+        """Reject browser-originated, mis-addressed or unauthenticated requests"""
+        if self.headers.get('Origin') is not None:
+            self._send_json(403, {'error': 'cross-origin requests are not allowed'})
+            return False
+        if self.headers.get('Host') not in self.service.allowed_hosts():
+            self._send_json(403, {'error': 'unexpected Host header'})
+            return False
+        if not self.service.check_token(self.headers.get(TOKEN_HEADER)):
+            self._send_json(401, {'error': f'missing or invalid {TOKEN_HEADER} header'})
+            return False
+        return True
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self._path_parts() != ['jobs']:
+            self._send_json(404, {'error': 'not found'})
+            return
+        if self.headers.get_content_type() != 'application/json':
+            self._send_json(415, {'error': 'Content-Type must be application/json'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            job = self.service.submit(
+                request.get('type'), request.get('video_path'),
+                output_path=request.get('output_path'), priority=request.get('priority', 0))
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(201, job.as_dict())
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts = self._path_parts()
+        if parts == ['jobs']:
+            self._send_json(200, [job.as_dict() for job in self.service.list_jobs()])
+            return
+        job = self.service.get_job(parts[1]) if len(parts) >= 2 and parts[0] == 'jobs' else None
+        if job is None:
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        if len(parts) == 2:
+            self._send_json(200, job.as_dict())
+        elif len(parts) == 3 and parts[2] == 'events':
+            self._stream_events(job)
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        parts = self._path_parts()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+        job = self.service.cancel(parts[1])
+        if job is None:
+            self._send_json(404, {'error': 'not found'})
+            return
+        self._send_json(200, job.as_dict())
+
+    def _stream_events(self, job):
+        """Write events as NDJSON until the job ends; the response ends when the connection closes"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for event in job.iter_events():
+                self.wfile.write(json.dumps(event).encode('utf-8') + b'\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away; the job keeps running
+
+
+def main():
+    """Run the job service until interrupted"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local video analysis job service")
+    parser.add_argument('--port', type=int, default=JOB_SERVICE_CONFIG['port'])
+    parser.add_argument('--workers', type=int, default=JOB_SERVICE_CONFIG['workers'])
+    parser.add_argument('--model-size', default=YOLO_CONFIG['model_size'])
+    args = parser.parse_args()
+
+    service = JobService(port=args.port, workers=args.workers, model_size=args.model_size).start()
+    host, port = service.address
+    print(f"✓ Job service listening on http://{host}:{port}")
+    print(f"  Token: {service.token} (send it in the {TOKEN_HEADER} header)")
+    print(f"  Outputs are written under {service.output_dir}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
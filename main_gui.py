@@ -8,12 +8,165 @@ from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 import cv2
 import threading
+import queue
 import os
 from video_processor import VideoProcessor
+from cancellation import CancellationToken
+from config import GUI_CONFIG, YOLO_CONFIG
+from detection_index import DetectionIndex, parse_query
+from roi_mask import RegionMask
+from video_reader import open_video
 import time
 from pathlib import Path
 
 
+def frame_to_display_image(frame, canvas_size, video_size=None):
+    """
+    Convert a decoded frame into the PIL image the canvas shows
+    
+    Args:
+        frame: BGR or grayscale image
+        canvas_size: (width, height) of the display area
+        video_size: (width, height) whose aspect ratio is kept (default: the frame's)
+        
+    Returns:
+        PIL RGB image scaled to fit the canvas
+    """
+    # Scale the frame to fit the canvas while preserving aspect ratio
+    canvas_w, canvas_h = max(1, canvas_size[0]), max(1, canvas_size[1])
+    vid_w, vid_h = video_size or (frame.shape[1], frame.shape[0])
+    vid_ar = vid_w / vid_h
+    canvas_ar = canvas_w / canvas_h
+    
+    if canvas_ar > vid_ar:
+        # canvas is wider relative to height -> limit by height
+        target_h = canvas_h
+        target_w = int(target_h * vid_ar)
+    else:
+        # canvas is taller relative to width -> limit by width
+        target_w = canvas_w
+        target_h = int(target_w / vid_ar)
+    
+    # Resize frame to target dimensions
+    display_frame = cv2.resize(frame, (max(1, int(target_w)), max(1, int(target_h))))
+    
+    # Convert BGR to RGB for PIL
+    code = cv2.COLOR_GRAY2RGB if display_frame.ndim == 2 else cv2.COLOR_BGR2RGB
+    return Image.fromarray(cv2.cvtColor(display_frame, code))
+
+
+class RoiEditor:
+    """
+    Dialog for drawing include / exclude polygons on a video frame
+    
+    Left click adds a vertex and right click closes the polygon. Polygons
+    are kept in normalized coordinates so they fit any decoding resolution.
+    """
+    
+    MAX_SIZE = (960, 540)
+    COLORS = {'include': '#00ff00', 'exclude': '#ff3030'}
+    
+    def __init__(self, parent, frame, mask, on_save):
+        """
+        Open the editor
+        
+        Args:
+            parent: Parent Tk window
+            frame: BGR frame to draw on
+            mask: Current RegionMask or None
+            on_save: Called with the edited RegionMask (empty = no mask)
+        """
+        self.on_save = on_save
+        self.polygons = {
+            'include': [list(p) for p in mask.include] if mask else [],
+            'exclude': [list(p) for p in mask.exclude] if mask else [],
+        }
+        self.current = []
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title("ROI 遮罩編輯")
+        self.window.transient(parent)
+        self.window.grab_set()
+        
+        image = frame_to_display_image(frame, self.MAX_SIZE)
+        self.width, self.height = image.size
+        self.photo = ImageTk.PhotoImage(image)
+        self.canvas = tk.Canvas(self.window, width=self.width, height=self.height, bg='black', cursor='crosshair')
+        self.canvas.pack(padx=10, pady=10)
+        self.canvas.bind("<Button-1>", self.add_point)
+        self.canvas.bind("<Button-3>", self.close_polygon)
+        
+        controls = ttk.Frame(self.window)
+        controls.pack(fill=tk.X, padx=10)
+        self.mode_var = tk.StringVar(value='include')
+        ttk.Radiobutton(controls, text="包含區域", variable=self.mode_var, value='include',
+                        command=self.redraw).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(controls, text="排除區域", variable=self.mode_var, value='exclude',
+                        command=self.redraw).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="完成多邊形", command=self.close_polygon).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="復原", command=self.undo).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="全部清除", command=self.clear).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="取消", command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(controls, text="儲存", command=self.save).pack(side=tk.RIGHT, padx=5)
+        ttk.Label(self.window, text="左鍵新增頂點，右鍵完成多邊形；綠色為分析區域，紅色為忽略區域",
+                  foreground="gray").pack(pady=(5, 10))
+        
+        self.redraw()
+        
+    def add_point(self, event):
+        """Add a vertex to the polygon being drawn"""
+        x = min(max(event.x / max(1, self.width - 1), 0.0), 1.0)
+        y = min(max(event.y / max(1, self.height - 1), 0.0), 1.0)
+        self.current.append((x, y))
+        self.redraw()
+        
+    def close_polygon(self, event=None):
+        """Finish the polygon being drawn (fewer than 3 vertices are dropped)"""
+        if len(self.current) >= 3:
+            self.polygons[self.mode_var.get()].append(self.current)
+        self.current = []
+        self.redraw()
+        
+    def undo(self):
+        """Remove the last vertex, or the last polygon of the selected kind"""
+        if self.current:
+            self.current.pop()
+        elif self.polygons[self.mode_var.get()]:
+            self.polygons[self.mode_var.get()].pop()
+        self.redraw()
+        
+    def clear(self):
+        """Remove every polygon"""
+        self.current = []
+        self.polygons = {'include': [], 'exclude': []}
+        self.redraw()
+        
+    def _to_canvas(self, polygon):
+        """Flatten normalized points into canvas coordinates"""
+        return [v for x, y in polygon for v in (x * (self.width - 1), y * (self.height - 1))]
+        
+    def redraw(self):
+        """Draw the frame, finished polygons and the polygon in progress"""
+        self.canvas.delete("all")
+        self.canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+        for kind, polygons in self.polygons.items():
+            for polygon in polygons:
+                self.canvas.create_polygon(self._to_canvas(polygon), outline=self.COLORS[kind],
+                                           fill=self.COLORS[kind], stipple='gray25', width=2)
+        color = self.COLORS[self.mode_var.get()]
+        points = self._to_canvas(self.current)
+        if len(self.current) >= 2:
+            self.canvas.create_line(points, fill=color, width=2, dash=(4, 2))
+        for x, y in zip(points[::2], points[1::2]):
+            self.canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill=color, outline='')
+        
+    def save(self):
+        """Hand the edited mask back and close"""
+        self.close_polygon()  # A polygon in progress counts once it has 3 vertices
+        self.on_save(RegionMask(self.polygons['include'], self.polygons['exclude']))
+        self.window.destroy()
+
+
 class VideoRecognitionApp:
     """
     GUI application for two-stage video recognition
@@ -25,26 +178,39 @@ class VideoRecognitionApp:
         self.root.title("Two-Stage Video Recognition System")
         self.root.geometry("1400x900")
         
-        self.video_processor = VideoProcessor(yolo_model_size='n')
+        self.video_processor = VideoProcessor(yolo_model_size=YOLO_CONFIG['model_size'])
         self.current_video_path = None
         self.processing_thread = None
         self.is_processing = False
+        self.cancel_token = CancellationToken()  # Replaced for every run; Stop cancels it
         self.two_stage_result = None
         self.full_yolo_result = None
         self.current_frame_index = 0
         self.playback_thread = None
         self.is_playing = False
         self.updating_slider = False  # Flag to prevent circular callbacks
+        self.scrubbing = False  # Slider is being dragged
+        self.scrub_settle_ms = GUI_CONFIG.get('scrub_settle_ms', 150)
+        self._scrub_after_id = None  # Pending full-frame load while scrubbing
         self.compression_result = None  # Store compression results
         self.compression_thread = None  # Thread for compression
+        self.detection_index = None  # Built on first search over the current results
         # Video display properties (will be set on upload)
         self.video_width = 640
         self.video_height = 480
         self.video_fps = 30
         # Resize debounce handler id
         self._resize_after_id = None
+        # Worker threads never touch widgets: they queue updates that are
+        # applied on a fixed UI tick, coalescing progress and frames
+        self.ui_queue = queue.Queue()
+        self.ui_tick_ms = GUI_CONFIG.get('ui_tick_ms', 50)
+        self._live_stats = None
+        self._live_frame = None  # Latest (pass, frame, info) from the worker; older ones are dropped
+        self._show_live_frames = False
         
         self.setup_ui()
+        self.root.after(self.ui_tick_ms, self._drain_ui_queue)
         
     def setup_ui(self):
         """Setup the user interface"""
@@ -61,6 +227,18 @@ class VideoRecognitionApp:
         self.video_label = ttk.Label(control_frame, text="No video selected", foreground="gray")
         self.video_label.pack(side=tk.LEFT, padx=5)
         
+        # Model size (loaded models stay cached, so switching back is instant)
+        ttk.Label(control_frame, text="模型:").pack(side=tk.LEFT, padx=5)
+        self.model_size_var = tk.StringVar(value=self.video_processor.yolo_detector.model_size)
+        self.model_size_combo = ttk.Combobox(control_frame, textvariable=self.model_size_var,
+                                             values=['n', 's', 'm', 'l', 'x'], state='readonly', width=3)
+        self.model_size_combo.pack(side=tk.LEFT, padx=5)
+        self.model_size_combo.bind('<<ComboboxSelected>>', self.on_model_size_change)
+        
+        # Region of interest / ignore polygons, saved per video
+        self.roi_button = ttk.Button(control_frame, text="ROI 遮罩", command=self.edit_roi_mask, state=tk.DISABLED)
+        self.roi_button.pack(side=tk.LEFT, padx=5)
+        
         # Processing buttons
         self.start_button = ttk.Button(control_frame, text="Process Video", command=self.start_processing, state=tk.DISABLED)
         self.start_button.pack(side=tk.LEFT, padx=5)
@@ -72,6 +250,9 @@ class VideoRecognitionApp:
         self.compress_button = ttk.Button(control_frame, text="Compress & Download", command=self.start_compression, state=tk.DISABLED)
         self.compress_button.pack(side=tk.LEFT, padx=5)
         
+        # Browse a frame archive written by compression
+        ttk.Button(control_frame, text="Open Archive", command=self.open_archive).pack(side=tk.LEFT, padx=5)
+        
         # Progress bar
         ttk.Label(control_frame, text="進度:").pack(side=tk.LEFT, padx=5)
         self.progress_var = tk.DoubleVar()
@@ -115,6 +296,37 @@ class VideoRecognitionApp:
         self.frame_scale = ttk.Scale(playback_control_frame, from_=0, to=0, orient=tk.HORIZONTAL,
                         command=self.on_frame_change)
         self.frame_scale.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        # Thumbnails while dragging, the full frame once the slider is released
+        self.frame_scale.bind("<ButtonPress-1>", self.on_scrub_start)
+        self.frame_scale.bind("<ButtonRelease-1>", self.on_scrub_end)
+
+        # Activity timeline strip with event navigation
+        timeline_frame = ttk.Frame(self.video_frame)
+        timeline_frame.pack(fill=tk.X, pady=(5, 0))
+
+        self.prev_event_button = ttk.Button(timeline_frame, text="◀ 上一事件", command=self.jump_to_previous_event, state=tk.DISABLED)
+        self.prev_event_button.pack(side=tk.LEFT, padx=5)
+
+        self.timeline_canvas = tk.Canvas(timeline_frame, bg='#202020', height=24, highlightthickness=0)
+        self.timeline_canvas.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.timeline_canvas.bind("<Configure>", lambda e: self._draw_timeline())
+        self.timeline_canvas.bind("<Button-1>", self.on_timeline_click)
+
+        self.next_event_button = ttk.Button(timeline_frame, text="下一事件 ▶", command=self.jump_to_next_event, state=tk.DISABLED)
+        self.next_event_button.pack(side=tk.LEFT, padx=5)
+
+        # Detection search (e.g. "person 12:00-15:00")
+        search_frame = ttk.Frame(self.video_frame)
+        search_frame.pack(fill=tk.X, pady=(5, 0))
+
+        ttk.Label(search_frame, text="搜尋:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.search_entry.bind("<Return>", self.search_detections)
+
+        self.search_button = ttk.Button(search_frame, text="搜尋", command=self.search_detections, state=tk.DISABLED)
+        self.search_button.pack(side=tk.LEFT, padx=5)
 
     
         
@@ -174,12 +386,11 @@ class VideoRecognitionApp:
             self.video_label.config(text=f"Loaded: {filename}", foreground="green")
             # Read video properties and resize display canvas to match video resolution
             try:
-                cap = cv2.VideoCapture(file_path)
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
-                fps = cap.get(cv2.CAP_PROP_FPS) or 30
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
-                cap.release()
+                with open_video(file_path) as cap:
+                    width = cap.width or 640
+                    height = cap.height or 480
+                    fps = cap.fps or 30
+                    total_frames = cap.frame_count or 0
 
                 # Store properties but do NOT change canvas or window geometry
                 # to keep the playback area static per user request.
@@ -199,6 +410,57 @@ class VideoRecognitionApp:
                 messagebox.showwarning("Warning", f"Unable to read video properties: {e}")
                 self.start_button.config(state=tk.NORMAL)
             
+            # Masks are saved per video file
+            roi_mask = RegionMask.for_source(file_path)
+            self.video_processor.set_roi_mask(roi_mask)
+            self.roi_button.config(state=tk.NORMAL)
+            if roi_mask:
+                self.video_label.config(text=f"Loaded: {filename} (ROI)")
+            
+    def edit_roi_mask(self):
+        """Open the ROI polygon editor on the first frame of the current video"""
+        if not self.current_video_path or self.is_processing:
+            return
+        with open_video(self.current_video_path) as cap:
+            ret, frame = cap.read()
+        if not ret:
+            messagebox.showwarning("Warning", "Unable to read a frame for the ROI editor")
+            return
+        RoiEditor(self.root, frame, self.video_processor.roi_mask, self._save_roi_mask)
+        
+    def _save_roi_mask(self, mask):
+        """Apply an edited mask and save it for the current video"""
+        try:
+            mask.save(self.current_video_path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Unable to save ROI mask: {e}")
+        self.video_processor.set_roi_mask(mask)
+        filename = os.path.basename(self.current_video_path)
+        self.video_label.config(text=f"Loaded: {filename}" + (" (ROI)" if mask else ""))
+        self.status_label.config(text="ROI 遮罩已儲存" if mask else "ROI 遮罩已清除", foreground="green")
+            
+    def on_model_size_change(self, event=None):
+        """Switch the YOLO model; the first load of a size happens in the background"""
+        model_size = self.model_size_var.get()
+        if self.is_processing:
+            # Never swap the model under a running job
+            self.model_size_var.set(self.video_processor.yolo_detector.model_size)
+            return
+        self.model_size_combo.config(state=tk.DISABLED)
+        self.status_label.config(text=f"Loading model yolov8{model_size}...", foreground="orange")
+        
+        def load():
+            try:
+                self.video_processor.set_model_size(model_size)
+                self._post_status(f"Model yolov8{model_size} ready", "green")
+            except Exception as e:
+                self._post('call', self.model_size_var.set, self.video_processor.yolo_detector.model_size)
+                self._post_status(f"Model load failed: {e}", "red")
+            finally:
+                self._post('call', lambda: self.model_size_combo.config(state='readonly'))
+        
+        threading.Thread(target=load, daemon=True).start()
+        
     def start_processing(self):
         """Start video processing in a separate thread"""
         if not self.current_video_path:
@@ -206,10 +468,21 @@ class VideoRecognitionApp:
             return
         
         self.is_processing = True
+        self.cancel_token = CancellationToken()
         self.start_button.config(state=tk.DISABLED)
+        self.compress_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.status_label.config(text="Processing: Two-Stage Detection...", foreground="orange")
         
+        # Fresh run: stream frames into the viewer until the two-stage pass is done
+        self.is_playing = False
+        self.two_stage_result = None
+        self.full_yolo_result = None
+        self._show_live_frames = True
+        self.metrics_text.config(state=tk.NORMAL)
+        self.metrics_text.delete(1.0, tk.END)
+        self.metrics_text.config(state=tk.DISABLED)
+        
         # Start processing in separate thread
         self.processing_thread = threading.Thread(target=self._process_video_thread)
         self.processing_thread.daemon = True
@@ -217,45 +490,164 @@ class VideoRecognitionApp:
         
     def _process_video_thread(self):
         """Background thread for video processing"""
+        cancel_token = self.cancel_token
+        final_status = ("Ready", "green")
         try:
             # Process with two-stage detection
+            self._post('pass', 'two_stage')
             self.two_stage_result = self.video_processor.process_video_two_stage(
                 self.current_video_path,
-                progress_callback=self._update_progress
+                progress_callback=self._update_progress,
+                frame_callback=self._frame_callback('two_stage'),
+                cancel_token=cancel_token
             )
             
-            if not self.is_processing:
+            # Two-stage results can be browsed while the baseline runs
+            # (after a stop, whatever was analyzed is still browsable)
+            if len(self.two_stage_result['frames']) > 0:
+                self._post('call', self._display_two_stage_result)
+            if self.two_stage_result['cancelled']:
+                final_status = ("Stopped: partial two-stage results", "blue")
                 return
-            
-            # Update status
-            self.status_label.config(text="Processing: Full YOLO Baseline...", foreground="orange")
+            self._post_status("Processing: Full YOLO Baseline...", "orange")
             
             # Process with full YOLO for comparison
-            self.full_yolo_result = self.video_processor.process_video_full_yolo(
+            self._post('pass', 'full_yolo')
+            # Full pass by default; PERFORMANCE_CONFIG['baseline_mode'] = 'sampled' estimates it instead
+            self.full_yolo_result = self.video_processor.measure_baseline(
                 self.current_video_path,
-                progress_callback=self._update_progress
+                progress_callback=self._update_progress,
+                frame_callback=self._frame_callback('full_yolo'),
+                cancel_token=cancel_token
             )
             
-            if not self.is_processing:
+            if self.full_yolo_result['cancelled']:
+                final_status = ("Stopped: baseline not completed", "blue")
                 return
             
             # Calculate speedup
             speedup_info = self.video_processor.calculate_speedup(self.two_stage_result, self.full_yolo_result)
             
             # Update UI
-            self.root.after(0, self._display_results, speedup_info)
+            self._post('call', self._display_results, speedup_info)
             
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Processing error: {str(e)}"))
+            self._post('call', messagebox.showerror, "Error", f"Processing error: {str(e)}")
         finally:
             self.is_processing = False
-            self.root.after(0, lambda: self.status_label.config(text="Ready", foreground="green"))
-            self.root.after(0, lambda: self.stop_button.config(state=tk.DISABLED))
+            self._post_status(*final_status)
+            self._post('call', lambda: self.stop_button.config(state=tk.DISABLED))
+            self._post('call', lambda: self.start_button.config(state=tk.NORMAL))
+            if self.two_stage_result is not None:
+                self._post('call', lambda: self.compress_button.config(state=tk.NORMAL))
             
+    def _post(self, kind, *payload):
+        """Queue a UI update from a worker thread"""
+        self.ui_queue.put((kind,) + payload)
+        
+    def _post_status(self, text, color):
+        """Queue a status label change from a worker thread"""
+        self._post('status', text, color)
+        
     def _update_progress(self, current, total):
         """Update progress bar"""
-        progress = (current / total) * 100 if total > 0 else 0
-        self.root.after(0, lambda: self._set_progress(progress, current, total))
+        self._post('progress', current, total)
+        
+    def _frame_callback(self, pass_name):
+        """Build a frame_callback that feeds the live view of one processing pass"""
+        def on_frame(info):
+            # Only the newest frame is rendered, so just replace the reference; the
+            # decoder's buffer is only valid during the call, so keep a copy
+            frame = info.get('frame')
+            self._live_frame = (pass_name, frame.copy() if frame is not None else None, info)
+            self._post('frame', pass_name, info.get('active'), len(info['detections']))
+        return on_frame
+        
+    def _drain_ui_queue(self):
+        """Apply queued worker updates once per tick, then reschedule"""
+        progress = None
+        status = None
+        frames_seen = False
+        while True:
+            try:
+                item = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            kind = item[0]
+            if kind == 'progress':
+                progress = item[1:]
+            elif kind == 'status':
+                status = item[1:]
+            elif kind == 'frame':
+                self._count_live_frame(*item[1:])
+                frames_seen = True
+            elif kind == 'pass':
+                self._live_stats = {'pass': item[1], 'frames': 0, 'active': 0, 'objects': 0,
+                                    'started': time.time()}
+            elif kind == 'call':
+                # Earlier coalesced updates must land before the call runs
+                self._apply_progress_and_status(progress, status)
+                progress = status = None
+                item[1](*item[2:])
+        
+        self._apply_progress_and_status(progress, status)
+        if frames_seen:
+            self._update_live_view()
+        self.root.after(self.ui_tick_ms, self._drain_ui_queue)
+        
+    def _apply_progress_and_status(self, progress, status):
+        """Apply the latest coalesced progress and status values"""
+        if progress is not None:
+            current, total = progress
+            self._set_progress((current / total) * 100 if total > 0 else 0, current, total)
+        if status is not None:
+            text, color = status
+            self.status_label.config(text=text, foreground=color)
+        
+    def _count_live_frame(self, pass_name, active, object_count):
+        """Accumulate running statistics for the current pass"""
+        stats = self._live_stats
+        if stats is None or stats['pass'] != pass_name:
+            return
+        stats['frames'] += 1
+        stats['active'] += 1 if active else 0
+        stats['objects'] += object_count
+        
+    def _update_live_view(self):
+        """Show running statistics and the newest processed frame"""
+        stats = self._live_stats
+        if stats is not None:
+            elapsed = max(1e-6, time.time() - stats['started'])
+            title = "兩階段檢測" if stats['pass'] == 'two_stage' else "完整 YOLO 基準"
+            live_text = f"""
+═══════════════════════════════════
+處理中: {title}
+═══════════════════════════════════
+
+已處理影格: {stats['frames']}
+"""
+            if stats['pass'] == 'two_stage':
+                live_text += f"動作影格: {stats['active']}\n"
+            live_text += f"""偵測物件數: {stats['objects']}
+處理速度: {stats['frames'] / elapsed:.1f} fps
+"""
+            self.metrics_text.config(state=tk.NORMAL)
+            if self.metrics_text.tag_ranges("live"):
+                # Replace only the previous live block, keeping any summary above it
+                self.metrics_text.delete("live.first", tk.END)
+            self.metrics_text.insert(tk.END, live_text, "live")
+            self.metrics_text.config(state=tk.DISABLED)
+        
+        live = self._live_frame
+        self._live_frame = None
+        if not self._show_live_frames or live is None or live[1] is None:
+            return
+        pass_name, frame, info = live
+        if pass_name == 'two_stage':
+            frame = self.video_processor.render_two_stage_frame(frame, info['active'], info['detections'])
+        else:
+            frame = self.video_processor.yolo_detector.draw_detections(frame, info['detections'])
+        self._show_image(frame)
         
     def _set_progress(self, progress, current, total):
         """Set progress bar value"""
@@ -268,6 +660,17 @@ class VideoRecognitionApp:
         self.metrics_text.config(state=tk.NORMAL)
         self.metrics_text.delete(1.0, tk.END)
         
+        baseline_text = f"{self.full_yolo_result['total_time']:.2f} 秒"
+        speedup_text = f"{speedup_info['speedup']:.2f}x"
+        if speedup_info['estimated']:
+            low, high = self.full_yolo_result['total_time_ci']
+            level = self.full_yolo_result['confidence_level']
+            samples = len(self.full_yolo_result['sample_frames'])
+            baseline_text += (f" (估計, {level:.0%} 區間 {low:.2f}–{high:.2f} 秒)\n"
+                              f"  抽樣 {samples} 影格, 耗時 {self.full_yolo_result['estimation_time']:.2f} 秒")
+            speedup_low, speedup_high = speedup_info['speedup_ci']
+            speedup_text += f" ({speedup_low:.2f}–{speedup_high:.2f}x)"
+        
         metrics_text = f"""
 ═══════════════════════════════════
 效能指標
@@ -277,11 +680,11 @@ class VideoRecognitionApp:
   {self.two_stage_result['total_time']:.2f} 秒
 
 完整 YOLO 處理時間:
-  {self.full_yolo_result['total_time']:.2f} 秒
+  {baseline_text}
 
 加速結果:
 ───────────────────────────────────
-加速倍數: {speedup_info['speedup']:.2f}x
+加速倍數: {speedup_text}
 節省時間: {speedup_info['time_saved']:.2f} 秒
 加速百分比: {speedup_info['speedup_percent']:.1f}%
 
@@ -304,23 +707,87 @@ YOLO 減少率: {speedup_info['yolo_reduction_percent']:.1f}%
 ✓ 達到 {speedup_info['speedup']:.2f}x 加速
 ✓ 節省 {speedup_info['time_saved']:.2f} 秒
 ✓ 只處理有變化的影格
+"""
+        
+        stage1 = self.two_stage_result.get('stage1')
+        detector = self.video_processor.frame_diff_detector
+        if stage1 and detector.motion_compensation:
+            metrics_text += f"""
+═══════════════════════════════════
+鏡頭運動補償
+───────────────────────────────────
+已補償影格: {stage1['motion_compensated']}/{stage1['frames']}
+抑制的觸發: {stage1['motion_suppressed']}
+"""
+        if stage1 and detector.lighting_mode != 'off':
+            metrics_text += f"""
+═══════════════════════════════════
+光線變化抑制 ({detector.lighting_mode})
+───────────────────────────────────
+抑制的觸發: {stage1['lighting_suppressed']}
+"""
+        
+        roi = self.two_stage_result.get('roi')
+        if roi:
+            metrics_text += f"""
+═══════════════════════════════════
+ROI 遮罩
+───────────────────────────────────
+分析區域: {roi['coverage']:.1%}
+第一階段處理像素: {roi['stage1_area']:.1%}
+第二階段處理像素: {roi['stage2_area']:.1%}
+忽略區域內的偵測: {roi['filtered_detections']}
+"""
+        
+        cascade = self.two_stage_result.get('cascade')
+        if cascade:
+            metrics_text += f"""
+═══════════════════════════════════
+模型級聯 (yolov8{cascade['model_size']} → yolov8{cascade['escalation_model_size']})
+───────────────────────────────────
+升級影格: {cascade['escalations']}/{cascade['frames']}
+升級比例: {cascade['escalation_rate']:.1%}
 """
         
         self.metrics_text.insert(1.0, metrics_text)
         self.metrics_text.config(state=tk.DISABLED)
         
-        # Enable playback and compression
+        self.compress_button.config(state=tk.NORMAL)
+        self.status_label.config(text="Complete! Ready to review results", foreground="green")
+        
+    def _display_two_stage_result(self):
+        """Make the two-stage result browsable as soon as its pass finishes"""
+        self._show_live_frames = False
+        result = self.two_stage_result
+        
+        self.metrics_text.config(state=tk.NORMAL)
+        self.metrics_text.delete(1.0, tk.END)
+        self.metrics_text.insert(1.0, f"""
+═══════════════════════════════════
+兩階段檢測完成
+═══════════════════════════════════
+
+兩階段處理時間: {result['total_time']:.2f} 秒
+總影格數: {result['total_frames']}
+動作影格: {result['frames_with_detection']}
+YOLO 運算次數: {result['yolo_runs']}
+""")
+        self.metrics_text.config(state=tk.DISABLED)
+        
+        # Enable playback while the baseline keeps running
         self.play_button.config(state=tk.NORMAL)
         self.pause_button.config(state=tk.NORMAL)
-        self.compress_button.config(state=tk.NORMAL)
-        self.frame_scale.config(to=len(self.two_stage_result['frames']) - 1)
-        self.frame_var.set(f"0/{len(self.two_stage_result['frames'])}")
+        self.prev_event_button.config(state=tk.NORMAL)
+        self.next_event_button.config(state=tk.NORMAL)
+        self.search_button.config(state=tk.NORMAL)
+        self.detection_index = None
+        self.frame_scale.config(to=len(result['frames']) - 1)
+        self.frame_var.set(f"0/{len(result['frames'])}")
         self.current_frame_index = 0
         
         # Display first frame
         self._display_frame(0)
-        
-        self.status_label.config(text="Complete! Ready to review results", foreground="green")
+        self._draw_timeline()
         
     def play_video(self):
         """Play the processed video"""
@@ -337,7 +804,9 @@ YOLO 減少率: {speedup_info['yolo_reduction_percent']:.1f}%
         
     def _playback_thread(self):
         """Background thread for video playback"""
-        fps = self.two_stage_result['fps'] if self.two_stage_result['fps'] > 0 else 30
+        # With frame stride, each stored entry covers several source frames
+        fps = self.two_stage_result.get('analysis_fps') or self.two_stage_result['fps']
+        fps = fps if fps > 0 else 30
         frame_delay = 1.0 / fps
         
         while self.is_playing and self.current_frame_index < len(self.two_stage_result['frames']):
@@ -364,56 +833,76 @@ YOLO 減少率: {speedup_info['yolo_reduction_percent']:.1f}%
             return
         frame_index = int(float(value))
         self.current_frame_index = frame_index
+        if self.scrubbing and self._show_thumbnail(frame_index):
+            # Load the full frame only once the slider rests
+            if self._scrub_after_id is not None:
+                self.root.after_cancel(self._scrub_after_id)
+            self._scrub_after_id = self.root.after(self.scrub_settle_ms, self._settle_scrub)
+            return
         self._display_frame(frame_index)
         
+    def on_scrub_start(self, event):
+        """Slider grabbed: show thumbnails until it is released"""
+        self.scrubbing = True
+        
+    def on_scrub_end(self, event):
+        """Slider released: show the full frame at the final position"""
+        self.scrubbing = False
+        self._settle_scrub()
+        
+    def _settle_scrub(self):
+        """Replace the thumbnail with the full frame"""
+        if self._scrub_after_id is not None:
+            self.root.after_cancel(self._scrub_after_id)
+            self._scrub_after_id = None
+        self._display_frame(self.current_frame_index)
+        
+    def _show_thumbnail(self, frame_index):
+        """
+        Show the low-resolution thumbnail nearest to a frame
+        
+        Returns:
+            False if the current results have no thumbnails
+        """
+        thumbnails = self.two_stage_result.get('thumbnails') if self.two_stage_result else None
+        thumb = thumbnails.get(frame_index) if thumbnails is not None else None
+        if thumb is None:
+            return False
+        self._show_image(thumb)
+        self.frame_var.set(f"{frame_index + 1}/{len(self.two_stage_result['frames'])}")
+        self._update_timeline_marker(frame_index)
+        return True
+        
+    def _show_image(self, frame):
+        """Draw a BGR (or grayscale) frame on the canvas, scaled to fit"""
+        canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        video_size = (self.video_width, self.video_height) if self.video_width and self.video_height else None
+        photo = ImageTk.PhotoImage(frame_to_display_image(frame, canvas_size, video_size))
+        
+        self.canvas.create_image(0, 0, image=photo, anchor=tk.NW)
+        self.canvas.image = photo  # Keep a reference
+        
     def _display_frame(self, frame_index):
         """Display a specific frame"""
         if not self.two_stage_result or frame_index >= len(self.two_stage_result['frames']):
             return
         
+        # Overlays are rendered on demand from the source video
         frame = self.two_stage_result['frames'][frame_index]
+        if frame is None:
+            return
         has_detection = self.two_stage_result['detected_frames'][frame_index]
         detections = self.two_stage_result['yolo_results'][frame_index]
         
-        # Resize for display
-        # Scale the frame to fit the canvas while preserving aspect ratio
-        try:
-            canvas_w = max(1, self.canvas.winfo_width())
-            canvas_h = max(1, self.canvas.winfo_height())
-            # Compute target size preserving video's aspect ratio
-            vid_w = self.video_width or frame.shape[1]
-            vid_h = self.video_height or frame.shape[0]
-            vid_ar = vid_w / vid_h
-            canvas_ar = canvas_w / canvas_h
-
-            if canvas_ar > vid_ar:
-                # canvas is wider relative to height -> limit by height
-                target_h = canvas_h
-                target_w = int(target_h * vid_ar)
-            else:
-                # canvas is taller relative to width -> limit by width
-                target_w = canvas_w
-                target_h = int(target_w / vid_ar)
-
-            # Resize frame to target dimensions
-            display_frame = cv2.resize(frame, (max(1, int(target_w)), max(1, int(target_h))))
-        except Exception:
-            display_frame = frame.copy()
-        
-        # Convert BGR to RGB and then to PhotoImage
-        cv2_image = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(cv2_image)
-        photo = ImageTk.PhotoImage(pil_image)
-        
-        self.canvas.create_image(0, 0, image=photo, anchor=tk.NW)
-        self.canvas.image = photo  # Keep a reference
+        self._show_image(frame)
         
         # Update frame info
         self.frame_info_text.config(state=tk.NORMAL)
         self.frame_info_text.delete(1.0, tk.END)
         
+        source_frame = self.two_stage_result['frame_indices'][frame_index]
         info_text = f"""
-影格: {frame_index + 1}/{len(self.two_stage_result['frames'])}
+影格: {frame_index + 1}/{len(self.two_stage_result['frames'])} (原始影格 #{source_frame})
 
 狀態: {"🔴 偵測到動作" if has_detection else "🟢 無動作"}
 
@@ -436,6 +925,111 @@ YOLO 減少率: {speedup_info['yolo_reduction_percent']:.1f}%
         self.updating_slider = True
         self.frame_scale.set(frame_index)
         self.updating_slider = False
+        self._update_timeline_marker(frame_index)
+        
+    def _draw_timeline(self):
+        """Render the activity timeline strip and current-position marker"""
+        self.timeline_canvas.delete("all")
+        if not self.two_stage_result or 'activity' not in self.two_stage_result:
+            return
+        
+        activity = self.two_stage_result['activity']
+        width = max(1, self.timeline_canvas.winfo_width())
+        height = max(1, self.timeline_canvas.winfo_height())
+        trigger_ratio, detections = activity.column_activity(width)
+        
+        # One column per pixel: orange where Stage 1 triggered, green where objects were found
+        for x in range(width):
+            if detections[x] > 0:
+                color = '#2ecc71'
+            elif trigger_ratio[x] > 0:
+                color = '#e67e22'
+            else:
+                continue
+            bar_h = max(2, int(height * min(1.0, 0.3 + trigger_ratio[x])))
+            self.timeline_canvas.create_line(x, height, x, height - bar_h, fill=color)
+        
+        if len(activity) > 0:
+            marker_x = int(self.current_frame_index / len(activity) * width)
+            self.timeline_canvas.create_line(marker_x, 0, marker_x, height, fill='white', width=2, tags="marker")
+    
+    def _update_timeline_marker(self, frame_index):
+        """Move the current-position marker without redrawing the strip"""
+        if not self.two_stage_result or 'activity' not in self.two_stage_result:
+            return
+        total = len(self.two_stage_result['activity'])
+        if total == 0:
+            return
+        width = max(1, self.timeline_canvas.winfo_width())
+        height = max(1, self.timeline_canvas.winfo_height())
+        marker_x = int(frame_index / total * width)
+        self.timeline_canvas.coords("marker", marker_x, 0, marker_x, height)
+    
+    def on_timeline_click(self, event):
+        """Jump to the frame under the mouse on the timeline strip"""
+        if not self.two_stage_result or 'activity' not in self.two_stage_result:
+            return
+        total = len(self.two_stage_result['activity'])
+        width = max(1, self.timeline_canvas.winfo_width())
+        frame_index = min(total - 1, max(0, int(event.x / width * total)))
+        self._jump_to_frame(frame_index)
+    
+    def jump_to_next_event(self):
+        """Jump to the start of the next motion/detection event"""
+        if not self.two_stage_result:
+            return
+        frame_index = self.two_stage_result['activity'].next_event(self.current_frame_index)
+        if frame_index is None:
+            self.status_label.config(text="No later events", foreground="blue")
+            return
+        self._jump_to_frame(frame_index)
+    
+    def jump_to_previous_event(self):
+        """Jump to the start of the previous motion/detection event"""
+        if not self.two_stage_result:
+            return
+        frame_index = self.two_stage_result['activity'].previous_event(self.current_frame_index)
+        if frame_index is None:
+            self.status_label.config(text="No earlier events", foreground="blue")
+            return
+        self._jump_to_frame(frame_index)
+    
+    def search_detections(self, event=None):
+        """Jump to the next segment matching a query like 'person 12:00-15:00'"""
+        if not self.two_stage_result:
+            return
+        text = self.search_var.get().strip()
+        if not text:
+            return
+        try:
+            class_name, start_time, end_time = parse_query(text)
+        except ValueError as e:
+            self.status_label.config(text=str(e), foreground="red")
+            return
+        
+        if self.detection_index is None:
+            self.detection_index = DetectionIndex.from_result(self.two_stage_result)
+        segments = self.detection_index.segments(class_name, start_time, end_time)
+        if len(segments) == 0:
+            self.status_label.config(text=f"No matches for '{class_name}'", foreground="blue")
+            return
+        
+        # Repeated searches cycle through segments after the current position
+        current_source = self.two_stage_result['frame_indices'][self.current_frame_index]
+        segment = next((seg for seg in segments if seg[0] > current_source), segments[0])
+        self._jump_to_frame(self.detection_index.entry_index(segment[0]))
+        
+        fps = self.two_stage_result['fps'] if self.two_stage_result['fps'] > 0 else 30
+        self.status_label.config(
+            text=f"{class_name}: {len(segments)} 段, 跳至 {segment[0] / fps:.1f}s",
+            foreground="green"
+        )
+    
+    def _jump_to_frame(self, frame_index):
+        """Pause playback and show the given frame"""
+        self.is_playing = False
+        self.current_frame_index = frame_index
+        self._display_frame(frame_index)
         
     def start_compression(self):
         """Start video compression"""
@@ -447,13 +1041,15 @@ YOLO 減少率: {speedup_info['yolo_reduction_percent']:.1f}%
         file_path = filedialog.asksaveasfilename(
             title="Save Compressed Video",
             defaultextension=".mp4",
-            filetypes=[("MP4 files", "*.mp4"), ("All files", "*.*")]
+            filetypes=[("MP4 files", "*.mp4"), ("Frame archive", "*.frames"), ("All files", "*.*")]
         )
         
         if not file_path:
             return
         
+        self.cancel_token = CancellationToken()
         self.compress_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL)
         self.status_label.config(text="Compressing video...", foreground="orange")
         
         # Start compression in background thread
@@ -467,19 +1063,25 @@ YOLO 減少率: {speedup_info['yolo_reduction_percent']:.1f}%
             self.compression_result = self.video_processor.compress_video_smart(
                 self.current_video_path,
                 output_path,
-                progress_callback=self._update_progress
+                progress_callback=self._update_progress,
+                cancel_token=self.cancel_token
             )
             
             # Update compression info display
-            self.root.after(0, self._display_compression_info)
+            self._post('call', self._display_compression_info)
             
-            self.status_label.config(text="Video compression complete!", foreground="green")
-            messagebox.showinfo("Success", f"Video compressed successfully!\nSaved to: {output_path}")
+            if self.compression_result['cancelled']:
+                self._post_status("Compression stopped: partial output saved", "blue")
+            else:
+                self._post_status("Video compression complete!", "green")
+                self._post('call', messagebox.showinfo, "Success",
+                           f"Video compressed successfully!\nSaved to: {output_path}")
             
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Compression error: {str(e)}"))
+            self._post('call', messagebox.showerror, "Error", f"Compression error: {str(e)}")
         finally:
-            self.root.after(0, lambda: self.compress_button.config(state=tk.NORMAL))
+            self._post('call', lambda: self.compress_button.config(state=tk.NORMAL))
+            self._post('call', lambda: self.stop_button.config(state=tk.DISABLED))
             
     def _display_compression_info(self):
         """Display compression statistics"""
@@ -511,12 +1113,53 @@ YOLO 減少率: {speedup_info['yolo_reduction_percent']:.1f}%
         self.compression_text.insert(1.0, compression_text)
         self.compression_text.config(state=tk.DISABLED)
         
+    def open_archive(self):
+        """Load a .frames archive into the frame viewer"""
+        file_path = filedialog.askopenfilename(
+            title="Open Frame Archive",
+            filetypes=[("Frame archive", "*.frames"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        
+        try:
+            result = self.video_processor.load_archive_result(file_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Unable to open archive: {e}")
+            return
+        if result['total_frames'] == 0:
+            messagebox.showwarning("Warning", "Archive contains no frames")
+            return
+        
+        self.is_playing = False
+        self.two_stage_result = result
+        self.full_yolo_result = None
+        self.detection_index = None
+        archive = result['archive']
+        self.video_width = archive.width
+        self.video_height = archive.height
+        self.video_fps = archive.fps
+        self.video_label.config(text=f"Archive: {os.path.basename(file_path)}", foreground="green")
+        
+        self.play_button.config(state=tk.NORMAL)
+        self.pause_button.config(state=tk.NORMAL)
+        self.prev_event_button.config(state=tk.NORMAL)
+        self.next_event_button.config(state=tk.NORMAL)
+        self.search_button.config(state=tk.NORMAL)
+        self.frame_scale.config(to=len(result['frames']) - 1)
+        self.current_frame_index = 0
+        self._display_frame(0)
+        self._draw_timeline()
+        
+        self.status_label.config(text=f"Archive loaded: {len(result['frames'])} kept frames", foreground="green")
+        
     def stop_processing(self):
-        """Stop video processing"""
-        self.is_processing = False
+        """Stop video processing or compression after the current frame"""
+        # The worker re-enables the buttons once it has released the video
+        self.cancel_token.cancel()
         self.is_playing = False
         self.stop_button.config(state=tk.DISABLED)
-        self.start_button.config(state=tk.NORMAL)
+        self.status_label.config(text="Stopping...", foreground="orange")
 
 
 def main():
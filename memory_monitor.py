@@ -0,0 +1,163 @@
+"""
+Memory Monitor Module
+Peak RSS and tracemalloc instrumentation for processing runs
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+
+MB = 1024 * 1024
+
+
+def current_rss():
+    """
+    Get the resident set size of this process in bytes
+
+    Returns:
+        RSS in bytes (peak RSS on platforms without /proc)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+class MemoryMonitor:
+    """
+    Tracks peak RSS (sampled in a background thread) and Python allocations
+    (tracemalloc) for one run, with a per-stage breakdown.
+
+    Usage inside a processing loop:
+
+        monitor = MemoryMonitor().start()
+        for frame in ...:
+            ...decode...
+            monitor.checkpoint('decode')
+            ...stage 1...
+            monitor.checkpoint('stage1')
+        report = monitor.stop()
+    """
+
+    def __init__(self, top_n=10, sample_interval=0.05):
+        """
+        Initialize the monitor
+
+        Args:
+            top_n: Number of top allocation sites included in the report
+            sample_interval: Seconds between RSS samples
+        """
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+        self.stages = {}
+        self._started_tracing = False
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+        self._rss_start = 0
+        self._rss_peak = 0
+        self._traced_peak = 0
+        self._last_checkpoint = None
+
+    def _sample_rss(self):
+        """Background loop keeping the highest RSS seen"""
+        while not self._stop_sampling.wait(self.sample_interval):
+            self._rss_peak = max(self._rss_peak, current_rss())
+
+    def start(self):
+        """
+        Start tracing allocations and sampling RSS
+
+        Returns:
+            self
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._rss_start = current_rss()
+        self._rss_peak = self._rss_start
+        self._traced_peak = tracemalloc.get_traced_memory()[0]
+        self._stop_sampling.clear()
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+        self._last_checkpoint = time.perf_counter()
+        return self
+
+    def checkpoint(self, stage):
+        """
+        Attribute the time and allocation peak since the previous checkpoint to a stage
+
+        Args:
+            stage: Stage name, e.g. 'decode', 'stage1', 'stage2'
+        """
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self._traced_peak = max(self._traced_peak, peak)
+        self._rss_peak = max(self._rss_peak, current_rss())
+
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = {'calls': 0, 'time': 0.0, 'peak_traced_mb': 0.0, 'retained_mb': 0.0}
+        stats['calls'] += 1
+        stats['time'] += now - self._last_checkpoint
+        stats['peak_traced_mb'] = max(stats['peak_traced_mb'], peak / MB)
+        stats['retained_mb'] = current / MB
+        self._last_checkpoint = now
+
+    def stop(self):
+        """
+        Stop instrumentation and build the report
+
+        Returns:
+            dict with:
+                - rss_start_mb, peak_rss_mb, rss_growth_mb: Process RSS
+                - peak_traced_mb: Peak Python allocations during the run
+                - stages: Per-stage calls, time, peak and retained traced memory
+                - top_allocators: Largest live allocation sites at the end of the run
+        """
+        self._stop_sampling.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+        _, peak = tracemalloc.get_traced_memory()
+        self._traced_peak = max(self._traced_peak, peak)
+        self._rss_peak = max(self._rss_peak, current_rss())
+
+        statistics = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        )).statistics('lineno')
+        top_allocators = [
+            {
+                'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_mb': stat.size / MB,
+                'count': stat.count,
+            }
+            for stat in statistics[:self.top_n]
+        ]
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        return {
+            'rss_start_mb': self._rss_start / MB,
+            'peak_rss_mb': self._rss_peak / MB,
+            'rss_growth_mb': (self._rss_peak - self._rss_start) / MB,
+            'peak_traced_mb': self._traced_peak / MB,
+            'stages': self.stages,
+            'top_allocators': top_allocators,
+        }
@@ -0,0 +1,280 @@
+"""
+Model Registry Module
+Process-wide cache of loaded YOLO models with a memory budget and LRU eviction
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import YOLO_CONFIG
+
+
+MB = 1024 * 1024
+
+# Weight file naming per export backend
+BACKEND_WEIGHTS = {
+    'pytorch': 'yolov8{size}.pt',
+    'onnx': 'yolov8{size}.onnx',
+    'openvino': 'yolov8{size}_openvino_model',
+    'torchscript': 'yolov8{size}.torchscript',
+}
+
+
+def _estimate_model_bytes(model, weights):
+    """Estimate the memory held by a loaded model"""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        pass
+    if os.path.isfile(weights):
+        return os.path.getsize(weights)
+    return 0
+
+
+class _ModelPool:
+    """
+    Instances of one model, each used by one inference call at a time.
+
+    A model object is not safe to call from two threads at once, so callers
+    check an instance out for each call. Extra instances are only loaded
+    when every loaded one is busy, the pool is below max_instances and the
+    registry's memory budget has room; otherwise callers wait for one to be
+    returned.
+    """
+
+    def __init__(self, loader, max_instances, can_grow=None):
+        """
+        Initialize the pool with one loaded instance
+
+        Args:
+            loader: Callable returning (model, size_bytes) for a new instance
+            max_instances: Most instances ever loaded for this key
+            can_grow: Callable(pool) -> whether one more instance fits the budget
+        """
+        self._loader = loader
+        self._can_grow = can_grow or (lambda pool: True)
+        self.max_instances = max(1, max_instances)
+        model, self.instance_bytes = loader()
+        self.instances = [model]
+        self._free = [model]
+        self._loading = 0
+        self._available = threading.Condition()
+
+    @property
+    def model(self):
+        """The first loaded instance"""
+        return self.instances[0]
+
+    @property
+    def size_bytes(self):
+        """Estimated bytes held by loaded instances and those being loaded"""
+        return self.instance_bytes * (len(self.instances) + self._loading)
+
+    def _may_grow(self):
+        return len(self.instances) + self._loading < self.max_instances and self._can_grow(self)
+
+    @contextmanager
+    def checkout(self):
+        """Borrow an instance for one inference call"""
+        with self._available:
+            while not self._free and not self._may_grow():
+                self._available.wait()
+            model = self._free.pop() if self._free else None
+            if model is None:
+                self._loading += 1  # Reserves the instance's bytes in the budget
+        if model is None:
+            # Load outside the condition so returned instances can still be handed out
+            try:
+                model = self._loader()[0]
+            finally:
+                with self._available:
+                    self._loading -= 1
+                    if model is not None:
+                        self.instances.append(model)
+                    self._available.notify()
+        try:
+            yield model
+        finally:
+            with self._available:
+                self._free.append(model)
+                self._available.notify()
+
+
+class ModelRegistry:
+    """
+    Caches loaded models keyed by (model size, backend, device).
+
+    Models are shared by every YOLODetector that asks for the same key, so
+    switching presets or creating another VideoProcessor does not reload
+    weights from disk. Each key holds a small pool of instances: concurrent
+    callers (job service workers, streams) get their own instance up to
+    max_instances while the memory budget allows, and wait on each other
+    beyond that. When loading a new model pushes the estimated total past
+    the budget, the least recently used models are dropped (the most recent
+    one is always kept).
+
+    Detectors borrow instances per call through checkout() rather than
+    keeping models, so an evicted model is freed as soon as its in-flight
+    calls return.
+    """
+
+    def __init__(self, memory_budget_mb=None, max_instances=None):
+        """
+        Initialize the registry
+
+        Args:
+            memory_budget_mb: Total size of cached models before eviction
+                              (default: YOLO_CONFIG['model_cache_mb'])
+            max_instances: Instances per key for concurrent inference
+                           (default: YOLO_CONFIG['model_instances'])
+        """
+        budget = memory_budget_mb if memory_budget_mb is not None else YOLO_CONFIG.get('model_cache_mb', 1024)
+        self.memory_budget = budget * MB
+        self.max_instances = max_instances or YOLO_CONFIG.get('model_instances', 2)
+        self._entries = OrderedDict()
+        self._live_pools = weakref.WeakSet()  # Cached pools plus evicted ones still in use
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_size, backend=None, device=None):
+        """Build the cache key for a model"""
+        return (model_size, backend or 'pytorch', str(device) if device is not None else None)
+
+    def _load(self, model_size, backend, device):
+        """Load weights from disk"""
+        if backend not in BACKEND_WEIGHTS:
+            raise ValueError(f"Unknown backend: {backend}")
+        # Imported here so modules that never load a model work without ultralytics
+        from ultralytics import YOLO
+
+        weights = BACKEND_WEIGHTS[backend].format(size=model_size)
+        model = YOLO(weights)
+        if device is not None and backend == 'pytorch':
+            model.to('cpu' if device == 'cpu' else f'cuda:{device}' if device.isdigit() else device)
+        return model, _estimate_model_bytes(model, weights)
+
+    def _can_grow(self, pool):
+        """Whether a cached pool may load one more instance within the budget"""
+        with self._lock:
+            if not any(entry is pool for entry in self._entries.values()):
+                return False  # Evicted: finish in-flight calls on what it has
+            return self.total_bytes() + pool.instance_bytes <= self.memory_budget
+
+    def _entry(self, model_size, backend=None, device=None, count=True):
+        """Get (loading the first instance if needed) the pool for a key"""
+        key = self.make_key(model_size, backend, device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return entry
+            self.misses += 1
+            # Loading under the lock keeps two threads from reading the same weights twice
+            entry = _ModelPool(lambda: self._load(*key), self.max_instances, self._can_grow)
+            self._entries[key] = entry
+            self._live_pools.add(entry)
+            self._evict()
+            return entry
+
+    def get(self, model_size, backend=None, device=None):
+        """
+        Get a loaded model, loading it on first use
+
+        The caller's reference keeps the model in memory even after eviction;
+        use checkout() for inference.
+
+        Args:
+            model_size: YOLOv8 model size ('n', 's', 'm', 'l', 'x')
+            backend: 'pytorch', 'onnx', 'openvino' or 'torchscript'
+            device: Device string ('cpu', '0', ...) or None for the default
+
+        Returns:
+            ultralytics YOLO model
+        """
+        return self._entry(model_size, backend, device).model
+
+    def load(self, model_size, backend=None, device=None):
+        """Make sure a model is cached (loading it now) without keeping a reference"""
+        self._entry(model_size, backend, device)
+
+    @contextmanager
+    def checkout(self, model_size, backend=None, device=None):
+        """
+        Borrow a model instance for one inference call, reloading the model
+        if it was evicted
+
+        Usage:
+            with registry.checkout('n') as model:
+                results = model(frame)
+        """
+        pool = self._entry(model_size, backend, device, count=False)
+        with pool.checkout() as model:
+            yield model
+
+    def _evict(self):
+        """Drop least recently used models until the cache fits the budget"""
+        while len(self._entries) > 1 and self.total_bytes() > self.memory_budget:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def total_bytes(self):
+        """Estimated bytes held by cached models"""
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def held_bytes(self):
+        """Estimated bytes still in memory, including evicted models in use"""
+        return sum(pool.size_bytes for pool in list(self._live_pools))
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def clear(self):
+        """Drop every cached model"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict with cached keys, instances per key, cached and actually
+            held size, budget, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                'models': list(self._entries.keys()),
+                'instances': {key: len(entry.instances) for key, entry in self._entries.items()},
+                'total_mb': self.total_bytes() / MB,
+                'held_mb': self.held_bytes() / MB,
+                'budget_mb': self.memory_budget / MB,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Get the process-wide registry shared by all processors
+
+    Returns:
+        ModelRegistry
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry()
+        return _default_registry
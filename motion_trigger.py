@@ -0,0 +1,171 @@
+"""
+Motion Trigger Module
+Hysteresis state machine around frame differencing for stable Stage-2 triggering
+"""
+
+from collections import namedtuple
+
+
+# Result of feeding one frame to the trigger
+TriggerResult = namedtuple('TriggerResult', ['active', 'run_yolo', 'diff_count', 'event'])
+
+# Trigger states
+IDLE = 'idle'
+PENDING = 'pending'
+ACTIVE = 'active'
+
+
+class MotionTrigger:
+    """
+    Turns per-frame difference counts into clean motion events.
+
+    A frame whose diff count exceeds on_threshold arms the trigger; after
+    min_on_frames consecutive armed frames an event starts at that frame
+    (the armed frames before it stay outside the event, as they were
+    reported inactive). The event stays
+    open until the diff count has stayed at or below off_threshold for more than
+    hold_frames frames. Inside an event YOLO is scheduled every yolo_interval
+    frames instead of on every frame that happens to cross the threshold.
+    """
+
+    def __init__(self, detector, on_threshold=None, off_threshold=None,
+                 min_on_frames=1, hold_frames=0, yolo_interval=1):
+        """
+        Initialize the motion trigger
+
+        Args:
+            detector: FrameDifferenceDetector used to compute diff counts
+            on_threshold: Diff count a frame must exceed to arm the trigger
+                          (default: detector.threshold, like detect_difference)
+            off_threshold: Diff count at or below which the event starts to close
+                           (default: same as on_threshold)
+            min_on_frames: Consecutive armed frames required to start an event
+            hold_frames: Frames at or below off_threshold tolerated before closing an event
+            yolo_interval: Run YOLO every N frames inside an event
+        """
+        self.detector = detector
+        self.on_threshold = on_threshold if on_threshold is not None else detector.threshold
+        self.off_threshold = off_threshold if off_threshold is not None else self.on_threshold
+        if self.off_threshold > self.on_threshold:
+            raise ValueError("off_threshold must not exceed on_threshold")
+        self.min_on_frames = max(1, int(min_on_frames))
+        self.hold_frames = max(0, int(hold_frames))
+        self.yolo_interval = max(1, int(yolo_interval))
+        self.reset()
+
+    @classmethod
+    def from_config(cls, detector, config):
+        """
+        Create a trigger from a TRIGGER_CONFIG-style dict
+
+        Args:
+            detector: FrameDifferenceDetector used to compute diff counts
+            config: dict with on_threshold, off_threshold_ratio, min_on_frames,
+                    hold_frames, yolo_interval and enabled keys
+
+        Returns:
+            MotionTrigger
+        """
+        if not config.get('enabled', True):
+            # Degenerate settings reproduce the plain per-frame boolean
+            return cls(detector)
+        on_threshold = config.get('on_threshold') or detector.threshold
+        return cls(
+            detector,
+            on_threshold=on_threshold,
+            off_threshold=on_threshold * config.get('off_threshold_ratio', 1.0),
+            min_on_frames=config.get('min_on_frames', 1),
+            hold_frames=config.get('hold_frames', 0),
+            yolo_interval=config.get('yolo_interval', 1),
+        )
+
+    def reset(self):
+        """Reset the trigger and the underlying detector"""
+        self.detector.reset()
+        self.state = IDLE
+        self.frame_index = -1
+        self.events = []
+        self._armed_frames = 0
+        self._quiet_frames = 0
+        self._event_start = None
+        self._last_yolo_frame = None
+
+    def update(self, frame):
+        """
+        Feed the next frame to the trigger
+
+        Args:
+            frame: Current frame (BGR image)
+
+        Returns:
+            TriggerResult(active, run_yolo, diff_count, event) where event is
+            'start', 'end' or None
+        """
+        _, _, diff_count = self.detector.detect_difference(frame)
+        return self.update_count(diff_count)
+
+    def update_count(self, diff_count):
+        """
+        Advance the state machine with an already computed diff count
+
+        Args:
+            diff_count: Changed-pixel count for the current frame
+
+        Returns:
+            TriggerResult(active, run_yolo, diff_count, event)
+        """
+        self.frame_index += 1
+        event = None
+
+        if self.state == ACTIVE:
+            if diff_count <= self.off_threshold:
+                self._quiet_frames += 1
+                if self._quiet_frames > self.hold_frames:
+                    self._close_event(self.frame_index - 1)
+                    event = 'end'
+            else:
+                self._quiet_frames = 0
+
+        if self.state != ACTIVE and event is None:
+            # Strictly above, matching has_difference in detect_difference
+            if diff_count > self.on_threshold:
+                self._armed_frames += 1
+                self.state = PENDING
+                if self._armed_frames >= self.min_on_frames:
+                    self.state = ACTIVE
+                    # Start where the event fires, so events match the frames reported active
+                    self._event_start = self.frame_index
+                    self._quiet_frames = 0
+                    self._last_yolo_frame = None
+                    event = 'start'
+            else:
+                self._armed_frames = 0
+                self.state = IDLE
+
+        active = self.state == ACTIVE
+        run_yolo = False
+        if active and (self._last_yolo_frame is None or
+                       self.frame_index - self._last_yolo_frame >= self.yolo_interval):
+            run_yolo = True
+            self._last_yolo_frame = self.frame_index
+
+        return TriggerResult(active, run_yolo, diff_count, event)
+
+    def _close_event(self, end_frame):
+        """Record the open event and return to idle"""
+        self.events.append({'start': self._event_start, 'end': end_frame})
+        self.state = IDLE
+        self._armed_frames = 0
+        self._quiet_frames = 0
+        self._event_start = None
+
+    def finish(self):
+        """
+        Close any event still open at the end of the video
+
+        Returns:
+            list of events as {'start': frame, 'end': frame} dicts
+        """
+        if self.state == ACTIVE:
+            self._close_event(self.frame_index)
+        return self.events
@@ -0,0 +1,363 @@
+"""
+Multi-Stream Runtime Module
+Asyncio runtime that screens many video streams with per-stream Stage 1 and a
+shared, deadline-aware YOLO batcher
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from cancellation import CancellationToken
+from config import MULTI_STREAM_CONFIG, TRIGGER_CONFIG, TUNING_PROFILE, YOLO_CONFIG
+from frame_difference import FrameDifferenceDetector
+from motion_trigger import MotionTrigger
+from roi_mask import RegionMask
+from video_reader import open_video
+from yolo_detector import YOLODetector
+
+
+class StreamStats:
+    """
+    Per-stream counters exposed by the runtime
+    """
+
+    def __init__(self):
+        self.frames_read = 0
+        self.frames_triggered = 0
+        self.frames_inferred = 0
+        self.detections = 0
+        self.drops = 0          # Triggered frames never inferred (queue overflow, missed deadline or shutdown)
+        self.errors = 0         # Triggered frames whose inference raised
+        self.last_error = None
+        self.lag = 0.0          # Capture-to-result latency of the last inferred frame (seconds)
+        self.max_lag = 0.0
+
+    def as_dict(self):
+        """Get counters as a plain dict"""
+        return dict(self.__dict__)
+
+
+class _InferenceRequest:
+    """A triggered frame waiting for the shared detector"""
+
+    __slots__ = ('stream_id', 'frame', 'frame_number', 'capture_time', 'deadline', 'future')
+
+    def __init__(self, stream_id, frame, frame_number, capture_time, deadline, future):
+        self.stream_id = stream_id
+        self.frame = frame
+        self.frame_number = frame_number
+        self.capture_time = capture_time
+        self.deadline = deadline
+        self.future = future
+
+
+class InferenceBatcher:
+    """
+    Shared YOLO batcher with fair, deadline-aware scheduling across streams.
+
+    Each stream has its own bounded queue. A batch is filled round-robin, one
+    request per stream per round, visiting streams in order of their most
+    urgent deadline, so a busy stream cannot starve quiet ones. Requests whose
+    deadline has passed are dropped instead of being inferred late.
+
+    Every submitted future is resolved: with Detections, with None when the
+    request is dropped (including after the batcher has closed or been
+    cancelled), or with the detector's exception.
+    """
+
+    def __init__(self, detector, stats, max_batch_size=8, max_batch_wait=0.02,
+                 max_pending_per_stream=4, confidence=0.5, cancel_token=None):
+        """
+        Initialize the batcher
+
+        Args:
+            detector: YOLODetector shared by all streams
+            stats: dict stream_id -> StreamStats, updated with drops
+            max_batch_size: Maximum frames per model call
+            max_batch_wait: Seconds to wait for more requests before running a partial batch
+            max_pending_per_stream: Queue bound per stream; the oldest request is dropped when full
+            confidence: YOLO confidence threshold
+            cancel_token: CancellationToken; once cancelled, queued requests
+                          are dropped instead of inferred
+        """
+        self.detector = detector
+        self.stats = stats
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_wait = max_batch_wait
+        self.max_pending_per_stream = max(1, max_pending_per_stream)
+        self.confidence = confidence
+        self.cancel_token = cancel_token or CancellationToken()
+        self._queues = {}
+        self._wakeup = asyncio.Event()
+        # The model is not thread-safe: all inference runs on one worker thread
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.batches_run = 0
+        self.closed = False  # Set once run() has returned; later submissions are dropped
+
+    def submit(self, stream_id, frame, frame_number, capture_time, deadline):
+        """
+        Queue a triggered frame for inference
+
+        Args:
+            stream_id: Stream identifier
+            frame: Frame (BGR image)
+            frame_number: Frame number within the stream
+            capture_time: time.monotonic() when the frame was read
+            deadline: time.monotonic() after which the result is useless
+
+        Returns:
+            asyncio.Future resolving to Detections, or None if the frame was dropped
+        """
+        future = asyncio.get_running_loop().create_future()
+        if self.closed or self.cancel_token.cancelled:
+            # Nothing will serve the queue any more
+            self.stats[stream_id].drops += 1
+            future.set_result(None)
+            return future
+        queue = self._queues.setdefault(stream_id, deque())
+        if len(queue) >= self.max_pending_per_stream:
+            self._drop(queue.popleft())
+        queue.append(_InferenceRequest(stream_id, frame, frame_number, capture_time, deadline, future))
+        self._wakeup.set()
+        return future
+
+    def _drop(self, request):
+        """Resolve a request without inference and count the drop"""
+        self.stats[request.stream_id].drops += 1
+        if not request.future.done():
+            request.future.set_result(None)
+
+    def _pending(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def _next_batch(self):
+        """Expire late requests, then pick a fair earliest-deadline-first batch"""
+        now = time.monotonic()
+        for queue in self._queues.values():
+            while queue and queue[0].deadline < now:
+                self._drop(queue.popleft())
+
+        batch = []
+        while len(batch) < self.max_batch_size:
+            ready = [q for q in self._queues.values() if q]
+            if not ready:
+                break
+            ready.sort(key=lambda q: q[0].deadline)
+            for queue in ready:
+                batch.append(queue.popleft())
+                if len(batch) == self.max_batch_size:
+                    break
+        return batch
+
+    async def run(self, stop_event):
+        """
+        Serve batches until stop_event is set and all queues are drained, or
+        until the cancel token fires
+
+        Args:
+            stop_event: asyncio.Event signalling that no more requests will come
+        """
+        loop = asyncio.get_running_loop()
+
+        def wake():
+            # cancel() may come from any thread
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Loop already closed; nothing left to wake
+
+        self.cancel_token.add_callback(wake)
+        try:
+            while not self.cancel_token.cancelled:
+                if not self._pending():
+                    if stop_event.is_set():
+                        break
+                    self._wakeup.clear()
+                    waiter = asyncio.ensure_future(self._wakeup.wait())
+                    stopper = asyncio.ensure_future(stop_event.wait())
+                    await asyncio.wait({waiter, stopper}, return_when=asyncio.FIRST_COMPLETED)
+                    waiter.cancel()
+                    stopper.cancel()
+                    continue
+
+                # Give other streams a moment to fill the batch
+                if self._pending() < self.max_batch_size and self.max_batch_wait > 0:
+                    await asyncio.sleep(self.max_batch_wait)
+
+                batch = self._next_batch()
+                if not batch:
+                    continue
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor, self.detector.detect_batch,
+                        [r.frame for r in batch], self.confidence
+                    )
+                except Exception as e:
+                    # Hand the error to the streams waiting on this batch and keep serving
+                    for request in batch:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+                self.batches_run += 1
+                for request, detections in zip(batch, results):
+                    if not request.future.done():
+                        request.future.set_result(detections)
+        finally:
+            self.closed = True
+            self.cancel_token.remove_callback(wake)
+            for queue in self._queues.values():
+                while queue:
+                    self._drop(queue.popleft())
+            self._executor.shutdown(wait=False)
+
+
+class MultiStreamRuntime:
+    """
+    Watches many video streams on one host.
+
+    Every stream decodes and runs its own MotionTrigger (Stage 1); only
+    triggered frames are sent to the shared InferenceBatcher (Stage 2).
+    """
+
+    def __init__(self, sources, detector=None, model_size=None, result_callback=None,
+                 max_latency=None, realtime=None, cancel_token=None):
+        """
+        Initialize the runtime
+
+        Args:
+            sources: dict stream_id -> video path, device index or stream URL
+            detector: Shared YOLODetector (created from model_size if None)
+            model_size: YOLOv8 model size used when no detector is given
+            result_callback: Optional callable(stream_id, frame_number, detections)
+            max_latency: Seconds a triggered frame may wait for inference
+                         (default: MULTI_STREAM_CONFIG)
+            realtime: Pace file sources at their native fps to emulate live feeds
+            cancel_token: CancellationToken that stops all streams; stop() sets it
+        """
+        self.sources = dict(sources)
+        if detector is None:
+            detector = YOLODetector(model_size=model_size or YOLO_CONFIG['model_size'],
+                                    backend=TUNING_PROFILE.get('backend'),
+                                    device=TUNING_PROFILE.get('device'))
+            detector.imgsz = TUNING_PROFILE.get('imgsz')
+        self.detector = detector
+        self.result_callback = result_callback
+        self.max_latency = max_latency if max_latency is not None else MULTI_STREAM_CONFIG['max_latency']
+        self.realtime = realtime if realtime is not None else MULTI_STREAM_CONFIG['realtime']
+        self.stats = {stream_id: StreamStats() for stream_id in self.sources}
+        self.cancel_token = cancel_token or CancellationToken()
+
+    async def _read(self, cap):
+        """Decode the next frame off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, cap.read)
+
+    async def _run_stream(self, stream_id, source, batcher):
+        """Decode, screen and submit frames for one stream"""
+        stats = self.stats[stream_id]
+        # Batched inference keeps full frames; the saved mask limits Stage 1 and filters results
+        roi_mask = RegionMask.for_source(source)
+        trigger = MotionTrigger.from_config(FrameDifferenceDetector(threshold=5000, roi_mask=roi_mask), TRIGGER_CONFIG)
+        loop = asyncio.get_running_loop()
+        cap = await loop.run_in_executor(None, open_video, source)
+        fps = cap.fps or 30
+        frame_delay = 1.0 / fps
+        pending = set()
+        frame_number = -1
+        try:
+            while not self.cancel_token.cancelled:
+                read_start = time.monotonic()
+                ret, frame = await self._read(cap)
+                if not ret:
+                    break
+                frame_number += 1
+                stats.frames_read += 1
+                capture_time = time.monotonic()
+
+                # Stage 1 is cheap, but still keep it off the event loop thread
+                result = await loop.run_in_executor(None, trigger.update, frame)
+                if result.run_yolo:
+                    stats.frames_triggered += 1
+                    future = batcher.submit(stream_id, frame, frame_number, capture_time,
+                                            capture_time + self.max_latency)
+                    task = asyncio.ensure_future(self._collect(stream_id, frame_number, capture_time, future,
+                                                               roi_mask, frame.shape))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+
+                if self.realtime:
+                    await asyncio.sleep(max(0.0, frame_delay - (time.monotonic() - read_start)))
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            cap.release()
+
+    async def _collect(self, stream_id, frame_number, capture_time, future, roi_mask=None, frame_shape=None):
+        """Wait for one inference result and update lag counters"""
+        try:
+            detections = await future
+        except Exception as e:
+            stats = self.stats[stream_id]
+            stats.errors += 1
+            stats.last_error = str(e)
+            return
+        if detections is None:
+            return
+        if roi_mask is not None:
+            detections = roi_mask.filter_detections(detections, frame_shape[1], frame_shape[0])
+        stats = self.stats[stream_id]
+        stats.frames_inferred += 1
+        stats.detections += len(detections)
+        stats.lag = time.monotonic() - capture_time
+        stats.max_lag = max(stats.max_lag, stats.lag)
+        if self.result_callback:
+            self.result_callback(stream_id, frame_number, detections)
+
+    async def run(self):
+        """
+        Run all streams until they end or stop() is called
+
+        Returns:
+            dict stream_id -> counters (see StreamStats)
+        """
+        batcher_stop = asyncio.Event()
+        batcher = InferenceBatcher(
+            self.detector, self.stats,
+            max_batch_size=MULTI_STREAM_CONFIG['max_batch_size'],
+            max_batch_wait=MULTI_STREAM_CONFIG['max_batch_wait'],
+            max_pending_per_stream=MULTI_STREAM_CONFIG['max_pending_per_stream'],
+            confidence=YOLO_CONFIG['confidence'],
+            cancel_token=self.cancel_token,
+        )
+        batcher_task = asyncio.ensure_future(batcher.run(batcher_stop))
+        try:
+            await asyncio.gather(*(
+                self._run_stream(stream_id, source, batcher)
+                for stream_id, source in self.sources.items()
+            ))
+        finally:
+            batcher_stop.set()
+            await batcher_task
+        return self.get_stats()
+
+    def stop(self):
+        """Ask all streams to stop after their current frame (safe from any thread)"""
+        self.cancel_token.cancel()
+
+    def get_stats(self):
+        """Get per-stream counters as dicts"""
+        return {stream_id: stats.as_dict() for stream_id, stats in self.stats.items()}
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python multi_stream.py <video_or_url> [<video_or_url> ...]")
+        sys.exit(1)
+
+    runtime = MultiStreamRuntime({f"stream{i}": src for i, src in enumerate(sys.argv[1:])})
+    for stream_id, counters in asyncio.run(runtime.run()).items():
+        print(f"{stream_id}: {counters}")
@@ -0,0 +1,184 @@
+"""
+ROI Mask Module
+Region-of-interest and ignore polygons shared by Stage 1 and Stage 2
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from config import ROI_CONFIG, ROI_MASKS, save_roi_mask
+from detections import Detections
+
+
+def mask_key(source):
+    """
+    Key a mask is saved under: the absolute path for videos (same-named
+    files in different folders keep their own masks), the device index or
+    URL for cameras
+    """
+    if isinstance(source, int) or '://' in str(source):
+        return str(source)
+    return os.path.abspath(str(source))
+
+
+class RegionMask:
+    """
+    Include and exclude polygons in normalized (0-1) coordinates, so one
+    definition fits any decoding resolution.
+
+    A pixel counts when it lies inside an include polygon (or anywhere, if
+    there are none) and outside every exclude polygon. Rendered masks,
+    bounding boxes and crop windows are cached per frame size.
+    """
+
+    def __init__(self, include=None, exclude=None):
+        """
+        Initialize the mask
+
+        Args:
+            include: List of polygons [(x, y), ...] limiting the analyzed area
+            exclude: List of polygons removed from it (trees, clocks, roads)
+        """
+        self.include = [self._clean(p) for p in (include or []) if len(p) >= 3]
+        self.exclude = [self._clean(p) for p in (exclude or []) if len(p) >= 3]
+        self._cache = {}
+
+    @staticmethod
+    def _clean(polygon):
+        return [(min(max(float(x), 0.0), 1.0), min(max(float(y), 0.0), 1.0)) for x, y in polygon]
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    def __repr__(self):
+        return f"RegionMask(include={len(self.include)}, exclude={len(self.exclude)})"
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a mask from its saved form ({'include': [...], 'exclude': [...]})"""
+        return cls(data.get('include'), data.get('exclude'))
+
+    def to_dict(self):
+        """Saved form of the mask"""
+        return {'include': [list(map(list, p)) for p in self.include],
+                'exclude': [list(map(list, p)) for p in self.exclude]}
+
+    @classmethod
+    def for_source(cls, source):
+        """
+        Load the mask saved for a video or camera
+
+        Returns:
+            RegionMask, or None when nothing is saved for this source
+        """
+        key = mask_key(source)
+        data = ROI_MASKS.get(key)
+        if data is None and os.path.isabs(key):
+            # Masks saved before keys were absolute paths are keyed by file name
+            data = ROI_MASKS.get(os.path.basename(key))
+        mask = cls.from_dict(data) if data else None
+        return mask if mask else None
+
+    def save(self, source):
+        """Save the mask for a video or camera (an empty mask removes it)"""
+        save_roi_mask(mask_key(source), self.to_dict() if self else None)
+
+    @staticmethod
+    def _to_pixels(polygon, width, height):
+        points = np.array(polygon, dtype=np.float64) * (width - 1, height - 1)
+        return np.round(points).astype(np.int32)
+
+    def _geometry(self, width, height):
+        """Rendered mask, bounding box of the included area and padded crop window"""
+        key = (width, height)
+        geometry = self._cache.get(key)
+        if geometry is not None:
+            return geometry
+        if self.include:
+            image = np.zeros((height, width), dtype=np.uint8)
+            cv2.fillPoly(image, [self._to_pixels(p, width, height) for p in self.include], 255)
+        else:
+            image = np.full((height, width), 255, dtype=np.uint8)
+        if self.exclude:
+            cv2.fillPoly(image, [self._to_pixels(p, width, height) for p in self.exclude], 0)
+
+        x, y, w, h = cv2.boundingRect(image)
+        if w == 0 or h == 0:
+            x, y, w, h = 0, 0, width, height  # Nothing included: keep shapes valid, every count is 0
+        bbox = (x, y, x + w, y + h)
+        pad_x = int(width * ROI_CONFIG.get('crop_padding', 0.05))
+        pad_y = int(height * ROI_CONFIG.get('crop_padding', 0.05))
+        crop = (max(0, x - pad_x), max(0, y - pad_y), min(width, x + w + pad_x), min(height, y + h + pad_y))
+        geometry = self._cache[key] = (image, bbox, crop)
+        return geometry
+
+    def render(self, width, height):
+        """
+        Get the mask image for a frame size
+
+        Returns:
+            (height, width) uint8 image, 255 where pixels are analyzed
+        """
+        return self._geometry(width, height)[0]
+
+    def bounding_box(self, width, height):
+        """Bounding box (x1, y1, x2, y2) of the analyzed pixels"""
+        return self._geometry(width, height)[1]
+
+    def coverage(self, width, height):
+        """Fraction of the frame that is analyzed"""
+        return cv2.countNonZero(self.render(width, height)) / float(width * height)
+
+    def stage1_region(self, width, height):
+        """
+        Region Stage 1 works on
+
+        Returns:
+            ((x1, y1, x2, y2), mask image cropped to that box)
+        """
+        image, (x1, y1, x2, y2), _ = self._geometry(width, height)
+        return (x1, y1, x2, y2), image[y1:y2, x1:x2]
+
+    def crop_window(self, width, height, max_area=None):
+        """
+        Window Stage 2 runs inference on
+
+        The included area's bounding box plus padding, or None when that
+        would still cover more than max_area of the frame (cropping would
+        save too little to be worth losing context).
+        """
+        max_area = ROI_CONFIG.get('crop_max_area', 0.8) if max_area is None else max_area
+        x1, y1, x2, y2 = self._geometry(width, height)[2]
+        if (x2 - x1) * (y2 - y1) > max_area * width * height:
+            return None
+        return x1, y1, x2, y2
+
+    def filter_detections(self, detections, width, height):
+        """
+        Drop detections whose box center lies outside the analyzed area
+
+        Args:
+            detections: Detections in full-frame coordinates
+            width, height: Frame size
+
+        Returns:
+            Detections
+        """
+        if not len(detections):
+            return detections
+        image = self.render(width, height)
+        boxes = detections.boxes
+        cx = np.clip((boxes[:, 0] + boxes[:, 2]) // 2, 0, width - 1)
+        cy = np.clip((boxes[:, 1] + boxes[:, 3]) // 2, 0, height - 1)
+        keep = image[cy, cx] > 0
+        return detections if keep.all() else detections.filter(keep)
+
+
+def offset_detections(detections, dx, dy):
+    """Shift detections found in a crop back to full-frame coordinates"""
+    if not len(detections) or (dx == 0 and dy == 0):
+        return detections
+    return Detections(detections.class_ids, detections.confidences,
+                      detections.boxes + np.array([dx, dy, dx, dy], dtype=np.int32), detections.names)
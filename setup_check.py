@@ -4,11 +4,17 @@ SETUP GUIDE - Two-Stage Video Recognition System
 
 This script provides step-by-step setup instructions and validation.
 Run this to verify your environment is properly configured.
+
+Run with --calibrate to measure this machine and write the tuning profile
+that config.py and VideoProcessor load at startup.
 """
 
 import sys
 import subprocess
 import platform
+import os
+import json
+import time
 
 def check_python_version():
     """Check Python version"""
@@ -111,8 +117,232 @@ def print_quick_start():
    - View frame-by-frame detections
 """)
 
+def _thread_options():
+    """Thread counts worth trying on this machine"""
+    cpu = os.cpu_count() or 1
+    return sorted({1, max(1, cpu // 2), cpu})
+
+def measure_decode(video_path):
+    """Measure grayscale decode speed per decoder backend and thread count"""
+    from video_reader import av, open_video
+    
+    print("\nDecode Speed:")
+    print("-" * 50)
+    backends = ['opencv'] + (['pyav'] if av is not None else [])
+    results = []
+    for backend in backends:
+        for threads in [0] + _thread_options():
+            try:
+                reader = open_video(video_path, backend, threads)
+            except Exception as e:
+                print(f"✗ {backend:7} threads={threads:<3} - {e}")
+                break
+            frames = 0
+            start = time.perf_counter()
+            while reader.grab():
+                reader.retrieve(gray=True)
+                frames += 1
+            elapsed = time.perf_counter() - start
+            reader.release()
+            fps = frames / elapsed if elapsed > 0 else 0.0
+            results.append({'backend': backend, 'threads': threads, 'fps': fps})
+            print(f"✓ {backend:7} threads={threads:<3} {fps:8.1f} fps")
+    return results
+
+def measure_stage1(resolutions):
+    """Measure Stage-1 cost per resolution and OpenCV thread count"""
+    import itertools
+    import cv2
+    from benchmarks import synthetic_frames, time_call
+    from frame_difference import FrameDifferenceDetector
+    
+    print("\nStage-1 Cost:")
+    print("-" * 50)
+    default_threads = cv2.getNumThreads()
+    results = []
+    try:
+        for width, height in resolutions:
+            frames = synthetic_frames(width, height)
+            for threads in _thread_options():
+                cv2.setNumThreads(threads)
+                detector = FrameDifferenceDetector(threshold=5000)
+                cycle = itertools.cycle(frames)
+                timing = time_call(lambda: detector.detect_difference(next(cycle)), 20)
+                results.append({'resolution': [width, height], 'cv_threads': threads, 'ms': timing['median_ms']})
+                print(f"✓ {width}x{height:<5} cv_threads={threads:<3} {timing['median_ms']:8.2f} ms/frame")
+    finally:
+        cv2.setNumThreads(default_threads)
+    return results
+
+def measure_inference(model_sizes, imgsz_candidates, frame):
+    """Measure YOLO latency per device, backend, model size and working resolution"""
+    from benchmarks import time_call
+    from model_registry import BACKEND_WEIGHTS
+    from yolo_detector import YOLODetector
+    import torch
+    
+    print("\nInference Latency:")
+    print("-" * 50)
+    devices = ['cpu'] + (['0'] if torch.cuda.is_available() else [])
+    results = []
+    torch_threads = None
+    for device in devices:
+        for model_size in model_sizes:
+            backends = ['pytorch'] + [b for b, weights in BACKEND_WEIGHTS.items()
+                                      if b != 'pytorch' and os.path.exists(weights.format(size=model_size))]
+            for backend in backends:
+                try:
+                    detector = YOLODetector(model_size=model_size, backend=backend, device=device)
+                except Exception as e:
+                    print(f"✗ yolov8{model_size} {backend} on {device} - {e}")
+                    continue
+                if device == 'cpu' and torch_threads is None:
+                    torch_threads = _best_torch_threads(detector, frame)
+                for imgsz in imgsz_candidates:
+                    detector.imgsz = imgsz
+                    timing = time_call(lambda: detector.detect(frame), 5)
+                    results.append({'device': device, 'model_size': model_size, 'backend': backend,
+                                    'imgsz': imgsz, 'ms': timing['median_ms']})
+                    print(f"✓ yolov8{model_size} {backend:11} {device:3} imgsz={imgsz:<4} {timing['median_ms']:8.1f} ms")
+    return results, torch_threads
+
+def _best_torch_threads(detector, frame):
+    """Fastest PyTorch intra-op thread count for CPU inference"""
+    import torch
+    from benchmarks import time_call
+    
+    timings = {}
+    for threads in _thread_options():
+        torch.set_num_threads(threads)
+        timings[threads] = time_call(lambda: detector.detect(frame), 3)['median_ms']
+    best = min(timings, key=timings.get)
+    torch.set_num_threads(best)
+    print(f"✓ torch_threads={best} ({timings[best]:.1f} ms)")
+    return best
+
+def measure_batch(choice, batch_sizes, frame):
+    """Measure per-frame cost of batched inference with the chosen model"""
+    from benchmarks import time_call
+    from yolo_detector import YOLODetector
+    
+    print("\nBatch Size:")
+    print("-" * 50)
+    detector = YOLODetector(model_size=choice['model_size'], backend=choice['backend'], device=choice['device'])
+    detector.imgsz = choice['imgsz']
+    results = []
+    for batch_size in batch_sizes:
+        frames = [frame] * batch_size
+        timing = time_call(lambda: detector.detect_batch(frames), 3)
+        per_frame = timing['median_ms'] / batch_size
+        results.append({'batch_size': batch_size, 'ms_per_frame': per_frame, 'ms': timing['median_ms']})
+        print(f"✓ batch={batch_size:<3} {per_frame:8.1f} ms/frame")
+    return results
+
+def choose_settings(measurements, latency_budget_ms, model_sizes):
+    """
+    Pick tuning settings from calibration measurements
+    
+    The largest model (then the largest working resolution) whose latency
+    fits the budget wins; when nothing fits, the fastest configuration.
+    """
+    settings = {}
+    if measurements['decode']:
+        best = max(measurements['decode'], key=lambda r: r['fps'])
+        settings['decoder'] = best['backend']
+        settings['decoder_threads'] = best['threads']
+    if measurements['stage1']:
+        largest = max(tuple(r['resolution']) for r in measurements['stage1'])
+        at_largest = [r for r in measurements['stage1'] if tuple(r['resolution']) == largest]
+        settings['cv_threads'] = min(at_largest, key=lambda r: r['ms'])['cv_threads']
+    if measurements.get('torch_threads'):
+        settings['torch_threads'] = measurements['torch_threads']
+    
+    inference = measurements['inference']
+    if inference:
+        fitting = [r for r in inference if r['ms'] <= latency_budget_ms]
+        if fitting:
+            choice = max(fitting, key=lambda r: (model_sizes.index(r['model_size']), r['imgsz'], -r['ms']))
+        else:
+            choice = min(inference, key=lambda r: r['ms'])
+        settings.update({k: choice[k] for k in ('model_size', 'backend', 'device', 'imgsz')})
+    
+    if measurements.get('batch'):
+        # Smallest batch within 10% of the best per-frame cost keeps latency low
+        best = min(r['ms_per_frame'] for r in measurements['batch'])
+        settings['batch_size'] = min(r['batch_size'] for r in measurements['batch'] if r['ms_per_frame'] <= best * 1.1)
+    return settings
+
+def calibrate(video_path=None, output=None):
+    """
+    Measure this machine and write the tuning profile
+    
+    Args:
+        video_path: Video used for the decode test (default: a synthetic 720p clip)
+        output: Profile path (default: TUNING_CONFIG['profile_path'])
+        
+    Returns:
+        The chosen settings
+    """
+    import tempfile
+    from benchmarks import synthetic_frames, write_synthetic_video
+    from config import TUNING_CONFIG, load_tuning_profile, tuning_profile_path
+    
+    print("\nCalibration:")
+    print("=" * 50)
+    started = time.time()
+    temp_video = None
+    if video_path is None:
+        fd, temp_video = tempfile.mkstemp(suffix='.mp4')
+        os.close(fd)
+        write_synthetic_video(temp_video, 1280, 720, 120)
+        video_path = temp_video
+    try:
+        measurements = {
+            'decode': measure_decode(video_path),
+            'stage1': measure_stage1(TUNING_CONFIG['stage1_resolutions']),
+        }
+    finally:
+        if temp_video:
+            os.remove(temp_video)
+    
+    frame = synthetic_frames(1280, 720, count=1)[0]
+    model_sizes = TUNING_CONFIG['model_sizes']
+    measurements['inference'], measurements['torch_threads'] = measure_inference(
+        model_sizes, TUNING_CONFIG['imgsz_candidates'], frame)
+    settings = choose_settings(measurements, TUNING_CONFIG['latency_budget_ms'], model_sizes)
+    if 'model_size' in settings:
+        measurements['batch'] = measure_batch(settings, TUNING_CONFIG['batch_sizes'], frame)
+        settings = choose_settings(measurements, TUNING_CONFIG['latency_budget_ms'], model_sizes)
+    
+    path = tuning_profile_path(output)
+    with open(path, 'w') as f:
+        json.dump({
+            'host': platform.node(),
+            'platform': platform.platform(),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'calibration_seconds': time.time() - started,
+            'settings': settings,
+            'measurements': measurements,
+        }, f, indent=2)
+    load_tuning_profile(path)
+    
+    print("\nTuning Profile:")
+    print("-" * 50)
+    for key, value in settings.items():
+        print(f"  {key:16} {value}")
+    print(f"✓ Written to {path}")
+    return settings
+
 def main():
     """Main validation function"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Validate the environment and optionally calibrate this machine")
+    parser.add_argument('--calibrate', action='store_true', help="Measure this machine and write a tuning profile")
+    parser.add_argument('--video', help="Video for the decode measurement (default: synthetic clip)")
+    parser.add_argument('--output', help="Tuning profile path (default: TUNING_CONFIG['profile_path'])")
+    args = parser.parse_args()
+    
     print("""
 ╔══════════════════════════════════════════════════════╗
 ║  Two-Stage Video Recognition System - Setup Check   ║
@@ -130,7 +360,10 @@ def main():
     
     if deps_ok and python_ok:
         print("\n✅ All checks passed! System is ready.")
-        print_quick_start()
+        if args.calibrate:
+            calibrate(args.video, args.output)
+        else:
+            print_quick_start()
     else:
         print("\n❌ Some checks failed. Please install missing dependencies:")
         print("   pip install -r requirements.txt")
@@ -0,0 +1,126 @@
+"""
+Tests for the shared-memory frame ring buffer: slot handoffs, a spawned
+producer/consumer round trip and shared block cleanup
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+import pytest
+
+from frame_ring_buffer import SLOT_FREE, SLOT_READING, SLOT_READY, SLOT_WRITING, SharedFrameRingBuffer
+
+
+SHAPE = (48, 64, 3)
+
+
+def _produce(ring, count):
+    """Child process: write numbered frames into the 'decoded' stage"""
+    for frame_number in range(count):
+        slot = ring.acquire(timeout=10)
+        ring.frame(slot)[:] = frame_number
+        ring.publish(slot, frame_number, stage='decoded')
+    ring.close()
+
+
+def _screen(ring, count, results):
+    """Child process: forward even frames to 'triggered', drop odd ones"""
+    for _ in range(count):
+        slot, frame_number = ring.get(stage='decoded', timeout=10)
+        results.put((frame_number, int(ring.frame(slot)[0, 0, 0])))
+        if frame_number % 2 == 0:
+            ring.publish(slot, frame_number, stage='triggered')
+        else:
+            ring.release(slot)
+    ring.close()
+
+
+@pytest.fixture
+def ring():
+    buffer = SharedFrameRingBuffer(num_slots=3, frame_shape=SHAPE, stages=('decoded', 'triggered'),
+                                   context='spawn')
+    yield buffer
+    if buffer._frames is not None:
+        buffer.close()
+
+
+def test_slot_state_machine(ring):
+    slot = ring.acquire(timeout=1)
+    assert ring.slot_state(slot) == SLOT_WRITING
+    ring.publish(slot, 7, stage='decoded')
+    assert ring.slot_state(slot) == SLOT_READY
+
+    got, frame_number = ring.get(stage='decoded', timeout=1)
+    assert (got, frame_number) == (slot, 7)
+    assert ring.slot_state(slot) == SLOT_READING
+    ring.release(slot)
+    assert ring.slot_state(slot) == SLOT_FREE
+
+
+def test_bad_handoffs_are_rejected(ring):
+    slot = ring.acquire(timeout=1)
+    ring.publish(slot, 0, stage='decoded')
+    # A published slot belongs to the queue, not to the producer any more
+    with pytest.raises(RuntimeError):
+        ring.release(slot)
+    with pytest.raises(RuntimeError):
+        ring.publish(slot, 0, stage='triggered')
+    with pytest.raises(ValueError):
+        ring.publish(slot, 0, stage='unknown')
+
+    ring.get(stage='decoded', timeout=1)
+    ring.release(slot)
+    with pytest.raises(RuntimeError):
+        ring.release(slot)  # Double release
+
+
+def test_full_buffer_times_out(ring):
+    slots = [ring.acquire(timeout=1) for _ in range(ring.num_slots)]
+    assert sorted(slots) == list(range(ring.num_slots))
+    assert ring.acquire(timeout=0.05) is None
+    assert ring.get(stage='decoded', timeout=0.05) == (None, None)
+
+
+def test_spawned_pipeline_round_trip(ring):
+    count = 10  # More frames than slots: slots must be recycled across processes
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    producer = ctx.Process(target=_produce, args=(ring, count))
+    screener = ctx.Process(target=_screen, args=(ring, count, results))
+    producer.start()
+    screener.start()
+
+    triggered = []
+    for _ in range(count // 2):
+        slot, frame_number = ring.get(stage='triggered', timeout=10)
+        assert slot is not None
+        triggered.append((frame_number, int(ring.frame(slot)[0, 0, 0])))
+        ring.release(slot)
+    producer.join(10)
+    screener.join(10)
+
+    assert producer.exitcode == 0 and screener.exitcode == 0
+    screened = sorted(results.get(timeout=5) for _ in range(count))
+    assert screened == [(n, n) for n in range(count)]
+    assert triggered == [(n, n) for n in range(0, count, 2)]
+    assert all(ring.slot_state(slot) == SLOT_FREE for slot in range(ring.num_slots))
+
+
+def test_close_unlinks_in_owner_only(ring):
+    name = ring._shm.name
+    ring.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_for_video_uses_decoded_frame_size(tmp_path):
+    path = str(tmp_path / 'size.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (SHAPE[1], SHAPE[0]))
+    for _ in range(3):
+        writer.write(np.zeros(SHAPE, dtype=np.uint8))
+    writer.release()
+
+    with SharedFrameRingBuffer.for_video(path, num_slots=2) as ring:
+        assert ring.frame(0).shape == SHAPE
@@ -0,0 +1,123 @@
+"""
+Peak-memory regression tests for the processing and compression paths
+
+Decoded frames must never accumulate: peak traced memory may only grow by the
+documented per-frame metadata (frame numbers, timestamps, trigger flags,
+DetectionStore offsets, ActivityTimeline columns, compression frame records)
+as the video gets longer. Thumbnails are turned off; their strip is sized by
+thumbnail_max_count, not by the frame count.
+
+Process RSS is checked too, with a looser budget: it also holds decoder and
+allocator caches that tracemalloc does not see, and it is what deployments
+actually run out of.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+import video_processor
+from detections import Detections
+
+
+WIDTH, HEIGHT = 320, 240
+SHORT_FRAMES, LONG_FRAMES = 90, 450
+
+# A few decoded frames, Stage 1 buffers and the writer: independent of length
+FIXED_BUDGET_MB = 4.0
+# Per-frame metadata kept in the results (see process_video_two_stage)
+PER_FRAME_BUDGET_BYTES = 256
+# RSS growth during a run; one retained 320x240 frame per analyzed frame
+# would add ~100 MB on the long video
+RSS_BUDGET_MB = 48.0
+
+
+class StubDetector:
+    """YOLODetector stand-in that finds one box on every third frame, without a model"""
+
+    model_size = 'n'
+    backend = 'pytorch'
+    device = 'cpu'
+    registry = None
+    cascade = None
+
+    def __init__(self, *args, **kwargs):
+        self.imgsz = None
+        self.calls = 0
+
+    def detect(self, frame, confidence=0.5):
+        self.calls += 1
+        if self.calls % 3:
+            return Detections()
+        return Detections(np.array([0]), np.array([0.9], dtype=np.float32),
+                          np.array([[10, 10, 60, 60]], dtype=np.int32), {0: 'person'})
+
+    def draw_detections(self, frame, detections):
+        return frame.copy()
+
+    def reset_cascade_stats(self):
+        pass
+
+    def cascade_stats(self):
+        return None
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setattr(video_processor, 'YOLODetector', StubDetector)
+    return video_processor.VideoProcessor()
+
+
+@pytest.fixture(scope='module')
+def videos(tmp_path_factory):
+    folder = tmp_path_factory.mktemp('memory')
+    paths = {}
+    for frames in (SHORT_FRAMES, LONG_FRAMES):
+        paths[frames] = str(folder / f'synthetic_{frames}.mp4')
+        write_motion_video(paths[frames], frames)
+    return paths
+
+
+def write_motion_video(path, frames):
+    """Gray video with a large block sweeping across it in every other 15-frame window"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (WIDTH, HEIGHT))
+    for i in range(frames):
+        frame = np.full((HEIGHT, WIDTH, 3), 90, dtype=np.uint8)
+        x = (i % 15) * 16 if (i // 15) % 2 else 0
+        frame[40:200, x:x + 80] = (40, 200, 240)
+        writer.write(frame)
+    writer.release()
+
+
+def _bound_mb(frames):
+    return FIXED_BUDGET_MB + frames * PER_FRAME_BUDGET_BYTES / (1024 * 1024)
+
+
+@pytest.mark.parametrize('frames', [SHORT_FRAMES, LONG_FRAMES])
+def test_two_stage_peak_memory_bounded(processor, videos, frames):
+    result = processor.process_video_two_stage(videos[frames], profile_memory=True, build_thumbnails=False)
+
+    assert result['total_frames'] == frames
+    assert result['yolo_runs'] > 0
+    assert result['memory']['peak_traced_mb'] < _bound_mb(frames)
+    assert result['memory']['rss_growth_mb'] < RSS_BUDGET_MB
+
+
+@pytest.mark.parametrize('frames', [SHORT_FRAMES, LONG_FRAMES])
+def test_compression_peak_memory_bounded(processor, videos, frames, tmp_path):
+    result = processor.compress_video_smart(videos[frames], str(tmp_path / 'compressed.mp4'), profile_memory=True)
+
+    assert result['original_frames'] == frames
+    assert result['memory']['peak_traced_mb'] < _bound_mb(frames)
+    assert result['memory']['rss_growth_mb'] < RSS_BUDGET_MB
+
+
+def test_peak_memory_does_not_scale_with_frames(processor, videos):
+    peaks = {}
+    for frames in (SHORT_FRAMES, LONG_FRAMES):
+        result = processor.process_video_two_stage(videos[frames], profile_memory=True, build_thumbnails=False)
+        peaks[frames] = result['memory']['peak_traced_mb']
+
+    # 5x the frames may only add the per-frame metadata, never a decoded frame each
+    growth_mb = peaks[LONG_FRAMES] - peaks[SHORT_FRAMES]
+    assert growth_mb < (LONG_FRAMES - SHORT_FRAMES) * PER_FRAME_BUDGET_BYTES / (1024 * 1024) + 1.0
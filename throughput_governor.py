@@ -0,0 +1,213 @@
+"""
+Throughput Governor Module
+Adapts Stage-1/Stage-2 settings at runtime to hold a target processing fps
+"""
+
+import logging
+import time
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThroughputGovernor:
+    """
+    Measures rolling per-stage cost and walks a ladder of degradation levels.
+
+    Level 0 is the processor's own configuration. Each higher level trades
+    quality for speed (higher frame-diff threshold, sparser YOLO inside
+    events, smaller inference size, smaller model). When the rolling fps
+    falls below the target the governor steps down the ladder; when there
+    is enough headroom it steps back up. Every change is logged and kept
+    in `adjustments`.
+    """
+
+    def __init__(self, target_fps, levels, window=30, adjust_every=15, headroom=1.3):
+        """
+        Initialize the governor
+
+        Args:
+            target_fps: Processing rate to hold (frames per second)
+            levels: List of level dicts with optional keys threshold_scale,
+                    yolo_interval, imgsz and model_size; levels[0] should be
+                    the neutral setting
+            window: Number of recent frames in the rolling measurements
+            adjust_every: Minimum frames between two adjustments
+            headroom: Recover a level only when fps exceeds target * headroom
+        """
+        if target_fps <= 0:
+            raise ValueError("target_fps must be positive")
+        if not levels:
+            raise ValueError("At least one level is required")
+        self.target_fps = target_fps
+        self.levels = levels
+        self.window = max(1, window)
+        self.adjust_every = max(1, adjust_every)
+        self.headroom = headroom
+        self.level = 0
+        self.adjustments = []
+        self._frame_times = deque(maxlen=self.window)
+        self._stage_times = {}
+        self._frames_since_adjust = 0
+        self._frame_index = 0
+        self._processor = None
+        self._base = None
+
+    @classmethod
+    def from_config(cls, config, target_fps=None):
+        """
+        Create a governor from a GOVERNOR_CONFIG-style dict
+
+        Args:
+            config: dict with target_fps, levels, window, adjust_every, headroom
+            target_fps: Overrides config['target_fps'] when given
+
+        Returns:
+            ThroughputGovernor
+        """
+        return cls(
+            target_fps or config['target_fps'],
+            config['levels'],
+            window=config.get('window', 30),
+            adjust_every=config.get('adjust_every', 15),
+            headroom=config.get('headroom', 1.3),
+        )
+
+    def attach(self, processor):
+        """
+        Remember the processor's baseline settings and start at level 0
+
+        Args:
+            processor: VideoProcessor to control
+        """
+        self._processor = processor
+        trigger = processor.motion_trigger
+        self._base = {
+            'on_threshold': trigger.on_threshold,
+            'off_threshold': trigger.off_threshold,
+            'detector_threshold': processor.frame_diff_detector.threshold,
+            'yolo_interval': trigger.yolo_interval,
+            'imgsz': processor.yolo_detector.imgsz,
+            'model_size': processor.yolo_detector.model_size,
+        }
+        self.level = 0
+        self.adjustments = []
+        self._frame_times.clear()
+        self._stage_times.clear()
+        self._frames_since_adjust = 0
+        self._frame_index = 0
+        self._apply(self.levels[0])
+
+    def detach(self):
+        """Restore the processor's baseline settings"""
+        if self._processor is None:
+            return
+        processor = self._processor
+        trigger = processor.motion_trigger
+        trigger.on_threshold = self._base['on_threshold']
+        trigger.off_threshold = self._base['off_threshold']
+        processor.frame_diff_detector.threshold = self._base['detector_threshold']
+        trigger.yolo_interval = self._base['yolo_interval']
+        processor.yolo_detector.imgsz = self._base['imgsz']
+        if processor.yolo_detector.model_size != self._base['model_size']:
+            processor.set_model_size(self._base['model_size'])
+        self._processor = None
+
+    def _apply(self, level):
+        """Push one level's settings into the processor"""
+        processor = self._processor
+        trigger = processor.motion_trigger
+        scale = level.get('threshold_scale', 1.0)
+        trigger.on_threshold = self._base['on_threshold'] * scale
+        trigger.off_threshold = self._base['off_threshold'] * scale
+        processor.frame_diff_detector.threshold = self._base['detector_threshold'] * scale
+        trigger.yolo_interval = max(self._base['yolo_interval'], level.get('yolo_interval', 1))
+        processor.yolo_detector.imgsz = level.get('imgsz') or self._base['imgsz']
+        model_size = level.get('model_size') or self._base['model_size']
+        if processor.yolo_detector.model_size != model_size:
+            processor.set_model_size(model_size)
+
+    def record(self, stage, seconds):
+        """
+        Record the cost of one stage for the current frame
+
+        Args:
+            stage: Stage name, e.g. 'decode', 'stage1', 'stage2'
+            seconds: Time spent
+        """
+        times = self._stage_times.get(stage)
+        if times is None:
+            times = self._stage_times[stage] = deque(maxlen=self.window)
+        times.append(seconds)
+
+    def stage_costs(self):
+        """Mean rolling cost per stage in seconds"""
+        return {stage: sum(t) / len(t) for stage, t in self._stage_times.items() if t}
+
+    def current_fps(self):
+        """Rolling processing rate over the last `window` frames"""
+        if not self._frame_times:
+            return 0.0
+        total = sum(self._frame_times)
+        return len(self._frame_times) / total if total > 0 else float('inf')
+
+    def frame_done(self, frame_seconds):
+        """
+        Account for one finished frame and adjust the level if needed
+
+        Args:
+            frame_seconds: Wall time spent on the frame, including decode
+
+        Returns:
+            the adjustment dict if the level changed, else None
+        """
+        self._frame_times.append(frame_seconds)
+        self._frame_index += 1
+        self._frames_since_adjust += 1
+        if self._frames_since_adjust < self.adjust_every or len(self._frame_times) < self.window:
+            return None
+
+        fps = self.current_fps()
+        new_level = self.level
+        if fps < self.target_fps and self.level < len(self.levels) - 1:
+            new_level = self.level + 1
+        elif fps > self.target_fps * self.headroom and self.level > 0:
+            new_level = self.level - 1
+        if new_level == self.level:
+            return None
+
+        adjustment = {
+            'frame': self._frame_index,
+            'time': time.time(),
+            'fps': fps,
+            'from_level': self.level,
+            'to_level': new_level,
+            'settings': dict(self.levels[new_level]),
+            'stage_costs': self.stage_costs(),
+        }
+        logger.info("Governor level %d -> %d at frame %d (%.1f fps, target %.1f): %s",
+                    self.level, new_level, self._frame_index, fps, self.target_fps,
+                    self.levels[new_level])
+        self.level = new_level
+        self._apply(self.levels[new_level])
+        self.adjustments.append(adjustment)
+        self._frames_since_adjust = 0
+        # Measurements from the old level no longer describe the new one
+        self._frame_times.clear()
+        return adjustment
+
+    def summary(self):
+        """
+        Get a report of the governor's activity
+
+        Returns:
+            dict with target_fps, final_level, current_fps, stage_costs and adjustments
+        """
+        return {
+            'target_fps': self.target_fps,
+            'final_level': self.level,
+            'current_fps': self.current_fps(),
+            'stage_costs': self.stage_costs(),
+            'adjustments': list(self.adjustments),
+        }
@@ -0,0 +1,112 @@
+"""
+Thumbnails Module
+Low-resolution thumbnail strip built during the decode pass, for fast scrubbing
+"""
+
+import math
+import tempfile
+
+import cv2
+import numpy as np
+
+from config import VIDEO_PROCESSING_CONFIG
+
+
+MB = 1024 * 1024
+
+
+class ThumbnailStrip:
+    """
+    Downscaled BGR copies of every Nth analyzed frame in one contiguous
+    (count, height, width, 3) uint8 array.
+
+    Positions are analyzed-frame indices (the same indices as a result's
+    'frames'); get() returns the nearest stored thumbnail at or before a
+    position. Strips larger than the memmap threshold live in an anonymous
+    temporary file instead of RAM.
+    """
+
+    def __init__(self, frame_size, expected_frames=0, interval=None, width=None,
+                 max_count=None, memmap_mb=None):
+        """
+        Initialize an empty strip
+
+        Args:
+            frame_size: (width, height) of the source frames
+            expected_frames: Analyzed frames expected (sizes the array; 0 = unknown)
+            interval: Keep every Nth position (default: VIDEO_PROCESSING_CONFIG)
+            width: Thumbnail width in pixels; height keeps the aspect ratio
+            max_count: Upper bound on stored thumbnails; widens the interval
+                       for long videos
+            memmap_mb: Back the array with a temporary file above this size
+        """
+        interval = interval or VIDEO_PROCESSING_CONFIG.get('thumbnail_interval', 5)
+        width = width or VIDEO_PROCESSING_CONFIG.get('thumbnail_width', 160)
+        max_count = max_count or VIDEO_PROCESSING_CONFIG.get('thumbnail_max_count', 2000)
+        self.memmap_mb = VIDEO_PROCESSING_CONFIG.get('thumbnail_memmap_mb', 256) if memmap_mb is None else memmap_mb
+
+        self.interval = max(1, interval, math.ceil(expected_frames / max_count) if max_count else 1)
+        src_w, src_h = frame_size
+        self.width = max(1, min(width, src_w or width))
+        self.height = max(1, round(self.width * src_h / src_w)) if src_w and src_h else self.width * 9 // 16
+        self._count = 0
+        self._thumbs = self._allocate(max(1, expected_frames // self.interval + 1))
+
+    def _allocate(self, capacity):
+        """Create the backing array, in RAM or in a temporary file"""
+        shape = (capacity, self.height, self.width, 3)
+        if capacity * self.height * self.width * 3 > self.memmap_mb * MB:
+            # The unlinked temporary file disappears with the mapping
+            return np.memmap(tempfile.TemporaryFile(), dtype=np.uint8, mode='w+', shape=shape)
+        return np.zeros(shape, dtype=np.uint8)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        """Bytes used by the stored thumbnails"""
+        return self._count * self.height * self.width * 3
+
+    def wants(self, position):
+        """Whether the frame at an analyzed position should be stored"""
+        return position == self._count * self.interval
+
+    def add(self, position, frame):
+        """
+        Store the thumbnail for a position if it is due
+
+        Args:
+            position: Analyzed-frame index, increasing by one per frame
+            frame: BGR or grayscale frame
+
+        Returns:
+            True if a thumbnail was stored
+        """
+        if not self.wants(position):
+            return False
+        if self._count == len(self._thumbs):
+            old = self._thumbs
+            self._thumbs = self._allocate(len(old) * 2)
+            self._thumbs[:self._count] = old[:self._count]
+        thumb = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 2:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_GRAY2BGR)
+        self._thumbs[self._count] = thumb
+        self._count += 1
+        return True
+
+    def get(self, position):
+        """
+        Get the thumbnail nearest at or before an analyzed position
+
+        Returns:
+            (height, width, 3) BGR view, or None if the strip is empty
+        """
+        if not self._count:
+            return None
+        return self._thumbs[min(max(0, position) // self.interval, self._count - 1)]
+
+    def as_array(self):
+        """All stored thumbnails as one (count, height, width, 3) array"""
+        return self._thumbs[:self._count]
@@ -6,99 +6,395 @@ Handles two-stage detection and performance measurement
 import cv2
 import time
 import os
+import random
+from statistics import NormalDist
+import numpy as np
+from activity_timeline import ActivityTimeline
+from cancellation import CancellationToken
+from config import (GOVERNOR_CONFIG, PERFORMANCE_CONFIG, ROI_CONFIG, TRIGGER_CONFIG, TUNING_PROFILE,
+                    VIDEO_PROCESSING_CONFIG, YOLO_CONFIG)
+from detection_store import DetectionStore
+from detections import Detections
 from frame_difference import FrameDifferenceDetector
+from frame_archive import FrameArchiveReader, FrameArchiveWriter, is_archive_path
+from frame_source import AnnotatedFrameSequence, FrameReader
+from memory_monitor import MemoryMonitor
+from motion_trigger import MotionTrigger
+from roi_mask import offset_detections
+from throughput_governor import ThroughputGovernor
+from thumbnails import ThumbnailStrip
+from video_reader import open_video
 from yolo_detector import YOLODetector
 
 
+def _stratified_total(samples, stratum_sizes, z):
+    """
+    Estimate a population total from a stratified random sample
+    
+    Args:
+        samples: One list of sampled values per stratum
+        stratum_sizes: Number of frames in each stratum
+        z: Normal quantile of the confidence level
+        
+    Returns:
+        (total, low, high)
+    """
+    total = 0.0
+    variance = 0.0
+    for values, size in zip(samples, stratum_sizes):
+        if not values:
+            continue
+        size = int(size)
+        n = len(values)
+        total += size * float(np.mean(values))
+        if n > 1:
+            # Finite population correction: a fully sampled stratum has no error
+            variance += size * size * (1 - n / size) * float(np.var(values, ddof=1)) / n
+    margin = z * variance ** 0.5
+    return total, max(0.0, total - margin), total + margin
+
+
+def _apply_thread_settings():
+    """Apply the tuning profile's OpenCV and PyTorch thread counts"""
+    if TUNING_PROFILE.get('cv_threads'):
+        cv2.setNumThreads(int(TUNING_PROFILE['cv_threads']))
+    if TUNING_PROFILE.get('torch_threads'):
+        try:
+            import torch
+            torch.set_num_threads(int(TUNING_PROFILE['torch_threads']))
+        except ImportError:
+            pass
+
+
 class VideoProcessor:
     """
     Two-stage video processing: frame difference detection + YOLO
     """
     
-    def __init__(self, yolo_model_size='n'):
+    def __init__(self, yolo_model_size=None):
         """
         Initialize video processor
         
+        Backend, device, inference size and thread counts come from the host
+        tuning profile when setup_check.py --calibrate has written one.
+        
         Args:
-            yolo_model_size: YOLOv8 model size
+            yolo_model_size: YOLOv8 model size (default: YOLO_CONFIG['model_size'])
         """
+        _apply_thread_settings()
         self.frame_diff_detector = FrameDifferenceDetector(threshold=5000)
-        self.yolo_detector = YOLODetector(model_size=yolo_model_size)
+        self.motion_trigger = MotionTrigger.from_config(self.frame_diff_detector, TRIGGER_CONFIG)
+        self.yolo_detector = YOLODetector(model_size=yolo_model_size or YOLO_CONFIG['model_size'],
+                                          backend=TUNING_PROFILE.get('backend'),
+                                          device=TUNING_PROFILE.get('device'))
+        self.yolo_detector.imgsz = TUNING_PROFILE.get('imgsz')
+        self.roi_mask = None
+        self.roi_filtered = 0  # Detections dropped in ignored areas during the last run
+        
+    def set_roi_mask(self, roi_mask):
+        """
+        Limit both stages to a region of interest
+        
+        Args:
+            roi_mask: RegionMask (include/exclude polygons) or None for the whole frame
+        """
+        self.roi_mask = roi_mask if roi_mask else None
+        self.frame_diff_detector.set_roi_mask(self.roi_mask)
+        
+    def _detect_in_roi(self, frame):
+        """
+        Run YOLO on the region of interest
+        
+        The frame is cropped to the included area when that saves enough
+        pixels, boxes are mapped back to full-frame coordinates, and
+        detections centered in ignored areas are dropped.
+        """
+        if self.roi_mask is None:
+            return self.yolo_detector.detect(frame)
+        height, width = frame.shape[:2]
+        window = self.roi_mask.crop_window(width, height) if ROI_CONFIG.get('crop_stage2', True) else None
+        if window is None:
+            detections = self.yolo_detector.detect(frame)
+        else:
+            x1, y1, x2, y2 = window
+            crop = np.ascontiguousarray(frame[y1:y2, x1:x2])
+            detections = offset_detections(self.yolo_detector.detect(crop), x1, y1)
+        kept = self.roi_mask.filter_detections(detections, width, height)
+        self.roi_filtered += len(detections) - len(kept)
+        return kept
+        
+    def _roi_summary(self, width, height):
+        """Share of the frame each stage processed under the ROI mask, or None without one"""
+        if self.roi_mask is None or not width or not height:
+            return None
+        area = float(width * height)
+        (x1, y1, x2, y2), _ = self.roi_mask.stage1_region(width, height)
+        window = self.roi_mask.crop_window(width, height) if ROI_CONFIG.get('crop_stage2', True) else None
+        stage2_area = 1.0 if window is None else (window[2] - window[0]) * (window[3] - window[1]) / area
+        return {
+            'coverage': self.roi_mask.coverage(width, height),
+            'stage1_area': (x2 - x1) * (y2 - y1) / area,
+            'stage2_area': stage2_area,
+            'filtered_detections': self.roi_filtered,
+        }
+        
+    def set_model_size(self, model_size):
+        """
+        Switch the YOLO model, keeping the current inference settings
+        
+        Args:
+            model_size: YOLOv8 model size ('n', 's', 'm', 'l', 'x')
+        """
+        if model_size == self.yolo_detector.model_size:
+            return
+        # Cached models make this instant for sizes that were loaded before
+        old = self.yolo_detector
+        self.yolo_detector = YOLODetector(model_size=model_size, backend=old.backend,
+                                          device=old.device, registry=old.registry, cascade=old.cascade)
+        self.yolo_detector.imgsz = old.imgsz
+        self.yolo_detector.cascade_frames = old.cascade_frames
+        self.yolo_detector.cascade_escalations = old.cascade_escalations
+        
+    def render_two_stage_frame(self, frame, has_difference, detections):
+        """
+        Draw two-stage overlays (detections + status text) on a copy of a frame
+        
+        Args:
+            frame: Source frame (BGR or grayscale image), left unmodified
+            has_difference: Whether Stage 1 triggered on this frame
+            detections: YOLO detections for this frame
+            
+        Returns:
+            annotated_frame: Annotated BGR copy of the frame
+        """
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        annotated_frame = self.yolo_detector.draw_detections(frame, detections)
+        status_text = "DETECTED: Difference" if has_difference else "No Difference"
+        cv2.putText(annotated_frame, status_text, (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0) if has_difference else (0, 0, 255), 2)
+        return annotated_frame
         
-    def process_video_two_stage(self, video_path, progress_callback=None):
+    @staticmethod
+    def _start_memory_monitor(profile_memory):
+        """Start a MemoryMonitor if profiling is requested (or enabled in config)"""
+        if profile_memory is None:
+            profile_memory = PERFORMANCE_CONFIG.get('profile_memory', False)
+        return MemoryMonitor().start() if profile_memory else None
+        
+    @staticmethod
+    def get_frame_stride(fps, frame_stride=None, analysis_fps=None):
+        """
+        Resolve how many source frames to advance per analyzed frame
+        
+        Args:
+            fps: Source video frame rate
+            frame_stride: Analyze every Nth frame (default: VIDEO_PROCESSING_CONFIG)
+            analysis_fps: Target analysis rate; takes precedence over frame_stride
+            
+        Returns:
+            stride: int >= 1
+        """
+        if frame_stride is None and analysis_fps is None:
+            frame_stride = VIDEO_PROCESSING_CONFIG.get('frame_stride', 1)
+            analysis_fps = VIDEO_PROCESSING_CONFIG.get('analysis_fps')
+        if analysis_fps:
+            return max(1, int(round(fps / analysis_fps))) if fps > 0 else 1
+        return max(1, int(frame_stride or 1))
+        
+    def process_video_two_stage(self, video_path, progress_callback=None, frame_stride=None, analysis_fps=None,
+                                frame_callback=None, target_fps=None, profile_memory=None, cancel_token=None,
+                                build_thumbnails=None):
         """
         Process video with two-stage detection (frame diff + YOLO)
         
+        With a frame stride above 1, skipped frames are only grabbed (not
+        decoded), Stage 1 compares consecutive sampled frames, and every
+        per-frame list below has one entry per analyzed frame.
+        
+        Memory: decoded frames are not kept, so peak memory is flat in the
+        video length except for the per-frame metadata (frame_indices,
+        timestamps, detected_frames, DetectionStore offsets and
+        ActivityTimeline columns, roughly 100 bytes per analyzed frame plus
+        the detections themselves). The thumbnail strip is capped by
+        thumbnail_max_count. tests/test_memory.py holds the bound.
+        
         Args:
             video_path: Path to video file
             progress_callback: Callback function for progress updates
+            frame_stride: Analyze every Nth frame (default: VIDEO_PROCESSING_CONFIG)
+            analysis_fps: Target analysis rate; takes precedence over frame_stride
+            frame_callback: Called after each analyzed frame with a dict of
+                            frame_index, source_frame, active, diff_count,
+                            raw_diff_count (plain difference, before motion
+                            compensation and lighting rejection),
+                            detections and frame (the decoded image: BGR when
+                            YOLO ran on it, otherwise the grayscale image
+                            Stage 1 used; copy it to keep it beyond the call)
+            target_fps: Processing rate for the throughput governor to hold
+                        (default: GOVERNOR_CONFIG when enabled, else no governor)
+            profile_memory: Record peak RSS and tracemalloc statistics per stage
+                            (default: PERFORMANCE_CONFIG['profile_memory'])
+            cancel_token: CancellationToken checked between frames; when it
+                          fires, the frames analyzed so far are returned
+            build_thumbnails: Keep a low-resolution ThumbnailStrip for scrubbing
+                              (default: VIDEO_PROCESSING_CONFIG['thumbnails'])
             
         Returns:
             dict with:
-                - frames: List of processed frames
+                - frames: Sequence of annotated frames, rendered lazily on access
+                - frame_indices: Source frame number of each analyzed frame
                 - timestamps: Processing times per frame
-                - detected_frames: Frames where difference was detected
-                - yolo_results: YOLO detections per frame
+                - detected_frames: Frames inside a motion event
+                - yolo_results: DetectionStore with YOLO detections per frame
                 - total_time: Total processing time
-                - frames_with_detection: Number of frames with difference detected
+                - frames_with_detection: Number of frames inside motion events
                 - yolo_runs: Number of YOLO runs
+                - motion_events: List of {'start', 'end'} source frame ranges
+                - frame_stride, analysis_fps: Sampling applied to the source
+                - activity: ActivityTimeline of per-frame motion/detection activity
+                - governor: Governor summary (adjustments, stage costs) or None
+                - memory: MemoryMonitor report, or None when not profiling
+                - cancelled: Whether the run was stopped early (partial results)
+                - cascade: Cascade escalation counters, or None when cascade is off
+                - stage1: Frame-difference counters (frames, triggered, and
+                          triggers suppressed by motion compensation or
+                          lighting rejection)
+                - roi: Share of the frame each stage processed and detections
+                       dropped in ignored areas, or None without an ROI mask
+                - thumbnails: ThumbnailStrip of every Nth analyzed frame, or None
         """
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cancel_token = cancel_token or CancellationToken()
+        governor = None
+        if target_fps or GOVERNOR_CONFIG['enabled']:
+            governor = ThroughputGovernor.from_config(GOVERNOR_CONFIG, target_fps=target_fps)
+            governor.attach(self)
+        
+        cap = open_video(video_path)
+        fps = cap.fps
+        total_frames = cap.frame_count
+        stride = self.get_frame_stride(fps, frame_stride, analysis_fps)
+        sampled_fps = fps / stride if fps > 0 else 0
         
-        frames = []
         timestamps = []
         detected_frames = []
-        yolo_results = []
+        yolo_results = DetectionStore(initial_frames=max(1, total_frames // stride + 1))
+        frame_indices = []
         
+        activity = ActivityTimeline(fps=sampled_fps, initial_capacity=max(1, total_frames // stride + 1))
+        if build_thumbnails is None:
+            build_thumbnails = VIDEO_PROCESSING_CONFIG.get('thumbnails', True)
+        thumbnails = ThumbnailStrip((cap.width, cap.height), total_frames // stride + 1) if build_thumbnails else None
+        
+        source_index = -1
         frame_count = 0
         frames_with_detection = 0
         yolo_runs = 0
         
-        self.frame_diff_detector.reset()
+        self.motion_trigger.reset()
+        self.yolo_detector.reset_cascade_stats()
+        self.roi_filtered = 0
+        monitor = self._start_memory_monitor(profile_memory)
         start_time = time.time()
+        decode_start = start_time
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_start = time.time()
-            
-            # Stage 1: Frame difference detection
-            has_difference, _, diff_count = self.frame_diff_detector.detect_difference(frame)
-            detected_frames.append(has_difference)
-            
-            detections = []
-            
-            # Stage 2: YOLO detection (only if difference detected)
-            if has_difference:
-                frames_with_detection += 1
-                detections = self.yolo_detector.detect(frame)
-                yolo_runs += 1
-                annotated_frame = self.yolo_detector.draw_detections(frame, detections)
-            else:
-                annotated_frame = frame.copy()
-            
-            # Add status text
-            status_text = "DETECTED: Difference" if has_difference else "No Difference"
-            cv2.putText(annotated_frame, status_text, (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0) if has_difference else (0, 0, 255), 2)
-            
-            frames.append(annotated_frame)
-            yolo_results.append(detections)
-            
-            frame_time = time.time() - frame_start
-            timestamps.append(frame_time)
-            
-            frame_count += 1
-            
-            if progress_callback:
-                progress_callback(frame_count, total_frames)
+        cancelled = False
+        try:
+            while True:
+                if cancel_token.cancelled:
+                    cancelled = True
+                    break
+                # Advance without decoding; only sampled frames are retrieved
+                if not cap.grab():
+                    break
+                source_index += 1
+                if source_index % stride:
+                    continue
+                # Stage 1 only needs luma; BGR is converted for frames that reach YOLO
+                ret, frame = cap.retrieve(gray=True)
+                if not ret:
+                    break
+                
+                frame_start = time.time()
+                frame_indices.append(source_index)
+                if monitor:
+                    monitor.checkpoint('decode')
+                
+                # Stage 1: Frame difference detection with hysteresis
+                trigger = self.motion_trigger.update(frame)
+                has_difference = trigger.active
+                diff_count = trigger.diff_count
+                detected_frames.append(has_difference)
+                stage1_end = time.time()
+                if monitor:
+                    monitor.checkpoint('stage1')
+                
+                detections = Detections()
+                
+                # Stage 2: YOLO detection (scheduled inside motion events)
+                if has_difference:
+                    frames_with_detection += 1
+                if trigger.run_yolo:
+                    ret, frame = cap.retrieve()
+                    detections = self._detect_in_roi(frame)
+                    yolo_runs += 1
+                
+                # Overlays are drawn lazily when a frame is displayed
+                yolo_results.append(detections)
+                activity.append(diff_count, has_difference, len(detections))
+                if thumbnails is not None and thumbnails.wants(frame_count):
+                    # Stage 1 may have decoded luma only; thumbnails stay in colour
+                    thumbnails.add(frame_count, frame if frame.ndim == 3 else cap.retrieve()[1])
+                
+                frame_end = time.time()
+                frame_time = frame_end - frame_start
+                timestamps.append(frame_time)
+                if monitor:
+                    monitor.checkpoint('stage2')
+                
+                if governor:
+                    governor.record('decode', frame_start - decode_start)
+                    governor.record('stage1', stage1_end - frame_start)
+                    governor.record('stage2', frame_end - stage1_end)
+                    governor.frame_done(frame_end - decode_start)
+                decode_start = frame_end
+                
+                if frame_callback:
+                    frame_callback({
+                        'frame_index': frame_count,
+                        'source_frame': source_index,
+                        'active': has_difference,
+                        'diff_count': diff_count,
+                        'raw_diff_count': self.frame_diff_detector.raw_diff_count,
+                        'detections': detections,
+                        'frame': frame
+                    })
+                
+                frame_count += 1
+                
+                if progress_callback:
+                    progress_callback(source_index + 1, total_frames)
+        finally:
+            # Handles are released even when a callback raises
+            total_time = time.time() - start_time
+            cap.release()
+            memory_report = monitor.stop() if monitor else None
+            governor_summary = None
+            if governor:
+                governor_summary = governor.summary()
+                governor.detach()
+        
+        # Map event boundaries from analyzed-frame positions back to source frames
+        motion_events = [
+            {'start': frame_indices[e['start']], 'end': frame_indices[e['end']]}
+            for e in self.motion_trigger.finish()
+        ]
         
-        total_time = time.time() - start_time
-        cap.release()
+        frames = AnnotatedFrameSequence(
+            FrameReader(video_path), frame_count,
+            lambda i, frame: self.render_two_stage_frame(frame, detected_frames[i], yolo_results[i]),
+            frame_indices=frame_indices
+        )
         
         return {
             'frames': frames,
@@ -108,56 +404,98 @@ class VideoProcessor:
             'total_time': total_time,
             'frames_with_detection': frames_with_detection,
             'yolo_runs': yolo_runs,
+            'motion_events': motion_events,
             'total_frames': total_frames,
-            'fps': fps
+            'fps': fps,
+            'frame_indices': frame_indices,
+            'frame_stride': stride,
+            'analysis_fps': sampled_fps,
+            'activity': activity,
+            'governor': governor_summary,
+            'cancelled': cancelled,
+            'cascade': self.yolo_detector.cascade_stats(),
+            'stage1': dict(self.frame_diff_detector.stats),
+            'roi': self._roi_summary(cap.width, cap.height),
+            'thumbnails': thumbnails,
+            'memory': memory_report
         }
     
-    def process_video_full_yolo(self, video_path, progress_callback=None):
+    def process_video_full_yolo(self, video_path, progress_callback=None, frame_callback=None, profile_memory=None,
+                                cancel_token=None):
         """
         Process video with full YOLO detection (baseline for comparison)
         
+        The ROI mask is not applied: the baseline stands for running YOLO on
+        every full frame.
+        
         Args:
             video_path: Path to video file
             progress_callback: Callback function for progress updates
+            frame_callback: Called after each frame with a dict of
+                            frame_index, source_frame, detections and frame
+            profile_memory: Record peak RSS and tracemalloc statistics per stage
+            cancel_token: CancellationToken checked between frames
             
         Returns:
-            dict with processing results
+            dict with processing results ('memory' holds the profiling report,
+            'cancelled' marks partial results)
         """
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cancel_token = cancel_token or CancellationToken()
+        cap = open_video(video_path)
+        fps = cap.fps
+        total_frames = cap.frame_count
         
-        frames = []
         timestamps = []
-        yolo_results = []
+        yolo_results = DetectionStore(initial_frames=max(1, total_frames))
         
         frame_count = 0
+        monitor = self._start_memory_monitor(profile_memory)
         start_time = time.time()
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_start = time.time()
-            
-            # Run YOLO on every frame
-            detections = self.yolo_detector.detect(frame)
-            annotated_frame = self.yolo_detector.draw_detections(frame, detections)
-            
-            frames.append(annotated_frame)
-            yolo_results.append(detections)
-            
-            frame_time = time.time() - frame_start
-            timestamps.append(frame_time)
-            
-            frame_count += 1
-            
-            if progress_callback:
-                progress_callback(frame_count, total_frames)
+        cancelled = False
+        try:
+            while True:
+                if cancel_token.cancelled:
+                    cancelled = True
+                    break
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                frame_start = time.time()
+                if monitor:
+                    monitor.checkpoint('decode')
+                
+                # Run YOLO on every frame
+                detections = self.yolo_detector.detect(frame)
+                yolo_results.append(detections)
+                
+                frame_time = time.time() - frame_start
+                timestamps.append(frame_time)
+                if monitor:
+                    monitor.checkpoint('stage2')
+                
+                if frame_callback:
+                    frame_callback({
+                        'frame_index': frame_count,
+                        'source_frame': frame_count,
+                        'detections': detections,
+                        'frame': frame
+                    })
+                
+                frame_count += 1
+                
+                if progress_callback:
+                    progress_callback(frame_count, total_frames)
+        finally:
+            total_time = time.time() - start_time
+            cap.release()
+            memory_report = monitor.stop() if monitor else None
         
-        total_time = time.time() - start_time
-        cap.release()
+        frames = AnnotatedFrameSequence(
+            FrameReader(video_path), frame_count,
+            lambda i, frame: self.yolo_detector.draw_detections(frame, yolo_results[i])
+        )
         
         return {
             'frames': frames,
@@ -165,7 +503,132 @@ class VideoProcessor:
             'yolo_results': yolo_results,
             'total_time': total_time,
             'total_frames': total_frames,
-            'fps': fps
+            'fps': fps,
+            'memory': memory_report,
+            'cancelled': cancelled
+        }
+    
+    def estimate_full_yolo(self, video_path, sample_size=None, strata=None, confidence_level=None,
+                           progress_callback=None, frame_callback=None, cancel_token=None, seed=0):
+        """
+        Estimate the full YOLO baseline from a stratified sample of frames
+        
+        The video is split into equal strata and frames are drawn at random
+        inside each one. Every sample is timed as a sequential decode plus one
+        YOLO call (the cost process_video_full_yolo pays per frame), then cost
+        and detection counts are extrapolated with confidence intervals.
+        Short videos fall back to the full pass.
+        
+        Args:
+            video_path: Path to video file
+            sample_size: Total frames to sample (default: PERFORMANCE_CONFIG)
+            strata: Number of strata (default: PERFORMANCE_CONFIG)
+            confidence_level: Interval confidence, e.g. 0.95 (default: PERFORMANCE_CONFIG)
+            progress_callback: Callback function for progress updates (samples done, sample size)
+            frame_callback: Called after each sample with a dict of
+                            frame_index, source_frame, detections and frame
+            cancel_token: CancellationToken checked between samples
+            seed: Random seed for the sample positions
+            
+        Returns:
+            dict with:
+                - total_time, total_time_ci: Estimated baseline seconds and (low, high)
+                - total_detections, detections_ci: Estimated detection count and (low, high)
+                - per_frame_time: Mean sampled cost per frame
+                - total_frames, fps: Source video properties
+                - sample_frames: Frame numbers that were measured
+                - estimation_time: Wall time spent estimating
+                - estimated: True (False when the full pass was used)
+                - cancelled: Whether sampling was stopped early
+        """
+        sample_size = sample_size or PERFORMANCE_CONFIG.get('baseline_samples', 60)
+        strata = strata or PERFORMANCE_CONFIG.get('baseline_strata', 10)
+        confidence_level = confidence_level or PERFORMANCE_CONFIG.get('baseline_confidence', 0.95)
+        cancel_token = cancel_token or CancellationToken()
+        
+        cap = open_video(video_path)
+        fps = cap.fps
+        total_frames = cap.frame_count
+        
+        strata = max(1, min(strata, total_frames // 4))
+        if total_frames <= 2 * sample_size:
+            cap.release()
+            result = self.process_video_full_yolo(video_path, progress_callback=progress_callback,
+                                                  frame_callback=frame_callback, cancel_token=cancel_token)
+            result['estimated'] = False
+            return result
+        
+        rng = random.Random(seed)
+        bounds = np.linspace(0, total_frames, strata + 1).astype(int)
+        per_stratum = max(2, sample_size // strata)
+        plan = []
+        for h in range(strata):
+            size = bounds[h + 1] - bounds[h]
+            for frame_number in sorted(rng.sample(range(bounds[h], bounds[h + 1]), min(per_stratum, size))):
+                plan.append((h, frame_number))
+        
+        costs = [[] for _ in range(strata)]
+        counts = [[] for _ in range(strata)]
+        sample_frames = []
+        cancelled = False
+        start_time = time.time()
+        try:
+            # The first model call pays one-off initialization; keep it out of the sample
+            ret, frame = cap.read()
+            if ret:
+                self.yolo_detector.detect(frame)
+            
+            for done, (h, frame_number) in enumerate(plan):
+                if cancel_token.cancelled:
+                    cancelled = True
+                    break
+                # Seek to the previous frame so the timed read is a sequential decode;
+                # frame 0 has none, so it is decoded straight after the seek
+                if frame_number == 0:
+                    if not cap.seek(0):
+                        continue
+                elif not cap.seek(frame_number - 1) or not cap.grab():
+                    continue
+                sample_start = time.time()
+                ret, frame = cap.read()
+                if not ret:
+                    continue
+                detections = self.yolo_detector.detect(frame)
+                costs[h].append(time.time() - sample_start)
+                counts[h].append(len(detections))
+                sample_frames.append(frame_number)
+                
+                if frame_callback:
+                    frame_callback({
+                        'frame_index': done,
+                        'source_frame': frame_number,
+                        'detections': detections,
+                        'frame': frame
+                    })
+                if progress_callback:
+                    progress_callback(done + 1, len(plan))
+        finally:
+            cap.release()
+        
+        stratum_sizes = np.diff(bounds)
+        z = NormalDist().inv_cdf(0.5 + confidence_level / 2)
+        total_time, time_low, time_high = _stratified_total(costs, stratum_sizes, z)
+        total_detections, det_low, det_high = _stratified_total(counts, stratum_sizes, z)
+        measured = sum(len(c) for c in costs)
+        
+        return {
+            'total_time': total_time,
+            'total_time_ci': (time_low, time_high),
+            'total_detections': total_detections,
+            'detections_ci': (det_low, det_high),
+            'per_frame_time': sum(sum(c) for c in costs) / measured if measured else 0.0,
+            'confidence_level': confidence_level,
+            'total_frames': total_frames,
+            'fps': fps,
+            'sample_frames': sample_frames,
+            'estimation_time': time.time() - start_time,
+            'estimated': True,
+            'cancelled': cancelled
         }
     
     def calculate_speedup(self, two_stage_result, full_yolo_result):
@@ -174,10 +637,12 @@ class VideoProcessor:
         
         Args:
             two_stage_result: Result dict from process_video_two_stage()
-            full_yolo_result: Result dict from process_video_full_yolo()
+            full_yolo_result: Result dict from process_video_full_yolo() or
+                              estimate_full_yolo()
             
         Returns:
-            dict with speedup metrics
+            dict with speedup metrics; for an estimated baseline also
+            'estimated' and 'speedup_ci' (low, high)
         """
         two_stage_time = two_stage_result['total_time']
         full_yolo_time = full_yolo_result['total_time']
@@ -194,82 +659,171 @@ class VideoProcessor:
             'two_stage_time': two_stage_time,
             'full_yolo_time': full_yolo_time,
             'frames_skipped': full_yolo_result['total_frames'] - two_stage_result['yolo_runs'],
-            'yolo_reduction_percent': (1 - two_stage_result['yolo_runs'] / full_yolo_result['total_frames']) * 100
+            'yolo_reduction_percent': (1 - two_stage_result['yolo_runs'] / full_yolo_result['total_frames']) * 100,
+            'estimated': bool(full_yolo_result.get('estimated')),
+            'speedup_ci': tuple(t / two_stage_time if two_stage_time > 0 else 0
+                                for t in full_yolo_result['total_time_ci'])
+                          if full_yolo_result.get('estimated') else None
         }
+    
+    def measure_baseline(self, video_path, mode=None, **kwargs):
+        """
+        Get the full YOLO baseline for calculate_speedup()
+        
+        Args:
+            video_path: Path to video file
+            mode: 'full' runs YOLO on every frame, 'sampled' estimates from a
+                  stratified sample (default: PERFORMANCE_CONFIG['baseline_mode'])
+            **kwargs: progress_callback, frame_callback and cancel_token
+            
+        Returns:
+            Result dict of process_video_full_yolo() or estimate_full_yolo()
+        """
+        mode = mode or PERFORMANCE_CONFIG.get('baseline_mode', 'full')
+        if mode == 'sampled':
+            return self.estimate_full_yolo(video_path, **kwargs)
+        if mode != 'full':
+            raise ValueError(f"Unknown baseline mode: {mode}")
+        return self.process_video_full_yolo(video_path, **kwargs)
 
-    def compress_video_smart(self, video_path, output_path, progress_callback=None):
+    def compress_video_smart(self, video_path, output_path, progress_callback=None, frame_callback=None,
+                             profile_memory=None, cancel_token=None):
         """
         Compress video by keeping only YOLO-detected frames + at least 1 frame per second
         
+        An output path ending in .frames writes a random-access frame archive
+        (individually encoded frames, their source frame numbers, timestamps,
+        keep reasons and detections) instead of an mp4v stream.
+        
+        Memory is flat in the video length except for frames_to_save, one
+        small record per kept frame (tests/test_memory.py holds the bound).
+        
         Args:
             video_path: Path to input video file
-            output_path: Path to output compressed video file
+            output_path: Path to output compressed video file or frame archive
             progress_callback: Callback function for progress updates
+            frame_callback: Called after each frame with a dict of frame_index,
+                            saved, reason and detections
+            profile_memory: Record peak RSS and tracemalloc statistics per stage
+            cancel_token: CancellationToken checked between frames; the output
+                          then holds the frames kept so far
             
         Returns:
-            dict with compression statistics
+            dict with compression statistics; frames_to_save lists the kept
+            frame numbers and reasons (not the pixels), 'memory' holds the
+            profiling report, 'cancelled' marks a partial output, 'cascade'
+            holds cascade escalation counters (None when cascade is off),
+            'stage1' the frame-difference counters and 'roi' the ROI mask
+            summary (None without a mask)
         """
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cancel_token = cancel_token or CancellationToken()
+        cap = open_video(video_path)
+        fps = cap.fps
+        total_frames = cap.frame_count
+        width = cap.width
+        height = cap.height
         
         # Calculate frame interval for 1 frame per second
         # e.g., for fps=30, keep every 30 frames = 1 per second
         frame_interval = max(1, int(fps))
         
         # Setup video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        archive = None
+        out = None
+        if is_archive_path(output_path):
+            archive = FrameArchiveWriter(output_path, fps, (width, height), source=video_path)
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
         
         frames_to_save = []
         frame_count = 0
         last_keyframe = -frame_interval  # Ensure first frame is saved as keyframe
-        self.frame_diff_detector.reset()
+        self.motion_trigger.reset()
+        self.yolo_detector.reset_cascade_stats()
+        self.roi_filtered = 0
+        monitor = self._start_memory_monitor(profile_memory)
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Stage 1: Frame difference detection
-            has_difference, _, _ = self.frame_diff_detector.detect_difference(frame)
-            
-            # Stage 2: Determine if frame should be saved
-            should_save = False
-            reason = ""
-            
-            # Check if it's time to save a keyframe (at least 1 per second)
-            if frame_count - last_keyframe >= frame_interval:
-                should_save = True
-                reason = "KEYFRAME"
-                last_keyframe = frame_count
-            
-            # If motion detected, run YOLO
-            if has_difference:
-                detections = self.yolo_detector.detect(frame)
-                if len(detections) > 0:  # Only save if YOLO found objects
+        cancelled = False
+        try:
+            while True:
+                if cancel_token.cancelled:
+                    cancelled = True
+                    break
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if monitor:
+                    monitor.checkpoint('decode')
+                
+                # Stage 1: Frame difference detection with hysteresis
+                trigger = self.motion_trigger.update(frame)
+                if monitor:
+                    monitor.checkpoint('stage1')
+                
+                # Stage 2: Determine if frame should be saved
+                should_save = False
+                reason = ""
+                detections = Detections()
+                
+                # Check if it's time to save a keyframe (at least 1 per second)
+                if frame_count - last_keyframe >= frame_interval:
                     should_save = True
-                    reason = "YOLO_DETECTION"
-            
-            if should_save:
-                frames_to_save.append({
-                    'frame': frame,
-                    'frame_number': frame_count,
-                    'reason': reason
-                })
-                out.write(frame)
-            
-            frame_count += 1
-            
-            if progress_callback:
-                progress_callback(frame_count, total_frames)
+                    reason = "KEYFRAME"
+                    last_keyframe = frame_count
+                
+                # If YOLO is scheduled inside a motion event, run it
+                if trigger.run_yolo:
+                    detections = self._detect_in_roi(frame)
+                    if len(detections) > 0:  # Only save if YOLO found objects
+                        should_save = True
+                        reason = "YOLO_DETECTION"
+                
+                if monitor:
+                    monitor.checkpoint('stage2')
+                
+                if should_save:
+                    # Only metadata is kept; the pixels go straight to the writer
+                    frames_to_save.append({
+                        'frame_number': frame_count,
+                        'reason': reason
+                    })
+                    if archive is not None:
+                        archive.append(frame, frame_count, cap.timestamp, reason, detections)
+                    else:
+                        out.write(frame)
+                    if monitor:
+                        monitor.checkpoint('write')
+                
+                if frame_callback:
+                    frame_callback({
+                        'frame_index': frame_count,
+                        'saved': should_save,
+                        'reason': reason,
+                        'detections': detections
+                    })
+                
+                frame_count += 1
+                
+                if progress_callback:
+                    progress_callback(frame_count, total_frames)
+        finally:
+            cap.release()
+            memory_report = monitor.stop() if monitor else None
+            # Closing the writer leaves a playable file / readable archive of the frames so far
+            if archive is not None:
+                archive.close()
+            else:
+                out.release()
         
-        cap.release()
-        out.release()
+        if archive is not None:
+            compressed_size = archive.total_size()
+        else:
+            compressed_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
         
-        compression_ratio = len(frames_to_save) / total_frames if total_frames > 0 else 0
+        # A cancelled run is measured against the frames it actually read
+        frames_read = frame_count if cancelled else total_frames
+        compression_ratio = len(frames_to_save) / frames_read if frames_read > 0 else 0
         
         return {
             'output_path': output_path,
@@ -278,8 +832,58 @@ class VideoProcessor:
             'compression_ratio': compression_ratio,
             'compression_percent': (1 - compression_ratio) * 100,
             'original_size_mb': os.path.getsize(video_path) / (1024 * 1024) if os.path.exists(video_path) else 0,
-            'compressed_size_mb': os.path.getsize(output_path) / (1024 * 1024) if os.path.exists(output_path) else 0,
+            'compressed_size_mb': compressed_size / (1024 * 1024),
+            'is_archive': archive is not None,
             'fps': fps,
-            'frames_to_save': frames_to_save
+            'frames_to_save': frames_to_save,
+            'memory': memory_report,
+            'cancelled': cancelled,
+            'cascade': self.yolo_detector.cascade_stats(),
+            'stage1': dict(self.frame_diff_detector.stats),
+            'roi': self._roi_summary(width, height)
         }
 
+    def load_archive_result(self, archive_path):
+        """
+        Open a frame archive as a result dict the GUI can browse
+        
+        Args:
+            archive_path: Path to a .frames archive written by compress_video_smart()
+            
+        Returns:
+            dict with the per-frame keys of process_video_two_stage() (one entry
+            per kept frame) plus 'archive' (the open FrameArchiveReader)
+        """
+        archive = FrameArchiveReader(archive_path)
+        fps = archive.fps
+        
+        yolo_results = DetectionStore(names=archive.names, initial_frames=max(1, len(archive)))
+        detected_frames = []
+        activity = ActivityTimeline(fps=fps, initial_capacity=max(1, len(archive)))
+        for i in range(len(archive)):
+            detections = archive.detections(i)
+            has_detection = archive.record(i)['reason'] == 'YOLO_DETECTION'
+            yolo_results.append(detections)
+            detected_frames.append(has_detection)
+            activity.append(0, has_detection, len(detections))
+        
+        # Average kept-frame rate, used for playback pacing
+        duration = (archive.frame_numbers[-1] + 1) / fps if len(archive) and fps > 0 else 0
+        kept_fps = len(archive) / duration if duration > 0 else 1.0
+        
+        frames = AnnotatedFrameSequence(
+            archive, len(archive),
+            lambda i, frame: self.render_two_stage_frame(frame, detected_frames[i], yolo_results[i])
+        )
+        
+        return {
+            'frames': frames,
+            'detected_frames': detected_frames,
+            'yolo_results': yolo_results,
+            'frame_indices': [int(n) for n in archive.frame_numbers],
+            'total_frames': len(archive),
+            'fps': fps,
+            'analysis_fps': kept_fps,
+            'activity': activity,
+            'archive': archive
+        }
@@ -0,0 +1,351 @@
+"""
+Video Reader Module
+Decoder abstraction with an OpenCV backend and an optional threaded PyAV
+backend (keyframe-accurate seeking, direct luma access, stream timestamps)
+"""
+
+import cv2
+import numpy as np
+
+from config import VIDEO_PROCESSING_CONFIG
+
+try:
+    import av
+except ImportError:  # PyAV is optional; OpenCV is always available
+    av = None
+
+
+BACKENDS = ('auto', 'opencv', 'pyav')
+
+# Pixel formats whose first plane is the 8-bit luma channel
+_LUMA_FORMATS = ('yuv420p', 'yuvj420p', 'yuv422p', 'yuvj422p', 'yuv444p', 'yuvj444p', 'nv12', 'nv21', 'gray')
+
+
+class VideoReader:
+    """
+    Common interface of the decoder backends.
+
+    Mirrors the subset of cv2.VideoCapture that processing uses (grab,
+    retrieve, read, release) and adds frame-accurate seek(), grayscale
+    retrieval and per-frame timestamps. Attributes: fps, frame_count,
+    width, height, backend.
+    """
+
+    backend = None
+
+    def __init__(self):
+        self.fps = 0.0
+        self.frame_count = 0
+        self.width = 0
+        self.height = 0
+        self.frame_index = -1  # Index of the frame last grabbed
+
+    def grab(self):
+        """Advance to the next frame without converting it; returns success"""
+        raise NotImplementedError
+
+    def retrieve(self, gray=False):
+        """
+        Convert the last grabbed frame
+
+        Args:
+            gray: Return the 8-bit grayscale/luma image instead of BGR
+
+        Returns:
+            (ret, frame)
+        """
+        raise NotImplementedError
+
+    def read(self, gray=False):
+        """Grab and retrieve the next frame; returns (ret, frame)"""
+        if not self.grab():
+            return False, None
+        return self.retrieve(gray)
+
+    def seek(self, frame_index):
+        """
+        Position the reader so the next grab() returns frame_index
+
+        Returns:
+            True if the position could be reached
+        """
+        raise NotImplementedError
+
+    @property
+    def timestamp(self):
+        """Presentation time in seconds of the last grabbed frame"""
+        return self.frame_index / self.fps if self.fps > 0 else 0.0
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class OpenCVReader(VideoReader):
+    """
+    cv2.VideoCapture backend (files, devices and stream URLs).
+
+    The BGR frame is converted once per grab: later retrieve() calls,
+    grayscale or not, reuse it, and return the same array until the next grab.
+    """
+
+    backend = 'opencv'
+
+    def __init__(self, source, threads=0):
+        """
+        Open a source
+
+        Args:
+            source: Video path, device index or stream URL
+            threads: Decoder threads when the build supports it (0 = default)
+        """
+        super().__init__()
+        self.source = source
+        self.threads = threads
+        self.seek_grab_limit = VIDEO_PROCESSING_CONFIG.get('seek_grab_limit', 120)
+        self._cap = self._open_capture()
+        self._bgr = None  # Frame retrieved since the last grab
+        self._gray = None
+        self._exact_seek = None  # Whether POS_FRAMES seeks land exactly (None = untested)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def _open_capture(self):
+        cap = cv2.VideoCapture(self.source)
+        if self.threads and hasattr(cv2, 'CAP_PROP_N_THREADS'):
+            cap.set(cv2.CAP_PROP_N_THREADS, self.threads)
+        return cap
+
+    def grab(self):
+        self._bgr = self._gray = None
+        if not self._cap.grab():
+            return False
+        self.frame_index += 1
+        return True
+
+    def retrieve(self, gray=False):
+        if self._bgr is None:
+            ret, self._bgr = self._cap.retrieve()
+            if not ret:
+                self._bgr = None
+                return False, None
+        if not gray:
+            return True, self._bgr
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+        return True, self._gray
+
+    def _grab_to(self, frame_index):
+        """Grab forward until the next grab() returns frame_index"""
+        while self.frame_index + 1 < frame_index:
+            if not self.grab():
+                return False
+        return True
+
+    def _reopen(self):
+        """Start again from the first frame"""
+        self._cap.release()
+        self._cap = self._open_capture()
+        self._bgr = self._gray = None
+        self.frame_index = -1
+
+    def _landed_on(self, frame_index):
+        """
+        Whether the frame just grabbed is frame_index
+
+        POS_FRAMES read back after set() often just echoes the requested
+        value, so the decoded frame's own timestamp is checked instead.
+        """
+        if self.fps > 0:
+            return abs(self._cap.get(cv2.CAP_PROP_POS_MSEC) * self.fps / 1000.0 - frame_index) < 0.5
+        return False  # No frame rate to check against: treat as inexact
+
+    def seek(self, frame_index):
+        ahead = frame_index - (self.frame_index + 1)
+        if ahead == 0:
+            return True
+        # Short hops forward, and any forward seek in a container that does
+        # not seek exactly, decode forward from the current position
+        if ahead > 0 and (ahead <= self.seek_grab_limit or self._exact_seek is False):
+            return self._grab_to(frame_index)
+        if frame_index == 0 or self._exact_seek is False:
+            self._reopen()
+            return self._grab_to(frame_index)
+
+        # Seek to the frame before the target and decode it, so its timestamp
+        # proves where the seek landed and the next grab() returns the target
+        self._bgr = self._gray = None
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index - 1)
+        self.frame_index = frame_index - 2
+        self._exact_seek = self.grab() and self._landed_on(frame_index - 1)
+        if not self._exact_seek:
+            # The position is now unknown: reopen and decode forward
+            self._reopen()
+            return self._grab_to(frame_index)
+        return True
+
+    @property
+    def timestamp(self):
+        msec = self._cap.get(cv2.CAP_PROP_POS_MSEC)
+        return msec / 1000.0 if msec > 0 else super().timestamp
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def release(self):
+        self._cap.release()
+
+
+class PyAVReader(VideoReader):
+    """
+    FFmpeg backend through PyAV with frame-threaded decoding.
+
+    Seeking jumps to the nearest keyframe at or before the target and decodes
+    forward, so the next frame is exactly the requested one. Grayscale
+    retrieval copies the luma plane instead of converting to BGR.
+    """
+
+    backend = 'pyav'
+
+    def __init__(self, source, threads=0):
+        """
+        Open a file
+
+        Args:
+            source: Video path
+            threads: Decoder threads (0 = let FFmpeg choose)
+        """
+        if av is None:
+            raise ImportError("PyAV is not installed (pip install av)")
+        super().__init__()
+        self.source = source
+        self._container = av.open(str(source))
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = 'AUTO'
+        if threads:
+            self._stream.thread_count = threads
+        self._time_base = float(self._stream.time_base)
+        self._start_pts = self._stream.start_time or 0
+
+        rate = self._stream.average_rate or self._stream.guessed_rate
+        self.fps = float(rate) if rate else 0.0
+        self.width = self._stream.codec_context.width
+        self.height = self._stream.codec_context.height
+        if self._stream.frames:
+            self.frame_count = int(self._stream.frames)
+        elif self._stream.duration:
+            self.frame_count = int(round(self._stream.duration * self._time_base * self.fps))
+        elif self._container.duration:
+            self.frame_count = int(round(self._container.duration / av.time_base * self.fps))
+
+        self._decoder = self._container.decode(self._stream)
+        self._frame = None
+        self._pending = None  # Frame decoded ahead by seek(), returned by the next grab()
+        self._timestamp = 0.0
+
+    def _index_of(self, frame):
+        """Frame number of a decoded frame from its presentation timestamp"""
+        if frame.pts is None or self.fps <= 0:
+            return self.frame_index + 1
+        return int(round((frame.pts - self._start_pts) * self._time_base * self.fps))
+
+    def _decode_next(self):
+        try:
+            return next(self._decoder)
+        except (StopIteration, av.error.EOFError):
+            return None
+
+    def grab(self):
+        frame = self._pending if self._pending is not None else self._decode_next()
+        self._pending = None
+        if frame is None:
+            self._frame = None
+            return False
+        self._frame = frame
+        self.frame_index = self._index_of(frame)
+        self._timestamp = float(frame.time) if frame.time is not None else super().timestamp
+        return True
+
+    def retrieve(self, gray=False):
+        frame = self._frame
+        if frame is None:
+            return False, None
+        if not gray:
+            return True, frame.to_ndarray(format='bgr24')
+        if frame.format.name in _LUMA_FORMATS:
+            plane = frame.planes[0]
+            luma = np.frombuffer(plane, np.uint8).reshape(plane.height, plane.line_size)
+            return True, luma[:, :plane.width].copy()
+        return True, frame.to_ndarray(format='gray')
+
+    def seek(self, frame_index):
+        if frame_index == self.frame_index + 1 and self._pending is None:
+            return True
+        target_pts = self._start_pts + int(frame_index / self.fps / self._time_base) if self.fps > 0 else 0
+        self._container.seek(target_pts, stream=self._stream, backward=True, any_frame=False)
+        self._decoder = self._container.decode(self._stream)
+        while True:
+            frame = self._decode_next()
+            if frame is None:
+                self._pending = None
+                return False
+            if self._index_of(frame) >= frame_index:
+                self._pending = frame
+                self.frame_index = frame_index - 1
+                return True
+
+    @property
+    def timestamp(self):
+        return self._timestamp
+
+    def isOpened(self):
+        return self._container is not None
+
+    def release(self):
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+
+
+def _is_live_source(source):
+    """Device indices and stream URLs go to OpenCV"""
+    return isinstance(source, int) or '://' in str(source)
+
+
+def open_video(source, backend=None, threads=None):
+    """
+    Open a video with the configured decoder backend
+
+    Args:
+        source: Video path, device index or stream URL
+        backend: 'auto', 'opencv' or 'pyav' (default: VIDEO_PROCESSING_CONFIG['decoder']);
+                 'auto' uses PyAV for files when it is installed
+        threads: Decoder threads (default: VIDEO_PROCESSING_CONFIG['decoder_threads'])
+
+    Returns:
+        VideoReader
+    """
+    backend = backend or VIDEO_PROCESSING_CONFIG.get('decoder', 'auto')
+    threads = VIDEO_PROCESSING_CONFIG.get('decoder_threads', 0) if threads is None else threads
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown decoder backend: {backend}")
+    if backend == 'auto':
+        if av is not None and not _is_live_source(source):
+            try:
+                return PyAVReader(source, threads)
+            except (OSError, ValueError, IndexError, av.error.FFmpegError):
+                pass  # Unreadable for FFmpeg here; OpenCV may still manage
+        return OpenCVReader(source, threads)
+    if backend == 'pyav':
+        return PyAVReader(source, threads)
+    return OpenCVReader(source, threads)
@@ -3,24 +3,118 @@ YOLO Object Detection Module
 Wrapper for YOLOv8 detection
 """
 
-from ultralytics import YOLO
 import cv2
 import numpy as np
+from config import YOLO_CONFIG
+from detections import Detections
+from model_registry import get_model_registry
 
 
 class YOLODetector:
     """
     YOLO object detection wrapper
+    
+    In cascade mode every frame goes through the small model first; only
+    frames whose detections are uncertain (a confidence inside the cascade
+    band) or contain small objects are re-run on the larger escalation model.
     """
     
-    def __init__(self, model_size='n'):  # 'n' for nano (fastest), 's', 'm', 'l', 'x'
+    def __init__(self, model_size='n', backend=None, device=None, registry=None, cascade=None):  # 'n' for nano (fastest), 's', 'm', 'l', 'x'
         """
         Initialize YOLO detector
         
+        Weights come from the process-wide model registry, so detectors for a
+        size that was already loaded are created without touching the disk.
+        
         Args:
-            model_size: YOLOv8 model size ('n', 's', 'm', 'l', 'x')
+            model_size: YOLOv8 model size ('n', 's', 'm', 'l', 'x'); the first
+                        stage in cascade mode
+            backend: Weight format ('pytorch', 'onnx', ...; None = 'pytorch')
+            device: Device string ('cpu', '0', ...; None = ultralytics default)
+            registry: ModelRegistry to load from (default: the shared registry)
+            cascade: Escalate uncertain frames to YOLO_CONFIG['cascade_model_size']
+                     (default: YOLO_CONFIG['cascade'])
+        """
+        self.model_size = model_size
+        self.backend = backend
+        self.device = device
+        self.registry = registry or get_model_registry()
+        # Load now so a missing model fails here; calls borrow an instance from the
+        # registry and no reference is kept, so eviction really frees the memory
+        self.registry.load(model_size, backend, device)
+        self.imgsz = None  # Inference image size (None = model default)
+        
+        self.cascade = YOLO_CONFIG.get('cascade', False) if cascade is None else cascade
+        self.cascade_model_size = YOLO_CONFIG.get('cascade_model_size', 's')
+        self.cascade_band = tuple(YOLO_CONFIG.get('cascade_band', (0.25, 0.6)))
+        self.cascade_min_area = YOLO_CONFIG.get('cascade_min_area', 0.002)
+        self.escalates = bool(self.cascade and self.cascade_model_size != model_size)
+        if self.escalates:
+            self.registry.load(self.cascade_model_size, backend, device)
+        self.reset_cascade_stats()
+        
+    def _inference_kwargs(self):
+        """Extra keyword arguments for the model call"""
+        return {'imgsz': self.imgsz} if self.imgsz else {}
+    
+    def reset_cascade_stats(self):
+        """Zero the cascade counters (call at the start of a run)"""
+        self.cascade_frames = 0
+        self.cascade_escalations = 0
+    
+    def cascade_stats(self):
+        """
+        Get cascade counters
+        
+        Returns:
+            dict with frames, escalations and escalation_rate, or None when
+            cascade mode is off
         """
-        self.model = YOLO(f'yolov8{model_size}.pt')
+        if not self.escalates:
+            return None
+        return {
+            'model_size': self.model_size,
+            'escalation_model_size': self.cascade_model_size,
+            'frames': self.cascade_frames,
+            'escalations': self.cascade_escalations,
+            'escalation_rate': self.cascade_escalations / self.cascade_frames if self.cascade_frames else 0.0,
+        }
+    
+    def _needs_escalation(self, detections, frame_shape):
+        """Whether first-stage detections are too uncertain to keep"""
+        if len(detections) == 0:
+            return False
+        low, high = self.cascade_band
+        if np.any((detections.confidences >= low) & (detections.confidences < high)):
+            return True
+        boxes = detections.boxes
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        return bool(np.any(areas < self.cascade_min_area * frame_shape[0] * frame_shape[1]))
+    
+    def _run_cascade(self, frames, confidence):
+        """Small model on all frames, escalation model on the uncertain ones"""
+        # The first stage runs at the band's lower edge so uncertain objects show up
+        first_conf = min(confidence, self.cascade_band[0])
+        with self.registry.checkout(self.model_size, self.backend, self.device) as model:
+            results = model(list(frames), conf=first_conf, verbose=False, **self._inference_kwargs())
+        detections = [Detections.from_results([result]) for result in results]
+        
+        escalate = [i for i, (frame, dets) in enumerate(zip(frames, detections))
+                    if self._needs_escalation(dets, frame.shape)]
+        escalated = set(escalate)
+        for i, dets in enumerate(detections):
+            if i not in escalated:
+                detections[i] = dets[dets.confidences >= confidence]
+        if escalate:
+            with self.registry.checkout(self.cascade_model_size, self.backend, self.device) as model:
+                results = model([frames[i] for i in escalate], conf=confidence,
+                                verbose=False, **self._inference_kwargs())
+            for i, result in zip(escalate, results):
+                detections[i] = Detections.from_results([result])
+        
+        self.cascade_frames += len(frames)
+        self.cascade_escalations += len(escalate)
+        return detections
         
     def detect(self, frame, confidence=0.5):
         """
@@ -31,32 +125,43 @@ class YOLODetector:
             confidence: Confidence threshold
             
         Returns:
-            detections: List of detected objects with format:
-                      [(class_name, confidence, x1, y1, x2, y2), ...]
+            detections: Detections container (class ids, confidences and boxes
+                      as numpy arrays); iterating it yields
+                      {'class', 'confidence', 'box'} dicts
         """
-        results = self.model(frame, conf=confidence, verbose=False)
+        if self.escalates:
+            return self._run_cascade([frame], confidence)[0]
         
-        detections = []
-        for result in results:
-            for box in result.boxes:
-                class_id = int(box.cls[0])
-                class_name = result.names[class_id]
-                confidence = float(box.conf[0])
-                
-                # Get bounding box coordinates
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                
-                detections.append({
-                    'class': class_name,
-                    'confidence': confidence,
-                    'box': (x1, y1, x2, y2)
-                })
+        with self.registry.checkout(self.model_size, self.backend, self.device) as model:
+            results = model(frame, conf=confidence, verbose=False, **self._inference_kwargs())
         
-        return detections
+        # Convert whole result tensors at once instead of per-box indexing
+        return Detections.from_results(results)
+    
+    def detect_batch(self, frames, confidence=0.5):
+        """
+        Detect objects in several frames with one model call
+        
+        Args:
+            frames: List of input frames (BGR images)
+            confidence: Confidence threshold
+            
+        Returns:
+            List of Detections, one per input frame
+        """
+        if not frames:
+            return []
+        if self.escalates:
+            return self._run_cascade(frames, confidence)
+        with self.registry.checkout(self.model_size, self.backend, self.device) as model:
+            results = model(list(frames), conf=confidence, verbose=False, **self._inference_kwargs())
+        return [Detections.from_results([result]) for result in results]
     
-    def draw_detections(self, frame, detections):
+    @staticmethod
+    def draw_detections(frame, detections):
         """
-        Draw detection boxes and labels on frame
+        Draw detection boxes and labels on frame (needs no model, so it can
+        be called on the class)
         
         Args:
             frame: Input frame